@@ -0,0 +1,5 @@
+"""
+Benchmark suite for the image to PDF converters.
+
+Run ``python -m benchmarks --help`` from the project root.
+"""
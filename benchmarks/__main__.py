@@ -0,0 +1,11 @@
+"""
+Entry point for ``python -m benchmarks``.
+"""
+import multiprocessing
+import sys
+
+from .bench import main
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main())
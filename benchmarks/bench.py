@@ -0,0 +1,269 @@
+"""
+Benchmark runner.
+
+Runs every converter engine and mode over synthetic corpora and reports
+images/s, MB/s, peak RSS and time to first output. Each case runs in a fresh
+interpreter so that peak memory is measured per case.
+"""
+from typing import Dict, List, Optional, Tuple
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from .corpus import PROFILES, generate_corpus
+
+# (engine, mode) pairs; see run_case
+CASES: Tuple[Tuple[str, str], ...] = (
+    ('app', 'threads'),
+    ('app', 'processes'),
+    ('app', 'threads-zip'),
+    ('app', 'processes-zip'),
+    ('processor', 'pdf'),
+    ('processor', 'zip'),
+    ('core', 'pdf'),
+)
+
+METRICS = ('images_per_second', 'mb_per_second', 'time_to_first_output', 'peak_rss_mb')
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident memory of this process and its finished children, in MB."""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+        except (ImportError, AttributeError):
+            return None
+    usage = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+             + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # Linux reports kilobytes, macOS bytes
+    return usage / (1024 * 1024) if sys.platform == 'darwin' else usage / 1024
+
+
+def _input_bytes(corpus_dir: str, files: List[str]) -> int:
+    return sum(os.path.getsize(os.path.join(corpus_dir, f)) for f in files)
+
+
+def _remove_pdfs(directory: str) -> None:
+    """Delete PDFs written next to the images by directory-mode runs."""
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if name.endswith('.pdf'):
+                os.remove(os.path.join(root, name))
+
+
+class _AppCallbacks:
+    """Minimal callbacks for the app converter recording first output time."""
+
+    def __init__(self, start: float):
+        self.start = start
+        self.first_output = None
+        self.converted = 0
+        self.errors = 0
+
+    def on_progress_batch(self, batch):
+        if batch.total_converted and self.first_output is None:
+            self.first_output = time.perf_counter() - self.start
+        self.converted = batch.total_converted
+        self.errors = batch.total_errors
+
+    def on_error(self, error):
+        raise RuntimeError(error)
+
+    def __getattr__(self, name):
+        if name.startswith('on_'):
+            return lambda *args: None
+        raise AttributeError(name)
+
+
+def run_case(engine: str, mode: str, corpus_dir: str, output_dir: str) -> Dict[str, object]:
+    """Convert a corpus with one engine and mode and measure it.
+
+    Args:
+        engine: 'app', 'processor' or 'core'
+        mode: Engine-specific mode from CASES
+        corpus_dir: Directory generated by generate_corpus
+        output_dir: Directory for output files
+
+    Returns:
+        Metrics dictionary
+    """
+    with open(os.path.join(corpus_dir, 'corpus.json'), encoding='utf-8') as f:
+        files = json.load(f)['files']
+
+    first_output = None
+    start = time.perf_counter()
+
+    def on_progress(current, total):
+        nonlocal first_output
+        if first_output is None:
+            first_output = time.perf_counter() - start
+
+    if engine == 'app':
+        from src.app.pdf_converter import PDFConverter
+        backend, _, archive = mode.partition('-')
+        converter = PDFConverter(backend=backend)
+        converter.directorio_salida = os.path.join(output_dir, 'app.zip')
+        callbacks = _AppCallbacks(start)
+        try:
+            converter.procesar_carpeta(corpus_dir, archive == 'zip', callbacks)
+        finally:
+            if archive != 'zip':
+                _remove_pdfs(corpus_dir)
+        first_output = callbacks.first_output
+        images, errors = callbacks.converted, callbacks.errors
+        report = converter.ultimo_informe
+    elif engine == 'processor':
+        from src.core.image_processor import ImageProcessor
+        processor = ImageProcessor()
+        output = os.path.join(output_dir, 'processor.zip' if mode == 'zip' else 'processor.pdf')
+        processor.batch_convert_to_pdf(corpus_dir, output, "*", on_progress, mode == 'zip')
+        report = processor.last_report
+        images, errors = report['images'], 0
+    elif engine == 'core':
+        from src.core.pdf_converter import PDFConverter as CorePDFConverter
+        converter = CorePDFConverter()
+        # Only converts the top level of the directory
+        files = [f for f in files if os.sep not in f and '/' not in f]
+        converter.convert_directory(corpus_dir, os.path.join(output_dir, 'core.pdf'), "*", on_progress)
+        report = converter.last_report
+        images, errors = report['images'], 0
+    else:
+        raise ValueError(f"Unknown engine: {engine}")
+
+    seconds = time.perf_counter() - start
+    input_bytes = _input_bytes(corpus_dir, files)
+    rss = peak_rss_mb()
+    return {
+        'engine': engine,
+        'mode': mode,
+        'images': images,
+        'errors': errors,
+        'input_bytes': input_bytes,
+        'seconds': round(seconds, 4),
+        'images_per_second': round(images / seconds, 2) if seconds else None,
+        'mb_per_second': round(input_bytes / (1024 * 1024) / seconds, 2) if seconds else None,
+        'time_to_first_output': round(first_output, 4) if first_output is not None else None,
+        'peak_rss_mb': round(rss, 1) if rss is not None else None,
+        'stages': report['stages'] if report else None,
+    }
+
+
+def _run_isolated(engine: str, mode: str, corpus_dir: str, output_dir: str) -> Dict[str, object]:
+    """Run a case in a fresh interpreter and return its metrics."""
+    command = [sys.executable, '-m', 'benchmarks.bench', '--run-case', engine, mode, corpus_dir, output_dir]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    completed = subprocess.run(command, cwd=root, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return {'engine': engine, 'mode': mode, 'error': completed.stderr.strip().splitlines()[-1:]}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def _median_run(runs: List[Dict[str, object]]) -> Dict[str, object]:
+    """Pick the run with the median wall time."""
+    runs = [r for r in runs if 'error' not in r] or runs
+    return sorted(runs, key=lambda r: r.get('seconds') or 0)[len(runs) // 2]
+
+
+def compare(results: List[Dict[str, object]], baseline: List[Dict[str, object]]) -> List[str]:
+    """Describe metric changes against a baseline results list."""
+    previous = {(r['profile'], r['engine'], r['mode']): r for r in baseline}
+    lines = []
+    for result in results:
+        before = previous.get((result['profile'], result['engine'], result['mode']))
+        if not before or 'error' in result or 'error' in before:
+            continue
+        changes = []
+        for metric in METRICS:
+            old, new = before.get(metric), result.get(metric)
+            if old and new is not None:
+                changes.append(f"{metric} {(new - old) / old:+.1%}")
+        lines.append(f"{result['profile']:>10} {result['engine']:>9} {result['mode']:<14} " + ", ".join(changes))
+    return lines
+
+
+def format_table(results: List[Dict[str, object]]) -> str:
+    """Plain-text table of results."""
+    header = f"{'profile':>10} {'engine':>9} {'mode':<14} {'img/s':>9} {'MB/s':>8} {'first(s)':>9} {'RSS(MB)':>8}"
+    lines = [header, '-' * len(header)]
+    for r in results:
+        if 'error' in r:
+            lines.append(f"{r['profile']:>10} {r['engine']:>9} {r['mode']:<14} error: {r['error']}")
+            continue
+        first = r['time_to_first_output']
+        lines.append(
+            f"{r['profile']:>10} {r['engine']:>9} {r['mode']:<14} {r['images_per_second']:>9} "
+            f"{r['mb_per_second']:>8} {first if first is not None else '-':>9} {r['peak_rss_mb'] or '-':>8}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--profile', action='append', choices=sorted(PROFILES),
+                        help="Corpus profile (repeatable, default: smoke)")
+    parser.add_argument('--engine', action='append', choices=sorted({e for e, _ in CASES}),
+                        help="Engine to run (repeatable, default: all)")
+    parser.add_argument('--corpus-dir', default=os.path.join(tempfile.gettempdir(), 'promitierra_bench'),
+                        help="Where corpora are generated and kept between runs")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per case; the median is reported")
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    parser.add_argument('--compare', help="Baseline JSON file from an earlier --output")
+    parser.add_argument('--in-process', action='store_true',
+                        help="Run cases in this interpreter (faster, but peak RSS accumulates)")
+    parser.add_argument('--run-case', nargs=4, metavar=('ENGINE', 'MODE', 'CORPUS', 'OUTPUT'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_case:
+        print(json.dumps(run_case(*args.run_case)))
+        return 0
+
+    results = []
+    for profile in args.profile or ['smoke']:
+        spec = PROFILES[profile]
+        corpus_dir = os.path.join(args.corpus_dir, profile)
+        print(f"Preparing corpus '{profile}' ({spec.count} images)...", file=sys.stderr)
+        generate_corpus(corpus_dir, spec)
+        for engine, mode in CASES:
+            if args.engine and engine not in args.engine:
+                continue
+            print(f"  {engine} {mode}...", file=sys.stderr)
+            runs = []
+            for _ in range(max(1, args.repeat)):
+                with tempfile.TemporaryDirectory() as output_dir:
+                    if args.in_process:
+                        runs.append(run_case(engine, mode, corpus_dir, output_dir))
+                    else:
+                        runs.append(_run_isolated(engine, mode, corpus_dir, output_dir))
+            result = _median_run(runs)
+            result['profile'] = profile
+            results.append(result)
+
+    print(format_table(results))
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        print("\nChange against baseline:")
+        print("\n".join(compare(results, baseline)))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpus': os.cpu_count(),
+                'results': results,
+            }, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
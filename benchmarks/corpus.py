@@ -0,0 +1,117 @@
+"""
+Synthetic image corpus generation.
+
+Corpora are fully determined by their CorpusSpec (including the seed), so the
+same spec always produces byte-identical files and benchmark numbers taken
+before and after a change are comparable.
+"""
+from typing import Dict, List, NamedTuple, Tuple
+import json
+import os
+import random
+from PIL import Image
+
+MANIFEST_NAME = "corpus.json"
+
+# Output format name -> (extension, Pillow format, mode, save options)
+FORMATS: Dict[str, Tuple[str, str, str, dict]] = {
+    'jpeg': ('.jpg', 'JPEG', 'RGB', {'quality': 90}),
+    'png': ('.png', 'PNG', 'RGB', {}),
+    'tiff': ('.tiff', 'TIFF', 'RGB', {'compression': 'tiff_lzw'}),
+    'palette': ('.png', 'PNG', 'P', {}),
+    'rgba': ('.png', 'PNG', 'RGBA', {}),
+}
+
+# Side of the random tile that is upscaled to build each image: large enough
+# to give realistic compressibility, small enough to generate quickly
+_TILE = 48
+
+
+class CorpusSpec(NamedTuple):
+    """Description of a synthetic corpus."""
+    name: str
+    count: int
+    formats: Tuple[str, ...] = ('jpeg', 'png')
+    # Candidate (width, height) sizes, picked at random per image
+    sizes: Tuple[Tuple[int, int], ...] = ((640, 480),)
+    # Directory nesting depth (0 = flat) and subdirectories per level
+    depth: int = 0
+    fanout: int = 10
+    seed: int = 1234
+
+
+# Ready-made corpora, from a quick smoke test to the largest trees
+PROFILES: Dict[str, CorpusSpec] = {
+    'smoke': CorpusSpec('smoke', 24, tuple(FORMATS), ((320, 240), (800, 600))),
+    'mixed': CorpusSpec('mixed', 500, tuple(FORMATS), ((640, 480), (1600, 1200), (3000, 2000))),
+    'photos': CorpusSpec('photos', 200, ('jpeg',), ((2000, 1500), (4000, 3000))),
+    'large': CorpusSpec('large', 6, ('jpeg', 'tiff', 'png'), ((6000, 4000), (10000, 10000))),
+    'nested': CorpusSpec('nested', 10000, ('jpeg', 'png'), ((200, 150),), depth=4, fanout=6),
+    'flat100k': CorpusSpec('flat100k', 100000, ('jpeg',), ((64, 48),)),
+    'nested100k': CorpusSpec('nested100k', 100000, ('jpeg', 'png'), ((64, 48),), depth=5, fanout=8),
+}
+
+
+def relative_path(spec: CorpusSpec, index: int, extension: str) -> str:
+    """Path of the index-th image inside the corpus directory."""
+    parts = []
+    value = index
+    for _ in range(spec.depth):
+        value, digit = divmod(value, spec.fanout)
+        parts.append(f"d{digit:02d}")
+    parts.append(f"img_{index:06d}{extension}")
+    return os.path.join(*parts)
+
+
+def make_image(rng: random.Random, size: Tuple[int, int], mode: str) -> Image.Image:
+    """Build a deterministic image from a random tile."""
+    tile = Image.frombytes('RGB', (_TILE, _TILE), rng.randbytes(_TILE * _TILE * 3))
+    image = tile.resize(size, Image.Resampling.BILINEAR)
+    if mode == 'P':
+        return image.convert('P', palette=Image.Palette.ADAPTIVE, colors=64)
+    if mode == 'RGBA':
+        alpha = Image.linear_gradient('L').resize(size)
+        image.putalpha(alpha)
+    return image
+
+
+def generate_corpus(root: str, spec: CorpusSpec) -> List[str]:
+    """Create the corpus under root, reusing it if it already matches spec.
+
+    Args:
+        root: Directory for the corpus (created if needed)
+        spec: Corpus description
+
+    Returns:
+        Relative paths of the generated images
+    """
+    manifest_path = os.path.join(root, MANIFEST_NAME)
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('spec') == _spec_json(spec):
+            return manifest['files']
+    except (OSError, ValueError):
+        pass
+
+    rng = random.Random(spec.seed)
+    files = []
+    for index in range(spec.count):
+        format_name = spec.formats[rng.randrange(len(spec.formats))]
+        size = spec.sizes[rng.randrange(len(spec.sizes))]
+        extension, pillow_format, mode, options = FORMATS[format_name]
+        relative = relative_path(spec, index, extension)
+        path = os.path.join(root, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        image = make_image(rng, size, mode)
+        image.save(path, pillow_format, **options)
+        files.append(relative)
+
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump({'spec': _spec_json(spec), 'files': files}, f)
+    return files
+
+
+def _spec_json(spec: CorpusSpec) -> list:
+    # Round-trip through JSON so comparisons with a loaded manifest work
+    return json.loads(json.dumps(list(spec)))
@@ -0,0 +1,116 @@
+"""
+Desktop app startup import time.
+
+Imports each GUI entry point in a fresh interpreter with ``-X importtime`` and
+reports the self and cumulative import time of every module, checking the
+total against a budget and that heavy modules are left for first use.
+
+Run ``python -m benchmarks.startup`` from the project root.
+"""
+from typing import Dict, List, Optional, Tuple
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules whose import must not exceed the budget
+ENTRY_POINTS = ('src.app.gui', 'src.gui')
+
+# Seconds allowed to import an entry point (best of the runs)
+BUDGET_SECONDS = 0.5
+
+# Modules only needed after the window is shown (templates, merging, conversion)
+DEFERRED_MODULES = (
+    'pandas', 'numpy', 'PyPDF2',
+    'src.app.pdf_converter', 'src.core.image_processor', 'src.core.pdf_converter',
+)
+
+
+def measure_imports(module: str, python: str = sys.executable) -> Dict[str, Tuple[float, float]]:
+    """Import module in a new interpreter and time every import.
+
+    Args:
+        module: Dotted module name
+        python: Interpreter to run
+
+    Returns:
+        {module: (self seconds, cumulative seconds)} for every module imported
+    """
+    result = subprocess.run(
+        [python, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        name = fields[2].strip()
+        times[name] = (int(fields[0]) / 1e6, int(fields[1]) / 1e6)
+    return times
+
+
+def check_startup(module: str, runs: int = 3, budget: float = BUDGET_SECONDS) -> dict:
+    """Measure an entry point and check it against the budget.
+
+    Args:
+        module: Entry point to import
+        runs: Fresh interpreters to time; the fastest counts (less noise)
+        budget: Seconds allowed
+
+    Returns:
+        Dictionary with seconds, budget, the deferred modules that were
+        imported anyway, the slowest modules and an 'ok' flag
+    """
+    best = None
+    for _ in range(max(1, runs)):
+        times = measure_imports(module)
+        if best is None or times[module][1] < best[module][1]:
+            best = times
+    seconds = best[module][1]
+    loaded = sorted(m for m in DEFERRED_MODULES if m in best)
+    slowest = sorted(best.items(), key=lambda item: item[1][0], reverse=True)[:15]
+    return {
+        'module': module,
+        'seconds': round(seconds, 4),
+        'budget': budget,
+        'deferred_loaded': loaded,
+        'slowest': [
+            {'module': name, 'self': round(own, 4), 'cumulative': round(total, 4)}
+            for name, (own, total) in slowest
+        ],
+        'ok': seconds <= budget and not loaded,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.startup', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--module', action='append', help="Entry point to measure (repeatable, default: the GUIs)")
+    parser.add_argument('--runs', type=int, default=3, help="Runs per entry point; the fastest counts")
+    parser.add_argument('--budget', type=float, default=BUDGET_SECONDS, help="Seconds allowed per entry point")
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    results = [check_startup(m, args.runs, args.budget) for m in args.module or ENTRY_POINTS]
+    for result in results:
+        status = 'ok' if result['ok'] else 'OVER BUDGET'
+        print(f"{result['module']}: {result['seconds']:.3f} s (budget {result['budget']:.3f} s) {status}")
+        if result['deferred_loaded']:
+            print(f"  imported at startup: {', '.join(result['deferred_loaded'])}")
+        for entry in result['slowest'][:10]:
+            print(f"  {entry['self']:.4f} s  {entry['cumulative']:.4f} s  {entry['module']}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0 if all(r['ok'] for r in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,6 +2,7 @@
 Main entry point for the PDF converter application.
 """
 import sys
+import multiprocessing
 from pathlib import Path
 
 # Add src directory to Python path
@@ -15,4 +16,6 @@ def main():
     app.iniciar()
 
 if __name__ == "__main__":
+    # Necesario para el backend de procesos en el ejecutable empaquetado
+    multiprocessing.freeze_support()
     main()
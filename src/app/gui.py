@@ -5,10 +5,11 @@ import customtkinter as ctk
 from tkinter import filedialog, messagebox
 import os
 from datetime import datetime
-from .pdf_converter import PDFConverter
+from src.core.stage_timer import format_report
 from src.core.folder_creator import FolderCreator
 from ..utils.helpers import (
     agregar_detalle, 
+    agregar_detalles,
     actualizar_progreso, 
     generar_nombre_zip,
     validar_directorio
@@ -32,25 +33,52 @@ class ImagenAPdfGUI:
         self.modo_comprimido = ctk.BooleanVar(value=False)
         self.directorio_salida = None
         
-        # Inicializar componentes
-        self.pdf_converter = PDFConverter()
+        # Inicializar componentes (el conversor se crea al usarlo)
+        self._pdf_converter = None
         self.folder_creator = FolderCreator()
         
         # Crear interfaz
         self.crear_widgets()
     
+    @property
+    def pdf_converter(self):
+        """
+        Conversor de imágenes, creado al usarlo por primera vez: importarlo
+        carga Pillow y el resto del motor de conversión, que no hacen falta
+        para mostrar la ventana.
+        """
+        if self._pdf_converter is None:
+            from .pdf_converter import PDFConverter
+            self._pdf_converter = PDFConverter()
+            self._pdf_converter.autoajuste = True
+        return self._pdf_converter
+    
     def crear_widgets(self):
         # Preparar la estructura para agregar pestañas
-        self.notebook = ctk.CTkTabview(self.ventana)
+        self.notebook = ctk.CTkTabview(self.ventana, command=self._al_cambiar_pestaña)
         self.notebook.pack(pady=20, padx=20, fill="both", expand=True)
         
         # Pestañas
         self.pestaña_carpetas = self.notebook.add("Crear Carpetas")
         self.pestaña_principal = self.notebook.add("imagenes a PDFs")
         
-        # Crear contenido
-        self.crear_contenido_pestaña_carpetas()
-        self.crear_contenido_pestaña_principal()
+        # Crear solo el contenido de la pestaña visible; las demás se crean
+        # la primera vez que se seleccionan
+        self._pestañas_pendientes = {
+            "Crear Carpetas": self.crear_contenido_pestaña_carpetas,
+            "imagenes a PDFs": self.crear_contenido_pestaña_principal,
+        }
+        self._construir_pestaña(self.notebook.get())
+    
+    def _al_cambiar_pestaña(self):
+        """Llamado por el notebook al seleccionar una pestaña"""
+        self._construir_pestaña(self.notebook.get())
+    
+    def _construir_pestaña(self, nombre):
+        """Crea el contenido de una pestaña si aún no se ha creado"""
+        construir = self._pestañas_pendientes.pop(nombre, None)
+        if construir is not None:
+            construir()
 
     def crear_contenido_pestaña_carpetas(self):
         """Crear el contenido de la pestaña de creación de carpetas"""
@@ -301,6 +329,11 @@ class ImagenAPdfGUI:
         self.detalles.delete("1.0", "end")
         
         class Callbacks:
+            """
+            Callbacks del conversor. Se llaman desde el hilo de conversión, así
+            que todo cambio en la interfaz se encola en el hilo principal de Tk
+            (en orden) con ventana.after.
+            """
             def __init__(self, gui):
                 self.gui = gui
                 self.started = False
@@ -308,92 +341,91 @@ class ImagenAPdfGUI:
                 self.converted = []
                 self.errors = []
                 
+            def _en_ui(self, funcion, *args):
+                """Ejecuta funcion en el hilo principal de Tk"""
+                self.gui.ventana.after(0, funcion, *args)
+                
+            def _detalle(self, mensaje, tipo="info"):
+                self._en_ui(agregar_detalle, self.gui.detalles, mensaje, tipo)
+                
+            def _estado(self, texto):
+                self._en_ui(lambda: self.gui.lbl_estado.configure(text=texto))
+                
             def on_start(self):
                 """Llamado cuando inicia el proceso"""
                 self.started = True
-                self.gui.lbl_estado.configure(text="Iniciando proceso...")
-                agregar_detalle(
-                    self.gui.detalles,
-                    "Iniciando proceso de conversión..."
-                )
+                self._estado("Iniciando proceso...")
+                self._detalle("Iniciando proceso de conversión...")
+                
+            def on_scan_progress(self, encontradas):
+                """Llamado periódicamente mientras se recorre la carpeta"""
+                self._estado(f"Buscando imágenes... {encontradas} encontradas")
                 
             def on_images_found(self, total):
                 self.files_found = total
-                agregar_detalle(
-                    self.gui.detalles,
-                    f"Se encontraron {total} imágenes"
-                )
+                self._detalle(f"Se encontraron {total} imágenes")
                 
             def on_no_images(self):
-                agregar_detalle(
-                    self.gui.detalles,
-                    "No se encontraron imágenes en la carpeta",
-                    "warning"
-                )
-                self.gui.btn_seleccionar.configure(state="normal")
-                self.gui.procesando = False
+                self._detalle("No se encontraron imágenes en la carpeta", "warning")
                 
-            def on_file_converted(self, nombre):
-                self.converted.append(nombre)
-                actualizar_progreso(
-                    self.gui.barra_progreso,
-                    len(self.converted) / self.files_found if self.files_found > 0 else 0
-                )
-                agregar_detalle(
+            def on_progress_batch(self, lote):
+                """
+                Llamado con los archivos convertidos y fallidos agrupados, como
+                mucho unas pocas veces por segundo (ver PDFConverter.max_actualizaciones)
+                """
+                self._en_ui(self._aplicar_lote, lote)
+                
+            def _aplicar_lote(self, lote):
+                """Muestra un lote de progreso en la interfaz"""
+                self.converted.extend(lote.converted)
+                self.errors.extend(error for _, error in lote.errors)
+                if lote.progress is not None:
+                    actualizar_progreso(self.gui.barra_progreso, lote.progress)
+                agregar_detalles(
                     self.gui.detalles,
-                    f"Convertido: {nombre}"
+                    [f"Convertido: {nombre}" for nombre in lote.converted]
                 )
-                
-            def on_file_error(self, nombre, error):
-                """Llamado cuando hay un error al convertir un archivo"""
-                self.errors.append(error)
-                agregar_detalle(
+                agregar_detalles(
                     self.gui.detalles,
-                    f"Error al convertir {nombre}: {error}",
+                    [f"Error al convertir {nombre}: {error}" for nombre, error in lote.errors],
                     "error"
                 )
+                if lote.omitted:
+                    agregar_detalle(
+                        self.gui.detalles,
+                        f"... y {lote.omitted} archivos más"
+                    )
                 
             def on_error(self, error):
                 self.errors.append(error)
-                agregar_detalle(
-                    self.gui.detalles,
-                    f"Error: {error}",
-                    "error"
-                )
-                
-            def on_progress(self, valor):
-                actualizar_progreso(self.gui.barra_progreso, valor)
+                self._detalle(f"Error: {error}", "error")
                 
             def on_creating_zip(self):
                 """Llamado cuando se está creando el archivo ZIP"""
-                self.gui.lbl_estado.configure(text="Creando archivo ZIP...")
-                agregar_detalle(
-                    self.gui.detalles,
-                    "Creando archivo ZIP con los PDFs..."
-                )
+                self._estado("Creando archivo ZIP...")
+                self._detalle("Creando archivo ZIP con los PDFs...")
+                
+            def on_stage_report(self, informe):
+                """Llamado al final con el tiempo de cada etapa"""
+                self._detalle(f"Tiempos por etapa:\n{format_report(informe)}")
                 
             def on_complete(self, convertidas, total, errores, modo_comprimido):
                 """Llamado cuando se completa todo el proceso"""
                 mensaje = f"Proceso completado. Convertidas {convertidas} de {total} imágenes"
                 if errores > 0:
                     mensaje += f" ({errores} errores)"
-                self.gui.lbl_estado.configure(text=mensaje)
-                agregar_detalle(
-                    self.gui.detalles,
-                    mensaje,
-                    "success"
-                )
+                self._estado(mensaje)
+                self._detalle(mensaje, "success")
                 
             def on_finish(self):
+                self._en_ui(self._terminar)
+                
+            def _terminar(self):
                 self.gui.btn_seleccionar.configure(state="normal")
                 self.gui.procesando = False
                 
             def on_zip_created(self, ruta):
-                agregar_detalle(
-                    self.gui.detalles,
-                    f"\nArchivo ZIP creado: {ruta}",
-                    "success"
-                )
+                self._detalle(f"\nArchivo ZIP creado: {ruta}", "success")
         
         callbacks = Callbacks(self)
         
@@ -1,61 +1,361 @@
+import io
 import os
 import threading
+import time
 from PIL import Image
-import zipfile
 from datetime import datetime
-import tempfile
-import shutil
 import multiprocessing
+from contextlib import nullcontext
+from functools import partial
+from collections import deque
+from itertools import chain, islice
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import NamedTuple, Optional
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
 from ..utils.helpers import agregar_detalle, actualizar_progreso
+from ..core.pdf_writer import jpeg_passthrough_bytes
+from ..core.archive import ARCHIVE_FORMATS, open_archive
+from ..core.incremental import ConversionManifest
+from ..core.conversion_cache import ConversionCache, DEFAULT_MAX_BYTES
+from ..core.scanner import DirectoryScanner, FileCounter
+from ..core.autotune import WorkerAutotuner, default_state_file
+from ..core.progress import CoalescingCallbacks
+from ..core.stage_timer import StageTimer, write_report
+from ..core.memory_governor import MemoryGovernor, ImageTooLargeError, DEFAULT_MAX_PIXELS
+from ..core.image_loader import REDUCTION_GAPS, downscale
+from ..core.pipeline import ordered_map
+
+# Tamaño máximo (ancho, alto) de las imágenes en el PDF
+TAMANO_MAXIMO = (2000, 2000)
+
+
+def _notificar(callbacks, evento, *args):
+    """Llama a un callback opcional solo si el objeto lo implementa"""
+    metodo = getattr(callbacks, evento, None)
+    if metodo is not None:
+        metodo(*args)
+
+
+def _comprobar_cancelacion(cancelado):
+    """Punto seguro de cancelación: interrumpe la tarea si se pidió cancelar"""
+    if cancelado is not None and cancelado():
+        raise InterruptedError("Operación cancelada")
+
+
+def ruta_parcial(ruta_pdf):
+    """Ruta temporal donde se escribe un PDF antes de moverlo a su destino"""
+    ruta_pdf = Path(ruta_pdf)
+    return ruta_pdf.with_name(ruta_pdf.name + '.part')
+
+
+def _etapa(tiempos, nombre):
+    """Mide una etapa del proceso si se pasó un temporizador"""
+    return tiempos.stage(nombre) if tiempos is not None else nullcontext()
+
+
+def generar_pdf(ruta_imagen, modo_redimension='balanced', cancelado=None, tiempos=None):
+    """
+    Genera en memoria el PDF de una imagen.
+    
+    Args:
+        ruta_imagen (str): Ruta completa a la imagen
+        modo_redimension (str): 'quality', 'balanced' o 'fast'; controla cuánto
+            se reduce la imagen en el decodificador antes del LANCZOS final
+        cancelado (callable): Devuelve True si se pidió cancelar; se consulta
+            entre la decodificación, la conversión y la codificación
+        tiempos (StageTimer): Acumula el tiempo de las etapas open,
+            thumbnail, convert y encode
+    
+    Returns:
+        bytes: Contenido del PDF
+    """
+    _comprobar_cancelacion(cancelado)
+    if tiempos is not None:
+        tiempos.add_bytes('open', os.path.getsize(ruta_imagen))
+    
+    # Los JPEG que no necesitan redimensionarse se incrustan sin recodificar
+    with _etapa(tiempos, 'open'):
+        datos = jpeg_passthrough_bytes(ruta_imagen, 100.0, TAMANO_MAXIMO)
+    if datos is not None:
+        if tiempos is not None:
+            tiempos.add_bytes('encode', len(datos))
+        return datos
+    
+    # Abrir y convertir imagen
+    with _etapa(tiempos, 'open'):
+        imagen = Image.open(ruta_imagen)
+    with imagen:
+        # Optimizar memoria para imágenes grandes: los JPEG se decodifican
+        # directamente a escala reducida antes del redimensionado final
+        with _etapa(tiempos, 'thumbnail'):
+            img = downscale(imagen, TAMANO_MAXIMO, modo_redimension)
+        _comprobar_cancelacion(cancelado)
+        
+        # Convertir a RGB si es necesario
+        with _etapa(tiempos, 'convert'):
+            if img.mode in ('RGBA', 'LA', 'P', 'PA'):
+                img = img.convert('RGB')
+            elif img.mode not in ('RGB', 'L'):
+                img = img.convert('RGB')
+        _comprobar_cancelacion(cancelado)
+        
+        # Guardar como PDF con compresión optimizada
+        with _etapa(tiempos, 'encode'):
+            buffer = io.BytesIO()
+            img.save(buffer, 'PDF', resolution=100.0, optimize=True)
+    datos = buffer.getvalue()
+    if tiempos is not None:
+        tiempos.add_bytes('encode', len(datos))
+    return datos
+
+
+def ruta_pdf_relativa(ruta_imagen, directorio_base):
+    """Ruta relativa del PDF de una imagen respecto al directorio base"""
+    ruta_imagen = Path(ruta_imagen)
+    ruta_relativa = ruta_imagen.relative_to(Path(directorio_base))
+    return ruta_relativa.parent / f"{ruta_imagen.stem}.pdf"
+
+
+class OpcionesConversion(NamedTuple):
+    """Ajustes que viajan con cada tarea hacia los workers"""
+    modo_redimension: str = 'balanced'
+    # Directorio de la caché de conversiones (None la desactiva)
+    directorio_cache: Optional[str] = None
+
+
+class ResultadoConversion(NamedTuple):
+    """Resultado de convertir una imagen"""
+    exito: bool
+    nombre: str
+    error: Optional[str] = None
+    # Contenido del PDF cuando se convierte en memoria
+    datos: Optional[bytes] = None
+    # Si el PDF se obtuvo de la caché en lugar de convertirse
+    desde_cache: bool = False
+    # Tiempos por etapa (StageTimer.as_dict) medidos en el worker
+    tiempos: Optional[dict] = None
+
+
+def huella_ajustes(modo_redimension):
+    """Identifica los ajustes que afectan al PDF generado (clave de caché)"""
+    return f"v1|{modo_redimension}|{TAMANO_MAXIMO[0]}x{TAMANO_MAXIMO[1]}|100"
+
+
+def _obtener_pdf(ruta_imagen, opciones, cancelado=None, tiempos=None):
+    """
+    Obtiene el PDF de una imagen desde la caché o convirtiéndola.
+    
+    Returns:
+        tuple: (datos, desde_cache)
+    """
+    if opciones.directorio_cache is None:
+        return generar_pdf(ruta_imagen, opciones.modo_redimension, cancelado, tiempos), False
+    
+    cache = ConversionCache(opciones.directorio_cache)
+    with _etapa(tiempos, 'cache'):
+        clave = cache.make_key(str(ruta_imagen), huella_ajustes(opciones.modo_redimension))
+        datos = cache.get(clave)
+    if datos is not None:
+        return datos, True
+    
+    datos = generar_pdf(ruta_imagen, opciones.modo_redimension, cancelado, tiempos)
+    try:
+        with _etapa(tiempos, 'cache'):
+            cache.put(clave, datos)
+    except OSError:
+        # La caché nunca debe impedir la conversión
+        pass
+    return datos, False
+
+
+def _procesar_imagen(ruta_imagen, directorio_base, directorio_destino, opciones, cancelado=None):
+    """
+    Convierte una imagen a PDF manteniendo la estructura de directorios.
+    
+    Se define a nivel de módulo para que pueda enviarse a los procesos
+    del backend 'processes' (las funciones deben ser serializables).
+    
+    Args:
+        ruta_imagen (str): Ruta completa a la imagen
+        directorio_base (str): Directorio base de las imágenes
+        directorio_destino (str): Directorio donde se guardarán los PDFs, o
+            None para devolver el contenido en memoria
+        opciones (OpcionesConversion): Ajustes de conversión
+        cancelado (callable): Devuelve True si se pidió cancelar (solo con
+            hilos; los procesos se terminan desde fuera)
+    
+    Returns:
+        ResultadoConversion
+    """
+    tiempos = StageTimer()
+    try:
+        ruta_imagen = Path(ruta_imagen)
+        
+        # Obtener la ruta relativa de la imagen respecto al directorio base
+        ruta_relativa = ruta_imagen.relative_to(Path(directorio_base))
+        
+        datos, desde_cache = _obtener_pdf(ruta_imagen, opciones, cancelado, tiempos)
+        if directorio_destino is None:
+            return ResultadoConversion(
+                True, str(ruta_relativa), None, datos, desde_cache, tiempos.as_dict()
+            )
+        
+        # Construir la ruta de destino manteniendo la estructura
+        ruta_pdf = Path(directorio_destino) / ruta_pdf_relativa(ruta_imagen, directorio_base)
+        
+        # Crear directorios intermedios si no existen
+        ruta_pdf.parent.mkdir(parents=True, exist_ok=True)
+        
+        # Escribir en un archivo parcial y moverlo al final, de modo que una
+        # cancelación nunca deje un PDF a medio escribir con el nombre final
+        temporal = ruta_parcial(ruta_pdf)
+        with tiempos.stage('write', len(datos)):
+            temporal.write_bytes(datos)
+            try:
+                _comprobar_cancelacion(cancelado)
+                os.replace(temporal, ruta_pdf)
+            except BaseException:
+                temporal.unlink(missing_ok=True)
+                raise
+        return ResultadoConversion(
+            True, str(ruta_relativa), None, None, desde_cache, tiempos.as_dict()
+        )
+    except Exception as e:
+        return ResultadoConversion(
+            False, str(ruta_imagen.name), str(e), tiempos=tiempos.as_dict()
+        )
+
+
+def _estimar_memoria(presupuesto, ruta_imagen):
+    """
+    Lee la cabecera de una imagen para el presupuesto de memoria.
+    
+    Returns:
+        tuple: (bytes estimados, None) o (None, ImageTooLargeError)
+    """
+    try:
+        return presupuesto.estimate(ruta_imagen), None
+    except ImageTooLargeError as e:
+        return None, e
+
 
 class PDFConverter:
     # Extensiones de imagen soportadas
     EXTENSIONES_SOPORTADAS = {'.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.webp', '.gif', '.heic', '.heif'}
     
-    def __init__(self):
+    # Backends de ejecución disponibles
+    BACKENDS = ('threads', 'processes', 'auto')
+    
+    # Mínimo de imágenes para que 'auto' elija procesos: por debajo de esto
+    # el arranque de los procesos cuesta más de lo que se gana
+    MIN_IMAGENES_PROCESOS = 32
+    
+    def __init__(self, backend='auto', modo_redimension='balanced'):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Backend no soportado: {backend}. Use uno de {self.BACKENDS}")
+        if modo_redimension not in REDUCTION_GAPS:
+            raise ValueError(f"Modo de redimensión no soportado: {modo_redimension}")
         self.procesando = False
         self.directorio_salida = None
         self.cancelar = False
-        # Usar el número de CPUs disponibles o un máximo de 4
+        self.backend = backend
+        # Usar el número de CPUs disponibles o un máximo de 4 (backend de hilos)
         self.max_workers = min(multiprocessing.cpu_count(), 4)
+        # Con procesos no hay GIL que limite, se usan todos los núcleos
+        self.max_workers_procesos = multiprocessing.cpu_count()
+        # Calidad frente a velocidad al reducir imágenes grandes
+        self.modo_redimension = modo_redimension
+        # Escribir las entradas del ZIP en orden alfabético en lugar de
+        # según se completan (más lento si una imagen grande bloquea el orden)
+        self.zip_ordenado = False
+        # Formato del archivo del modo comprimido (ver core.archive.ARCHIVE_FORMATS)
+        self.formato_archivo = 'zip'
+        # Dividir el archivo en volúmenes de como mucho estos bytes (None = uno solo)
+        self.tamano_volumen = None
+        # Modo incremental (solo conversión simple): convertir únicamente las
+        # imágenes nuevas o modificadas desde la última ejecución
+        self.incremental = False
+        # Confirmar cambios por contenido (SHA-256) cuando solo cambia la fecha
+        self.incremental_hash = False
+        # Eliminar los PDFs generados cuya imagen de origen ya no existe
+        self.eliminar_huerfanos = False
+        # Caché de conversiones compartida entre trabajos (None la desactiva);
+        # ver core.conversion_cache.default_cache_dir para la ruta habitual
+        self.directorio_cache = None
+        self.limite_cache = DEFAULT_MAX_BYTES
+        # Hilos que leen por adelantado las cabeceras de las imágenes para
+        # el presupuesto de memoria (en unidades de red la lectura domina)
+        self.hilos_cabeceras = 8
+        # Tareas en vuelo como máximo (None = 4 por worker); acota la memoria
+        # usada en árboles con cientos de miles de imágenes
+        self.ventana_envio = None
+        # Ajustar el número de workers midiendo el rendimiento al inicio de
+        # cada ejecución; el mejor valor se guarda para la próxima vez
+        self.autoajuste = False
+        self.archivo_autoajuste = default_state_file()
+        # Presupuesto de memoria para las imágenes que se decodifican a la vez
+        # (None = la mitad de la RAM); las imágenes grandes esperan turno
+        self.limite_memoria = None
+        # Las imágenes con más píxeles se rechazan como bombas de descompresión
+        self.max_pixeles = DEFAULT_MAX_PIXELS
+        # Cada cuánto (segundos) se revisa la cancelación mientras se espera
+        # a que termine una conversión; acota la latencia de cancelar
+        self.intervalo_cancelacion = 0.05
+        # Segundos entre cancelar_proceso() y el fin de la ejecución cancelada
+        self.latencia_cancelacion = None
+        self._instante_cancelacion = None
+        # Máximo de actualizaciones por segundo para callbacks que reciben
+        # el progreso agrupado (on_progress_batch)
+        self.max_actualizaciones = 10.0
+        # Desglose de tiempos por etapa de la última ejecución completada
+        # (ver core.stage_timer.StageTimer.report) y, si se indica, archivo
+        # JSON donde guardarlo
+        self.ultimo_informe = None
+        self.archivo_informe = None
         
     def es_imagen_valida(self, ruta):
         """Verifica si un archivo es una imagen válida basado en su extensión"""
         return Path(ruta).suffix.lower() in self.EXTENSIONES_SOPORTADAS
     
+    def iterar_imagenes(self, directorio, patron="*", al_progresar=None):
+        """
+        Recorre el directorio y subdirectorios entregando las imágenes una a una.
+        
+        El orden coincide con el de ordenar todas las rutas, pero la primera
+        imagen está disponible sin esperar a que termine el recorrido.
+        
+        Args:
+            directorio (str): Ruta al directorio a buscar
+            patron (str): Patrón para filtrar archivos (por defecto "*")
+            al_progresar (callable): Recibe periódicamente la cantidad de
+                imágenes encontradas hasta el momento
+            
+        Yields:
+            Path: Ruta de cada imagen encontrada
+        """
+        for ruta in self._crear_scanner(patron, al_progresar).iter_files(str(directorio)):
+            yield Path(ruta)
+    
+    def _crear_scanner(self, patron="*", al_progresar=None):
+        """Recorrido de las imágenes soportadas que cumplen el patrón"""
+        return DirectoryScanner(
+            extensions=self.EXTENSIONES_SOPORTADAS,
+            pattern=patron,
+            progress_callback=al_progresar
+        )
+    
     def encontrar_imagenes(self, directorio, patron="*"):
         """
-        Encuentra todas las imágenes en el directorio y subdirectorios usando pathlib.
+        Encuentra todas las imágenes en el directorio y subdirectorios.
         
         Args:
             directorio (str): Ruta al directorio a buscar
             patron (str): Patrón para filtrar archivos (por defecto "*")
             
         Returns:
-            list: Lista de rutas de imágenes encontradas
+            list: Lista ordenada de rutas de imágenes encontradas
         """
-        ruta = Path(directorio)
-        imagenes = set()  # Usar set para evitar duplicados
-        
-        # Buscar todos los archivos recursivamente
-        for archivo in ruta.rglob("*"):
-            if archivo.is_file() and archivo.suffix.lower() in self.EXTENSIONES_SOPORTADAS:
-                imagenes.add(archivo)
-        
-        # Convertir a lista y ordenar
-        imagenes = sorted(imagenes)
-        
-        # Filtrar por patrón personalizado si es necesario
-        if patron and patron != "*":
-            from fnmatch import fnmatch
-            imagenes = [
-                img for img in imagenes 
-                if fnmatch(img.name.lower(), patron.lower())
-            ]
-        
-        return imagenes
+        return list(self.iterar_imagenes(directorio, patron))
     
     def convertir_imagen(self, ruta_imagen, directorio_base, directorio_destino):
         """
@@ -66,134 +366,476 @@ class PDFConverter:
             directorio_base (str): Directorio base de las imágenes
             directorio_destino (str): Directorio donde se guardarán los PDFs
         """
-        try:
-            # Convertir rutas a Path
-            ruta_imagen = Path(ruta_imagen)
-            directorio_base = Path(directorio_base)
-            directorio_destino = Path(directorio_destino)
-            
-            # Obtener la ruta relativa de la imagen respecto al directorio base
-            ruta_relativa = ruta_imagen.relative_to(directorio_base)
-            
-            # Construir la ruta de destino manteniendo la estructura
-            ruta_pdf = directorio_destino / ruta_relativa.parent / f"{ruta_imagen.stem}.pdf"
-            
-            # Crear directorios intermedios si no existen
-            ruta_pdf.parent.mkdir(parents=True, exist_ok=True)
-            
-            # Abrir y convertir imagen
-            with Image.open(ruta_imagen) as img:
-                # Optimizar memoria para imágenes grandes
-                if img.size[0] > 2000 or img.size[1] > 2000:
-                    img.thumbnail((2000, 2000), Image.Resampling.LANCZOS)
-                
-                # Convertir a RGB si es necesario
-                if img.mode in ('RGBA', 'LA', 'P', 'PA'):
-                    img = img.convert('RGB')
-                elif img.mode not in ('RGB', 'L'):
-                    img = img.convert('RGB')
-                
-                # Guardar como PDF con compresión optimizada
-                img.save(str(ruta_pdf), 'PDF', resolution=100.0, optimize=True)
-            return True, str(ruta_relativa), None
-        except Exception as e:
-            return False, str(ruta_imagen.name), str(e)
+        resultado = _procesar_imagen(
+            ruta_imagen, directorio_base, directorio_destino, self._opciones()
+        )
+        return resultado.exito, resultado.nombre, resultado.error
+    
+    def convertir_imagen_en_memoria(self, ruta_imagen, directorio_base):
+        """
+        Convierte una imagen a PDF devolviendo el contenido en memoria.
+        
+        Args:
+            ruta_imagen (str): Ruta completa a la imagen
+            directorio_base (str): Directorio base de las imágenes
+            
+        Returns:
+            tuple: (exito, nombre, error, datos)
+        """
+        resultado = _procesar_imagen(ruta_imagen, directorio_base, None, self._opciones())
+        return resultado.exito, resultado.nombre, resultado.error, resultado.datos
+    
+    def convertir_rutas(self, executor, rutas, directorio_base, directorio_destino=None, cancelado=None):
+        """
+        Envía la conversión de varias imágenes a un pool del llamador.
+        
+        El pool no se detiene al terminar: quien lo creó (con crear_executor)
+        decide cuándo hacerlo, así puede reutilizarse entre llamadas.
+        
+        Args:
+            executor (Executor): Pool de hilos o procesos donde convertir
+            rutas (iterable): Rutas de las imágenes
+            directorio_base (str): Directorio base de las imágenes
+            directorio_destino (str): Directorio de los PDFs (None los
+                devuelve en memoria)
+            cancelado (callable): Devuelve True si se pidió cancelar; solo
+                con hilos, no se puede enviar a otro proceso
+            
+        Returns:
+            dict: {futuro: ruta}; cada futuro devuelve un ResultadoConversion
+        """
+        convertir = partial(_procesar_imagen, opciones=self._opciones())
+        if cancelado is not None:
+            convertir = partial(convertir, cancelado=cancelado)
+        return {
+            executor.submit(convertir, str(ruta), directorio_base, directorio_destino): ruta
+            for ruta in rutas
+        }
+    
+    def _opciones(self):
+        """Ajustes de conversión que se envían a los workers"""
+        return OpcionesConversion(self.modo_redimension, self.directorio_cache)
+    
+    def resolver_backend(self, total_imagenes):
+        """
+        Determina el backend efectivo para un lote de imágenes.
+        
+        'auto' usa procesos cuando hay varios núcleos y suficientes imágenes
+        para amortizar el arranque de los procesos; en otro caso usa hilos.
+        
+        Args:
+            total_imagenes (int): Número de imágenes a convertir
+            
+        Returns:
+            str: 'threads' o 'processes'
+        """
+        if self.backend != 'auto':
+            return self.backend
+        if multiprocessing.cpu_count() > 2 and total_imagenes >= self.MIN_IMAGENES_PROCESOS:
+            return 'processes'
+        return 'threads'
+    
+    def num_workers(self, backend):
+        """Workers configurados para el backend indicado"""
+        return self.max_workers_procesos if backend == 'processes' else self.max_workers
+    
+    def crear_executor(self, backend, max_workers=None):
+        """Crea el pool de ejecución para el backend indicado"""
+        max_workers = max_workers or self.num_workers(backend)
+        if backend == 'processes':
+            # 'spawn' se comporta igual en Windows, Linux y en el ejecutable
+            contexto = multiprocessing.get_context('spawn')
+            return ProcessPoolExecutor(max_workers=max_workers, mp_context=contexto)
+        return ThreadPoolExecutor(max_workers=max_workers)
+    
+    def _crear_ajustador(self, backend):
+        """
+        Crea el autoajuste de workers para el backend indicado.
+        
+        El pool se crea con el máximo de workers y el ajustador limita cuántas
+        tareas hay en vuelo, que es lo que fija la concurrencia real.
+        """
+        return WorkerAutotuner(
+            maximum=multiprocessing.cpu_count(),
+            initial=self.num_workers(backend),
+            key=backend,
+            state_file=self.archivo_autoajuste
+        )
     
     def procesar_carpeta(self, directorio, modo_comprimido, callbacks, patron="*"):
-        """Procesa todas las imágenes en la carpeta usando un thread pool"""
-        temp_dir = None
+        """
+        Procesa todas las imágenes en la carpeta usando un pool de hilos o procesos.
+        
+        El recorrido del directorio y la conversión avanzan a la vez: cada
+        imagen encontrada se envía al pool en cuanto hay hueco en una ventana
+        acotada de tareas en curso, así la memoria no crece con el tamaño del
+        árbol y la primera conversión empieza sin esperar a terminar el
+        recorrido. Mientras se recorre se informa el callback opcional
+        on_scan_progress(encontradas). Como la ventana frena el recorrido, un
+        segundo recorrido en segundo plano solo cuenta las imágenes:
+        on_images_found se llama con ese total en cuanto se conoce (o al
+        terminar el recorrido, si llega antes) y el progreso se informa a
+        partir de ese momento; si el árbol cambió entretanto se vuelve a
+        llamar con el total real.
+        
+        En modo comprimido los PDFs se generan en memoria y se agregan al
+        archivo (formato_archivo: ZIP, tar o tar.gz) conforme se completan,
+        sin pasar por un directorio temporal. Con tamano_volumen el archivo se
+        divide en volúmenes independientes; si hay más de uno se informan con
+        el callback opcional on_volumes_created(rutas) tras on_zip_created.
+        
+        En modo incremental las imágenes con un PDF al día se omiten y se
+        notifican con el callback opcional on_files_skipped(cantidad). Con la
+        caché activa se informa on_cache_stats(aciertos, fallos) antes de
+        on_complete.
+        
+        Antes de enviar cada imagen se lee su cabecera para estimar la memoria
+        que necesita decodificarla; si no cabe en el presupuesto libre espera
+        a que terminen otras, y las que superan max_pixeles se informan como
+        error sin abrirlas.
+        
+        Si callbacks implementa on_progress_batch(lote), los eventos por
+        archivo (on_file_converted, on_file_error y on_progress) no se llaman
+        uno a uno: se agrupan en un core.progress.ProgressBatch que se entrega
+        como mucho max_actualizaciones veces por segundo.
+        
+        Al terminar se informa el callback opcional on_stage_report(informe)
+        con el tiempo y los bytes de cada etapa (scan, cache, open, thumbnail,
+        convert, encode, write, zip), antes de on_complete.
+        """
+        archivo_zip = None
+        manifiesto = None
+        lotes = None
+        if hasattr(callbacks, 'on_progress_batch'):
+            callbacks = lotes = CoalescingCallbacks(callbacks, self.max_actualizaciones)
         try:
             self.procesando = True
             self.cancelar = False
+            self._instante_cancelacion = None
+            self.latencia_cancelacion = None
             callbacks.on_start()
             
-            # Crear directorio temporal si es modo comprimido
-            if modo_comprimido:
-                temp_dir = tempfile.mkdtemp()
+            convertidas = 0
+            errores = 0
+            omitidas = 0
+            aciertos_cache = 0
+            total_imagenes = None
+            encontradas = 0
             
-            # Encontrar todas las imágenes usando pathlib
-            imagenes = self.encontrar_imagenes(directorio, patron)
+            if self.incremental and not modo_comprimido:
+                # La misma huella que la caché: cualquier ajuste que cambie el
+                # PDF deja de considerar al día los convertidos antes
+                manifiesto = ConversionManifest(
+                    directorio, huella_ajustes(self.modo_redimension), self.incremental_hash
+                )
+                if self.eliminar_huerfanos:
+                    for ruta in manifiesto.remove_orphans():
+                        _notificar(callbacks, 'on_orphan_removed', ruta)
             
-            if not imagenes:
-                callbacks.on_no_images()
-                return
+            # En modo comprimido los PDFs vuelven en memoria (sin destino)
+            directorio_destino = None if modo_comprimido else directorio
+            extension = ARCHIVE_FORMATS.get(self.formato_archivo)
+            if modo_comprimido and extension is None:
+                raise ValueError(f"Formato de archivo no soportado: {self.formato_archivo}")
+            zip_path = self.directorio_salida or Path(directorio) / f"PDFs_{datetime.now().strftime('%Y%m%d_%H%M%S')}{extension}"
             
-            total_imagenes = len(imagenes)
-            callbacks.on_images_found(total_imagenes)
-            convertidas = 0
-            errores = 0
+            # La función de módulo y las opciones son serializables, de modo
+            # que sirven igual para hilos y para procesos
+            convertir = partial(_procesar_imagen, opciones=self._opciones())
             
-            # Directorio de destino para PDFs
-            directorio_destino = temp_dir if modo_comprimido else directorio
-            
-            # Procesar imágenes en paralelo
-            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                # Crear futuras para cada imagen
-                futuros = {
-                    executor.submit(
-                        self.convertir_imagen, 
-                        str(img), 
-                        directorio,  # directorio base original
-                        directorio_destino
-                    ): img 
-                    for img in imagenes
-                }
-                
-                # Procesar resultados conforme se completan
-                for futuro in as_completed(futuros):
-                    if self.cancelar:
-                        break
+            # 'auto' decide con las primeras imágenes: si el recorrido termina
+            # antes del umbral el lote es pequeño y bastan hilos
+            recorrido = self.iterar_imagenes(
+                directorio, patron,
+                lambda cantidad: _notificar(callbacks, 'on_scan_progress', cantidad)
+            )
+            temporizador = StageTimer()
+            with temporizador.stage('scan'):
+                primeras = list(islice(recorrido, self.MIN_IMAGENES_PROCESOS))
+            backend = self.resolver_backend(len(primeras))
+            descubrimiento = chain(primeras, recorrido)
+            # Con pocas imágenes el recorrido ya terminó y no hace falta contar
+            conteo = None
+            total_estimado = None
+            if len(primeras) == self.MIN_IMAGENES_PROCESOS:
+                conteo = FileCounter(self._crear_scanner(patron), str(directorio))
+            if backend == 'threads':
+                # Los hilos comparten memoria y pueden consultar la bandera en
+                # puntos seguros; los procesos se terminan al cancelar
+                convertir = partial(convertir, cancelado=lambda: self.cancelar)
+            executor = None
+            en_curso = {}
+            # Imágenes que esperan a que haya memoria libre para ellas
+            diferidas = deque()
+            presupuesto = MemoryGovernor(self.limite_memoria, self.max_pixeles)
+            ajustador = self._crear_ajustador(backend) if self.autoajuste else None
+            
+            def candidatas():
+                """Imágenes por convertir, con su índice y su estado"""
+                nonlocal encontradas, omitidas
+                while True:
+                    with temporizador.stage('scan'):
+                        img = next(descubrimiento, None)
+                    if img is None:
+                        return
+                    indice = encontradas
+                    encontradas += 1
+                    
+                    # Descartar las imágenes cuyo PDF ya está al día
+                    estado = None
+                    if manifiesto:
+                        estado = img.stat()
+                        ruta_pdf = Path(directorio) / ruta_pdf_relativa(img, directorio)
+                        if manifiesto.is_up_to_date(str(img), str(ruta_pdf), estado):
+                            omitidas += 1
+                            continue
+                    yield indice, img, estado
+            
+            # Las cabeceras se leen en paralelo y por adelantado, para que
+            # leerlas una a una no frene el envío de trabajo al pool
+            cabeceras = ordered_map(
+                lambda candidata: _estimar_memoria(presupuesto, candidata[1]),
+                candidatas(), self.hilos_cabeceras
+            )
+            
+            def ocupadas():
+                # Los PDFs que esperan en el archivo (en modo ordenado, a uno
+                # anterior aún en curso) también ocupan la ventana; sin nada
+                # en curso no esperan a nadie y no deben bloquearla
+                en_espera = archivo_zip.pending_entries if archivo_zip is not None and en_curso else 0
+                return len(en_curso) + en_espera
+            
+            try:
+                while True:
+                    limite = ajustador.current if ajustador else self.tamano_ventana(backend)
+                    
+                    # El conteo en segundo plano da el total antes de que
+                    # termine el recorrido
+                    if total_imagenes is None and total_estimado is None and conteo and conteo.total:
+                        total_estimado = conteo.total
+                        callbacks.on_images_found(total_estimado)
+                        callbacks.on_progress(min(1.0, (convertidas + errores + omitidas) / total_estimado))
+                    
+                    # Enviar primero las imágenes diferidas que ya caben
+                    while (diferidas and not self.cancelar and ocupadas() < limite
+                           and presupuesto.try_reserve(diferidas[0][3])):
+                        indice, img, estado, reserva = diferidas.popleft()
+                        futuro = executor.submit(convertir, str(img), directorio, directorio_destino)
+                        en_curso[futuro] = (indice, img, estado, reserva)
+                    
+                    # Llenar la ventana de tareas en curso con nuevas imágenes
+                    while total_imagenes is None and not self.cancelar:
+                        if executor is not None and ocupadas() + len(diferidas) >= limite:
+                            break
+                        siguiente = next(cabeceras, None)
+                        if siguiente is None:
+                            total_imagenes = encontradas
+                            if encontradas:
+                                if total_imagenes != total_estimado:
+                                    callbacks.on_images_found(total_imagenes)
+                                if omitidas:
+                                    _notificar(callbacks, 'on_files_skipped', omitidas)
+                                callbacks.on_progress((convertidas + errores + omitidas) / total_imagenes)
+                            break
+                        (indice, img, estado), (reserva, error) = siguiente
                         
-                    ruta_imagen = futuros[futuro]
-                    try:
-                        exito, nombre, error = futuro.result()
-                        if exito:
-                            convertidas += 1
-                            callbacks.on_file_converted(nombre)
-                        else:
+                        if executor is None:
+                            executor = self.crear_executor(
+                                backend, ajustador.maximum if ajustador else None
+                            )
+                        if modo_comprimido and archivo_zip is None:
+                            archivo_zip = open_archive(
+                                str(zip_path), self.formato_archivo,
+                                ordered=self.zip_ordenado, max_volume_bytes=self.tamano_volumen
+                            )
+                        
+                        # Imágenes que superan max_pixeles según su cabecera
+                        if error is not None:
+                            if archivo_zip:
+                                archivo_zip.skip(indice)
+                            errores += 1
+                            callbacks.on_file_error(img.name, str(error))
+                            continue
+                        
+                        if diferidas or not presupuesto.try_reserve(reserva):
+                            diferidas.append((indice, img, estado, reserva))
+                            continue
+                        futuro = executor.submit(convertir, str(img), directorio, directorio_destino)
+                        en_curso[futuro] = (indice, img, estado, reserva)
+                    
+                    if self.cancelar or not en_curso:
+                        if total_imagenes is not None or self.cancelar:
+                            break
+                        continue
+                    
+                    # Procesar resultados conforme se completan
+                    # Con tiempo límite, para notar la cancelación sin esperar
+                    # a que termine una imagen grande
+                    terminados, _ = wait(
+                        en_curso, timeout=self.intervalo_cancelacion,
+                        return_when=FIRST_COMPLETED
+                    )
+                    for futuro in terminados:
+                        indice, ruta_imagen, estado, reserva = en_curso.pop(futuro)
+                        presupuesto.release(reserva)
+                        try:
+                            exito, nombre, error, datos, desde_cache, tiempos = futuro.result()
+                            temporizador.merge(tiempos)
+                            if exito:
+                                if desde_cache:
+                                    aciertos_cache += 1
+                                if manifiesto:
+                                    ruta_pdf = Path(directorio) / ruta_pdf_relativa(ruta_imagen, directorio)
+                                    manifiesto.record(str(ruta_imagen), str(ruta_pdf), estado)
+                                if archivo_zip:
+                                    # Mantener la estructura de directorios en el ZIP
+                                    arcname = ruta_pdf_relativa(ruta_imagen, directorio).as_posix()
+                                    archivo_zip.add(arcname, datos, indice)
+                                convertidas += 1
+                                callbacks.on_file_converted(nombre)
+                            else:
+                                if archivo_zip:
+                                    archivo_zip.skip(indice)
+                                errores += 1
+                                callbacks.on_file_error(nombre, error)
+                            
+                        except Exception as e:
+                            if archivo_zip:
+                                archivo_zip.skip(indice)
                             errores += 1
-                            callbacks.on_file_error(nombre, error)
+                            nombre = Path(ruta_imagen).name
+                            callbacks.on_file_error(nombre, str(e))
                         
-                        # Actualizar progreso
-                        progreso = (convertidas + errores) / total_imagenes
-                        callbacks.on_progress(progreso)
+                        # Actualizar progreso (cuando ya se conoce el total)
+                        total_progreso = total_imagenes or total_estimado
+                        if total_progreso:
+                            progreso = min(1.0, (convertidas + errores + omitidas) / total_progreso)
+                            callbacks.on_progress(progreso)
                         
-                    except Exception as e:
-                        errores += 1
-                        nombre = Path(ruta_imagen).name
-                        callbacks.on_file_error(nombre, str(e))
+                        if ajustador and ajustador.record():
+                            _notificar(callbacks, 'on_workers_adjusted', ajustador.current)
+                    
+                    # Entregar el progreso agrupado aunque no lleguen resultados
+                    if lotes:
+                        lotes.poll()
+            finally:
+                if conteo is not None:
+                    conteo.stop()
+                cabeceras.close()
+                recorrido.close()
+                if executor is not None:
+                    if self.cancelar:
+                        self.detener_executor(executor, backend, en_curso)
+                    else:
+                        executor.shutdown(wait=True)
             
-            # Si se canceló, limpiar y salir
+            # Si se canceló, eliminar el ZIP parcial, los PDFs a medio escribir y salir
             if self.cancelar:
-                if temp_dir and os.path.exists(temp_dir):
-                    shutil.rmtree(temp_dir)
+                if archivo_zip:
+                    archivo_zip.abort()
+                    archivo_zip = None
+                if directorio_destino is not None:
+                    for _, ruta_imagen, _, _ in en_curso.values():
+                        ruta_pdf = Path(directorio_destino) / ruta_pdf_relativa(ruta_imagen, directorio)
+                        ruta_parcial(ruta_pdf).unlink(missing_ok=True)
+                if self._instante_cancelacion is not None:
+                    self.latencia_cancelacion = time.monotonic() - self._instante_cancelacion
+                    _notificar(callbacks, 'on_cancelled', self.latencia_cancelacion)
                 return
             
-            # Crear ZIP si es necesario
-            if modo_comprimido and temp_dir:
+            if not total_imagenes:
+                callbacks.on_no_images()
+                return
+            
+            # Recordar el mejor número de workers para la próxima ejecución
+            if ajustador:
+                try:
+                    ajustador.save()
+                except OSError:
+                    pass
+            
+            # Informar el uso de la caché y mantenerla dentro de su límite
+            if self.directorio_cache is not None:
+                _notificar(callbacks, 'on_cache_stats', aciertos_cache, convertidas - aciertos_cache)
+                ConversionCache(self.directorio_cache, self.limite_cache).trim()
+            
+            # Terminar de escribir el ZIP si es necesario
+            if archivo_zip:
                 callbacks.on_creating_zip()
-                zip_path = self.directorio_salida or Path(directorio) / f"PDFs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
-                
-                with zipfile.ZipFile(str(zip_path), 'w', zipfile.ZIP_DEFLATED) as zipf:
-                    temp_path = Path(temp_dir)
-                    for pdf in temp_path.rglob('*.pdf'):
-                        # Mantener la estructura de directorios en el ZIP
-                        arcname = pdf.relative_to(temp_path)
-                        zipf.write(pdf, arcname)
-                
-                callbacks.on_zip_created(str(zip_path))
-                
-                # Limpiar directorio temporal
-                shutil.rmtree(temp_dir)
+                archivo_zip.close()
+                temporizador.add(
+                    'zip', archivo_zip.write_seconds,
+                    archivo_zip.bytes_written, archivo_zip.entries_written
+                )
+                volumenes = archivo_zip.paths
+                archivo_zip = None
+                callbacks.on_zip_created(volumenes[0])
+                if len(volumenes) > 1:
+                    _notificar(callbacks, 'on_volumes_created', volumenes)
+            
+            # Desglose de tiempos por etapa
+            self.ultimo_informe = temporizador.report(
+                engine='app.pdf_converter',
+                backend=backend,
+                compressed=modo_comprimido,
+                images=total_imagenes,
+                converted=convertidas,
+                errors=errores,
+                skipped=omitidas,
+                cache_hits=aciertos_cache
+            )
+            if self.archivo_informe:
+                try:
+                    write_report(self.ultimo_informe, self.archivo_informe)
+                except OSError as e:
+                    _notificar(callbacks, 'on_error', f"No se pudo guardar el informe de tiempos: {e}")
+            _notificar(callbacks, 'on_stage_report', self.ultimo_informe)
             
             callbacks.on_complete(convertidas, total_imagenes, errores, modo_comprimido)
             
         except Exception as e:
+            if archivo_zip:
+                archivo_zip.abort()
             callbacks.on_error(str(e))
         finally:
+            # Guardar lo convertido aunque se cancele, para retomar después
+            if manifiesto:
+                try:
+                    manifiesto.save()
+                except OSError as e:
+                    _notificar(callbacks, 'on_error', f"No se pudo guardar el manifiesto: {e}")
             self.procesando = False
             callbacks.on_finish()
     
+    def tamano_ventana(self, backend):
+        """Máximo de tareas enviadas al pool y aún sin procesar"""
+        if self.ventana_envio:
+            return self.ventana_envio
+        return self.num_workers(backend) * 4
+    
+    def detener_executor(self, executor, backend, en_curso):
+        """
+        Detiene el pool sin esperar a las tareas pendientes.
+        
+        Las tareas en cola se cancelan; con hilos las que están en curso se
+        detienen solas en el siguiente punto seguro y con procesos los
+        workers se terminan.
+        """
+        for futuro in en_curso:
+            futuro.cancel()
+        if backend == 'processes':
+            terminar = getattr(executor, 'terminate_workers', None)
+            if terminar is not None:
+                terminar()
+                return
+            # Python < 3.14 no expone terminate_workers()
+            procesos = getattr(executor, '_processes', None) or {}
+            for proceso in list(procesos.values()):
+                proceso.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+    
     def cancelar_proceso(self):
         """Cancela el proceso actual"""
+        if not self.cancelar:
+            self._instante_cancelacion = time.monotonic()
         self.cancelar = True
@@ -0,0 +1,209 @@
+"""
+Modo vigilancia: convierte a PDF las imágenes conforme llegan a una carpeta.
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+from pathlib import Path
+from PIL import Image
+from .pdf_converter import _notificar, huella_ajustes, ruta_parcial, ruta_pdf_relativa
+from ..core.incremental import ConversionManifest
+from ..core.memory_governor import MemoryGovernor, ImageTooLargeError
+from ..core.watcher import FolderWatcher
+
+
+def _calentar():
+    """Tarea vacía que obliga a arrancar un worker y cargar los módulos de imagen"""
+    Image.init()
+    return os.getpid()
+
+
+class VigilanteCarpeta:
+    """
+    Vigila una carpeta y convierte cada imagen nueva o modificada en cuanto
+    termina de escribirse.
+
+    Los PDFs se crean junto a las imágenes y se registran en el mismo
+    manifiesto que el modo incremental de PDFConverter, de modo que una
+    conversión manual posterior no repite el trabajo y al arrancar solo se
+    convierten las imágenes que llegaron mientras el vigilante no corría.
+    El pool de workers se crea (y con procesos se arranca) una sola vez, así
+    cada imagen nueva empieza a convertirse sin coste de arranque.
+
+    Callbacks opcionales: on_watch_started(backend), on_file_converted(nombre),
+    on_file_error(nombre, error), on_error(mensaje) y on_watch_stopped().
+    """
+
+    def __init__(self, converter, directorio, patron="*", espera=1.0, intervalo_sondeo=2.0):
+        """
+        Args:
+            converter (PDFConverter): Ajustes de conversión (backend, workers,
+                redimensión, caché, presupuesto de memoria)
+            directorio (str): Carpeta a vigilar, incluidas sus subcarpetas
+            patron (str): Patrón para filtrar archivos (por defecto "*")
+            espera (float): Segundos sin cambios tras los que una imagen se
+                considera completamente escrita
+            intervalo_sondeo (float): Segundos entre revisiones cuando no se
+                dispone de inotify
+        """
+        self.converter = converter
+        # Absoluta como las rutas que informa FolderWatcher
+        self.directorio = os.path.abspath(directorio)
+        self.patron = patron
+        self.espera = espera
+        self.intervalo_sondeo = intervalo_sondeo
+        # Cada cuánto (segundos) se revisan cambios y resultados; acota la
+        # latencia de detener()
+        self.intervalo = 0.2
+        # Segundos entre guardados del manifiesto mientras hay trabajo
+        self.intervalo_guardado = 5.0
+        self.convertidas = 0
+        self.errores = 0
+        # 'inotify' o 'polling' una vez iniciado
+        self.backend_vigilancia = None
+        self._detenido = threading.Event()
+
+    def detener(self):
+        """Pide terminar; ejecutar() vuelve tras detener las conversiones en curso"""
+        self._detenido.set()
+
+    @property
+    def detenido(self):
+        return self._detenido.is_set()
+
+    def _backend(self):
+        """Backend de ejecución: un proceso largo amortiza siempre el arranque de los procesos"""
+        return self.converter.resolver_backend(self.converter.MIN_IMAGENES_PROCESOS)
+
+    def ejecutar(self, callbacks):
+        """
+        Convierte las imágenes pendientes y vigila la carpeta hasta detener().
+
+        Args:
+            callbacks: Objeto con los callbacks opcionales de la clase
+        """
+        converter = self.converter
+        directorio = self.directorio
+        manifiesto = ConversionManifest(
+            directorio, huella_ajustes(converter.modo_redimension), converter.incremental_hash
+        )
+        backend = self._backend()
+        # Con procesos no se puede consultar la bandera; se terminan al detener
+        cancelado = self._detenido.is_set if backend == 'threads' else None
+        presupuesto = MemoryGovernor(converter.limite_memoria, converter.max_pixeles)
+        limite = converter.tamano_ventana(backend)
+
+        # Vigilar antes de revisar lo existente, para no perder lo que llegue
+        # mientras tanto (si se ve dos veces, el manifiesto lo descarta)
+        vigilante = FolderWatcher(
+            directorio, converter.EXTENSIONES_SOPORTADAS, self.patron,
+            self.espera, self.intervalo_sondeo
+        )
+        self.backend_vigilancia = vigilante.backend
+        executor = converter.crear_executor(backend)
+
+        pendientes = deque(str(ruta) for ruta in converter.iterar_imagenes(directorio, self.patron))
+        en_cola = set(pendientes)
+        en_curso = {}
+        activas = set()
+        # Imágenes que cambiaron mientras se convertían: se repiten al terminar
+        repetir = set()
+        sin_guardar = False
+        ultimo_guardado = time.monotonic()
+
+        try:
+            if backend == 'processes':
+                # Arrancar todos los workers antes de que llegue la primera imagen
+                workers = converter.num_workers(backend)
+                wait([executor.submit(_calentar) for _ in range(workers)])
+            _notificar(callbacks, 'on_watch_started', vigilante.backend)
+
+            while not self._detenido.is_set():
+                espera = 0 if en_curso or pendientes else self.intervalo
+                for ruta in vigilante.poll(espera):
+                    if ruta not in en_cola:
+                        en_cola.add(ruta)
+                        pendientes.append(ruta)
+
+                # Enviar las imágenes que no están al día mientras haya hueco
+                while pendientes and len(en_curso) < limite and not self._detenido.is_set():
+                    ruta = pendientes.popleft()
+                    en_cola.discard(ruta)
+                    if ruta in activas:
+                        repetir.add(ruta)
+                        continue
+                    try:
+                        estado = os.stat(ruta)
+                    except OSError:
+                        continue
+                    ruta_pdf = Path(directorio) / ruta_pdf_relativa(ruta, directorio)
+                    if manifiesto.is_up_to_date(ruta, str(ruta_pdf), estado):
+                        continue
+                    try:
+                        reserva = presupuesto.estimate(ruta)
+                    except ImageTooLargeError as e:
+                        self.errores += 1
+                        _notificar(callbacks, 'on_file_error', os.path.basename(ruta), str(e))
+                        continue
+                    if not presupuesto.try_reserve(reserva):
+                        pendientes.appendleft(ruta)
+                        en_cola.add(ruta)
+                        break
+                    for futuro in converter.convertir_rutas(executor, [ruta], directorio, directorio, cancelado):
+                        en_curso[futuro] = (ruta, estado, reserva)
+                    activas.add(ruta)
+
+                if en_curso:
+                    terminados, _ = wait(en_curso, timeout=self.intervalo, return_when=FIRST_COMPLETED)
+                    for futuro in terminados:
+                        ruta, estado, reserva = en_curso.pop(futuro)
+                        activas.discard(ruta)
+                        presupuesto.release(reserva)
+                        try:
+                            exito, nombre, error = futuro.result()[:3]
+                        except Exception as e:
+                            exito, nombre, error = False, os.path.basename(ruta), str(e)
+                        if exito:
+                            ruta_pdf = Path(directorio) / ruta_pdf_relativa(ruta, directorio)
+                            manifiesto.record(ruta, str(ruta_pdf), estado)
+                            sin_guardar = True
+                            self.convertidas += 1
+                            _notificar(callbacks, 'on_file_converted', nombre)
+                        elif not self._detenido.is_set():
+                            self.errores += 1
+                            _notificar(callbacks, 'on_file_error', nombre, error)
+                        if ruta in repetir:
+                            repetir.discard(ruta)
+                            if ruta not in en_cola:
+                                en_cola.add(ruta)
+                                pendientes.append(ruta)
+
+                # Guardar el progreso al quedar en reposo y de vez en cuando
+                if sin_guardar and (not en_curso or time.monotonic() - ultimo_guardado >= self.intervalo_guardado):
+                    sin_guardar = not self._guardar(manifiesto, callbacks)
+                    ultimo_guardado = time.monotonic()
+        except Exception as e:
+            _notificar(callbacks, 'on_error', str(e))
+        finally:
+            vigilante.close()
+            if en_curso:
+                converter.detener_executor(executor, backend, en_curso)
+                for ruta, _, _ in en_curso.values():
+                    ruta_pdf = Path(directorio) / ruta_pdf_relativa(ruta, directorio)
+                    ruta_parcial(ruta_pdf).unlink(missing_ok=True)
+            else:
+                executor.shutdown(wait=True)
+            if sin_guardar:
+                self._guardar(manifiesto, callbacks)
+            _notificar(callbacks, 'on_watch_stopped')
+
+    def _guardar(self, manifiesto, callbacks):
+        """Guarda el manifiesto; devuelve False si no se pudo"""
+        try:
+            manifiesto.save()
+            return True
+        except OSError as e:
+            _notificar(callbacks, 'on_error', f"No se pudo guardar el manifiesto: {e}")
+            return False
@@ -0,0 +1,384 @@
+"""
+Conversor de imágenes a PDF por línea de comandos.
+
+Pensado para servidores sin interfaz gráfica y tareas programadas: no importa
+tkinter ni customtkinter. El progreso se escribe en stderr y al terminar se
+imprime en stdout un resumen en JSON.
+
+Ejemplos:
+    python -m src.cli /datos/escaneos --modo zip --salida /datos/escaneos.zip
+    python -m src.cli /datos/escaneos --incremental --workers 8 --informe tiempos.json
+    python -m src.cli /datos/bandeja --vigilar
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+from .app.pdf_converter import PDFConverter
+from .core.archive import ARCHIVE_FORMATS
+from .core.image_loader import REDUCTION_GAPS
+
+# Códigos de salida
+SALIDA_OK = 0
+SALIDA_CON_ERRORES = 1
+SALIDA_FALLO = 2
+SALIDA_CANCELADO = 130
+
+
+class ProgresoConsola:
+    """
+    Callbacks de PDFConverter que escriben el progreso en stderr y reúnen
+    los datos del resumen final.
+    """
+
+    def __init__(self, salida=sys.stderr, silencioso=False):
+        self.salida = salida
+        self.silencioso = silencioso
+        self.total = None
+        self.convertidas = 0
+        # Total de imágenes que fallaron; 'errores' es solo una muestra,
+        # porque cada lote lista como mucho unos pocos nombres
+        self.total_errores = 0
+        self.errores = []
+        self.omitidas = 0
+        self.fallo = None
+        self.zip = None
+        self.volumenes = None
+        self.completado = False
+        self.informe = None
+
+    def _escribir(self, texto):
+        if not self.silencioso:
+            print(texto, file=self.salida, flush=True)
+
+    def on_start(self):
+        self._escribir("Buscando imágenes...")
+
+    def on_images_found(self, total):
+        self.total = total
+        self._escribir(f"Se encontraron {total} imágenes")
+
+    def on_no_images(self):
+        self._escribir("No se encontraron imágenes en la carpeta")
+
+    def on_files_skipped(self, cantidad):
+        self.omitidas = cantidad
+        self._escribir(f"{cantidad} imágenes ya estaban convertidas")
+
+    def on_progress_batch(self, lote):
+        self.convertidas = lote.total_converted
+        self.total_errores = lote.total_errors
+        self.errores.extend({'archivo': nombre, 'error': error} for nombre, error in lote.errors)
+        for nombre, error in lote.errors:
+            self._escribir(f"Error al convertir {nombre}: {error}")
+        if lote.progress is not None:
+            total = f"/{self.total}" if self.total else ""
+            self._escribir(
+                f"[{lote.progress:4.0%}] {lote.total_converted}{total} convertidas, "
+                f"{lote.total_errors} errores"
+            )
+
+    def on_error(self, error):
+        self.fallo = error
+        self._escribir(f"Error: {error}")
+
+    def on_creating_zip(self):
+        self._escribir("Terminando archivo ZIP...")
+
+    def on_zip_created(self, ruta):
+        self.zip = ruta
+
+    def on_volumes_created(self, rutas):
+        self.volumenes = rutas
+        self._escribir(f"Archivo dividido en {len(rutas)} volúmenes")
+
+    def on_stage_report(self, informe):
+        self.informe = informe
+
+    def on_complete(self, convertidas, total, errores, modo_comprimido):
+        self.completado = True
+        self.convertidas = convertidas
+        self.total_errores = errores
+
+    def on_finish(self):
+        pass
+
+
+def crear_parser():
+    """Opciones de la línea de comandos"""
+    parser = argparse.ArgumentParser(
+        prog="python -m src.cli",
+        description="Convierte las imágenes de una carpeta a PDF sin interfaz gráfica."
+    )
+    parser.add_argument("directorio", help="Carpeta con las imágenes")
+    parser.add_argument(
+        "--motor", choices=("app", "processor"), default="app",
+        help="app: un PDF por imagen (PDFConverter); processor: un solo PDF o ZIP "
+             "de toda la carpeta (ImageProcessor)"
+    )
+    parser.add_argument(
+        "--modo", choices=("carpeta", "zip", "pdf"),
+        help="carpeta: PDFs junto a las imágenes (solo app, por defecto); "
+             "zip: un archivo (ver --formato) con los PDFs; pdf: un único PDF "
+             "(solo processor, por defecto)"
+    )
+    parser.add_argument(
+        "--formato", choices=tuple(ARCHIVE_FORMATS), default="zip",
+        help="Formato del archivo en modo zip (por defecto zip)"
+    )
+    parser.add_argument(
+        "--volumen", type=int, metavar="MB",
+        help="Dividir el archivo en volúmenes independientes de como mucho MB megabytes"
+    )
+    parser.add_argument("--patron", default="*", help="Patrón de nombres de archivo (por defecto '*')")
+    parser.add_argument("--salida", help="Archivo ZIP o PDF de salida")
+    parser.add_argument("--workers", type=int, help="Conversiones simultáneas (por defecto según CPUs)")
+    parser.add_argument(
+        "--backend", choices=PDFConverter.BACKENDS, default="auto",
+        help="Ejecutar con hilos o procesos (solo app)"
+    )
+    parser.add_argument(
+        "--redimension", choices=sorted(REDUCTION_GAPS), default="balanced",
+        help="Calidad frente a velocidad al reducir imágenes grandes (solo app)"
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Convertir solo imágenes nuevas o modificadas (solo app, modo carpeta)"
+    )
+    parser.add_argument("--cache", metavar="DIRECTORIO", help="Caché de conversiones compartida (solo app)")
+    parser.add_argument(
+        "--vigilar", action="store_true",
+        help="Seguir vigilando la carpeta y convertir las imágenes conforme llegan "
+             "hasta pulsar Ctrl+C (solo app, modo carpeta; implica --incremental)"
+    )
+    parser.add_argument(
+        "--espera", type=float, default=1.0, metavar="SEGUNDOS",
+        help="Con --vigilar, segundos sin cambios para considerar una imagen "
+             "completamente escrita (por defecto 1)"
+    )
+    parser.add_argument("--informe", metavar="ARCHIVO", help="Guardar el desglose de tiempos en JSON")
+    parser.add_argument("--silencioso", action="store_true", help="No mostrar progreso en stderr")
+    return parser
+
+
+def _bytes_volumen(args):
+    """Tamaño máximo de cada volumen en bytes, o None para un solo archivo"""
+    return args.volumen * 1024 * 1024 if args.volumen else None
+
+
+def _esperar(hilo, cancelar):
+    """Espera a que termine hilo; Ctrl+C pide cancelar en lugar de abortar"""
+    cancelado = False
+    while hilo.is_alive():
+        try:
+            hilo.join(0.2)
+        except KeyboardInterrupt:
+            if not cancelado:
+                cancelado = True
+                cancelar()
+    return cancelado
+
+
+def convertir_con_app(args):
+    """Convierte con PDFConverter.procesar_carpeta y devuelve el resumen"""
+    modo = args.modo or "carpeta"
+    if modo == "pdf":
+        raise ValueError("El motor app no genera un único PDF; use --motor processor")
+
+    converter = PDFConverter(backend=args.backend, modo_redimension=args.redimension)
+    if args.workers:
+        converter.max_workers = converter.max_workers_procesos = args.workers
+    converter.directorio_salida = args.salida
+    converter.formato_archivo = args.formato
+    converter.tamano_volumen = _bytes_volumen(args)
+    converter.incremental = args.incremental
+    converter.directorio_cache = args.cache
+    converter.archivo_informe = args.informe
+    # En consola basta con un par de líneas de progreso por segundo
+    converter.max_actualizaciones = 2.0
+
+    callbacks = ProgresoConsola(silencioso=args.silencioso)
+    hilo = threading.Thread(
+        target=converter.procesar_carpeta,
+        args=(args.directorio, modo == "zip", callbacks, args.patron)
+    )
+    hilo.start()
+    cancelado = _esperar(hilo, converter.cancelar_proceso)
+
+    return {
+        'motor': 'app',
+        'modo': modo,
+        'directorio': args.directorio,
+        'salida': callbacks.zip,
+        'volumenes': callbacks.volumenes,
+        'imagenes': callbacks.total or 0,
+        'convertidas': callbacks.convertidas,
+        'omitidas': callbacks.omitidas,
+        'errores': callbacks.total_errores,
+        # Muestra: los lotes de progreso no listan todos los nombres
+        'detalle_errores': callbacks.errores,
+        'detalle_errores_truncado': len(callbacks.errores) < callbacks.total_errores,
+        'fallo': callbacks.fallo,
+        'cancelado': cancelado,
+        'completado': callbacks.completado,
+        'informe': callbacks.informe,
+    }
+
+
+class ProgresoVigilancia:
+    """Callbacks de VigilanteCarpeta que escriben cada conversión en stderr"""
+
+    def __init__(self, salida=sys.stderr, silencioso=False):
+        self.salida = salida
+        self.silencioso = silencioso
+        self.errores = []
+        self.fallo = None
+
+    def _escribir(self, texto):
+        if not self.silencioso:
+            print(f"{time.strftime('%H:%M:%S')} {texto}", file=self.salida, flush=True)
+
+    def on_watch_started(self, backend):
+        self._escribir(f"Vigilando la carpeta ({backend}); Ctrl+C para terminar")
+
+    def on_file_converted(self, nombre):
+        self._escribir(f"Convertida {nombre}")
+
+    def on_file_error(self, nombre, error):
+        self.errores.append({'archivo': nombre, 'error': error})
+        self._escribir(f"Error al convertir {nombre}: {error}")
+
+    def on_error(self, error):
+        self.fallo = error
+        self._escribir(f"Error: {error}")
+
+
+def vigilar_con_app(args):
+    """Vigila la carpeta con VigilanteCarpeta hasta Ctrl+C y devuelve el resumen"""
+    from .app.vigilante import VigilanteCarpeta
+
+    if args.motor != "app" or (args.modo or "carpeta") != "carpeta" or args.salida:
+        raise ValueError("--vigilar solo admite el motor app en modo carpeta")
+
+    converter = PDFConverter(backend=args.backend, modo_redimension=args.redimension)
+    if args.workers:
+        converter.max_workers = converter.max_workers_procesos = args.workers
+    converter.directorio_cache = args.cache
+    vigilante = VigilanteCarpeta(converter, args.directorio, args.patron, args.espera)
+
+    callbacks = ProgresoVigilancia(silencioso=args.silencioso)
+    hilo = threading.Thread(target=vigilante.ejecutar, args=(callbacks,))
+    hilo.start()
+    _esperar(hilo, vigilante.detener)
+
+    return {
+        'motor': 'app',
+        'modo': 'vigilancia',
+        'directorio': args.directorio,
+        'vigilancia': vigilante.backend_vigilancia,
+        'convertidas': vigilante.convertidas,
+        'errores': vigilante.errores,
+        'detalle_errores': callbacks.errores,
+        'detalle_errores_truncado': False,
+        'fallo': callbacks.fallo,
+        # Detener con Ctrl+C es el final normal de la vigilancia
+        'cancelado': False,
+    }
+
+
+def convertir_con_processor(args):
+    """Convierte con ImageProcessor.batch_convert_to_pdf y devuelve el resumen"""
+    # Importar aquí: el motor app no lo necesita
+    from .core.image_processor import ImageProcessor
+    from .core.stage_timer import write_report
+
+    modo = args.modo or "pdf"
+    if modo == "carpeta":
+        raise ValueError("El motor processor genera un único PDF o un ZIP; use --modo pdf o zip")
+    extension = ARCHIVE_FORMATS[args.formato] if modo == "zip" else ".pdf"
+    salida = args.salida or f"{os.path.normpath(args.directorio)}{extension}"
+
+    processor = ImageProcessor()
+    if args.workers:
+        processor.max_workers = args.workers
+    estado = {'procesadas': 0, 'total': 0, 'fallo': None, 'ultimo': 0.0}
+
+    def al_progresar(actual, total):
+        estado['procesadas'], estado['total'] = actual, total
+        ahora = time.monotonic()
+        if not args.silencioso and (ahora - estado['ultimo'] >= 0.5 or actual == total):
+            estado['ultimo'] = ahora
+            print(f"[{actual / total:4.0%}] {actual}/{total} convertidas", file=sys.stderr, flush=True)
+
+    def convertir():
+        try:
+            processor.batch_convert_to_pdf(
+                args.directorio, salida, args.patron, al_progresar, modo == "zip",
+                archive_format=args.formato, volume_size=_bytes_volumen(args)
+            )
+        except Exception as e:
+            estado['fallo'] = str(e)
+
+    hilo = threading.Thread(target=convertir)
+    hilo.start()
+    cancelado = _esperar(hilo, processor.cancel_processing)
+
+    informe = processor.last_report if estado['fallo'] is None else None
+    if informe and args.informe:
+        write_report(informe, args.informe)
+    if estado['fallo'] and not args.silencioso:
+        print(f"Error: {estado['fallo']}", file=sys.stderr)
+    archivos = processor.archive_paths if modo == "zip" else [salida]
+    return {
+        'motor': 'processor',
+        'modo': modo,
+        'directorio': args.directorio,
+        'salida': archivos[0] if informe else None,
+        'volumenes': archivos if informe and len(archivos) > 1 else None,
+        'imagenes': estado['total'],
+        'convertidas': estado['procesadas'] if informe else 0,
+        'omitidas': 0,
+        'errores': 0,
+        'detalle_errores': [],
+        'detalle_errores_truncado': False,
+        'fallo': estado['fallo'],
+        'cancelado': cancelado,
+        'completado': informe is not None,
+        'informe': informe,
+    }
+
+
+def main(argv=None):
+    """Punto de entrada de la línea de comandos"""
+    args = crear_parser().parse_args(argv)
+    inicio = time.monotonic()
+    try:
+        if args.vigilar:
+            resumen = vigilar_con_app(args)
+        elif args.motor == "processor":
+            resumen = convertir_con_processor(args)
+        else:
+            resumen = convertir_con_app(args)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return SALIDA_FALLO
+    resumen['segundos'] = round(time.monotonic() - inicio, 3)
+    print(json.dumps(resumen, ensure_ascii=False, indent=2))
+
+    if resumen['cancelado']:
+        return SALIDA_CANCELADO
+    if resumen['fallo']:
+        return SALIDA_FALLO
+    if resumen['errores']:
+        return SALIDA_CON_ERRORES
+    return SALIDA_OK
+
+
+if __name__ == "__main__":
+    # Necesario para el backend de procesos en el ejecutable empaquetado
+    multiprocessing.freeze_support()
+    sys.exit(main())
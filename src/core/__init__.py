@@ -1,7 +1,19 @@
 """
 Core package initialization.
 """
-from .image_processor import ImageProcessor
-from .text_normalizer import TextNormalizer
+from importlib import import_module
 
 __all__ = ['ImageProcessor', 'TextNormalizer']
+
+# Exported classes are imported on first access, so that importing one core
+# module (e.g. from the GUI) does not load the others and Pillow with them
+_LAZY_EXPORTS = {
+    'ImageProcessor': '.image_processor',
+    'TextNormalizer': '.text_normalizer',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        return getattr(import_module(_LAZY_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
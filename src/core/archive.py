@@ -0,0 +1,565 @@
+"""
+Archive writing module.
+
+Provides a single-writer stage that receives PDF bytes from conversion workers
+and appends them to the output archive as they complete, so that converted
+files never have to be written to a temporary directory and read back.
+Entries are compressed by a small thread pool before reaching the writer, and
+entries that would barely shrink (PDFs holding JPEG or Flate images) are
+stored instead of deflated.
+
+Backends: ZIP (deflated or stored, ZIP64 as needed) and tar (plain or gzip),
+each optionally split into size-capped volumes that are complete archives on
+their own. open_archive() selects one by name.
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional
+import os
+import queue
+import struct
+import tarfile
+import threading
+import time
+import zipfile
+import zlib
+
+_STOP = object()
+
+# Entries up to this size are deflated without sampling first
+SAMPLE_SIZE = 64 * 1024
+# Number of evenly spaced chunks sampled from larger entries
+SAMPLE_CHUNKS = 4
+# Entries whose sample does not shrink below this fraction are stored
+INCOMPRESSIBLE_RATIO = 0.9
+
+# Archive formats accepted by open_archive() and their file extensions
+ARCHIVE_FORMATS = {
+    'zip': '.zip',
+    'zip-stored': '.zip',
+    'tar': '.tar',
+    'tar.gz': '.tar.gz',
+}
+
+# Upper bound of the ZIP central directory record, local header and ZIP64
+# extras for one entry, excluding its name
+_ZIP_ENTRY_OVERHEAD = 30 + 46 + 2 * 32
+# End of central directory plus the ZIP64 end record and locator
+_ZIP_END_SIZE = 22 + 56 + 20
+
+
+def is_compressible(data: bytes, ratio: float = INCOMPRESSIBLE_RATIO) -> bool:
+    """Estimate whether deflating data is worth it from a fast sample.
+
+    Args:
+        data: Entry contents
+        ratio: Largest compressed/original size ratio still worth deflating
+
+    Returns:
+        False if a sample of the data barely shrinks at the fastest level
+    """
+    if len(data) <= SAMPLE_SIZE:
+        return True
+    chunk = SAMPLE_SIZE // SAMPLE_CHUNKS
+    step = (len(data) - chunk) // (SAMPLE_CHUNKS - 1)
+    sample = b''.join(data[i * step:i * step + chunk] for i in range(SAMPLE_CHUNKS))
+    return len(zlib.compress(sample, 1)) < len(sample) * ratio
+
+
+def default_compress_workers() -> int:
+    """Compression threads: zlib releases the GIL, so they run in parallel."""
+    return max(1, min(4, os.cpu_count() or 1))
+
+
+def volume_path(path: str, number: int) -> str:
+    """Path of volume number (1-based) of a split archive.
+
+    'out.zip' becomes 'out.part001.zip' and 'out.tar.gz' 'out.part001.tar.gz'.
+    """
+    base, extension = os.path.splitext(path)
+    if base.lower().endswith('.tar'):
+        base, extension = base[:-4], base[-4:] + extension
+    return f"{base}.part{number:03d}{extension}"
+
+
+class _Prepared(NamedTuple):
+    """An entry ready to be written, produced by a compression thread."""
+    arcname: str
+    # Uncompressed size
+    size: int
+    # Bytes to append to the archive
+    payload: bytes
+    # Backend-specific details (ZipInfo, uncompressed tar blocks)
+    info: object = None
+
+
+class ArchiveStreamWriter:
+    """Append in-memory entries to an archive from a dedicated writer thread.
+
+    Producers call add() from any thread. Each entry is prepared (compressed,
+    checksummed, framed) by a thread pool as soon as it is added and a single
+    background thread appends the results to the archive. In ordered mode
+    every entry carries a sequence index and entries are written in index
+    order regardless of completion order (failed items must be reported with
+    skip() so the writer does not wait for them).
+
+    With max_volume_bytes the output is split into volumes named by
+    volume_path(), each a complete archive no larger than the cap, unless a
+    single entry exceeds it on its own; when everything fits in one volume it
+    is renamed to path. paths lists the files produced.
+
+    Subclasses implement _prepare, _entry_size, _write_entry, _open_volume,
+    _finish_volume, _discard_volume and set end_size (bytes written when a volume is closed).
+    """
+
+    end_size = 0
+
+    def __init__(self,
+                 path: str,
+                 ordered: bool = False,
+                 queue_size: int = 32,
+                 compress_workers: Optional[int] = None,
+                 max_volume_bytes: Optional[int] = None):
+        """Open the archive and start the writer thread.
+
+        Args:
+            path: Output file path
+            ordered: Whether to write entries in index order
+            queue_size: Maximum entries waiting for the writer (backpressure)
+            compress_workers: Compression threads (None for default_compress_workers())
+            max_volume_bytes: Maximum size of each volume (None writes a single file)
+        """
+        self.path = str(path)
+        self.ordered = ordered
+        self.max_volume_bytes = max_volume_bytes
+        self.paths: List[str] = []
+        self.entries_written = 0
+        self.bytes_written = 0
+        # Bytes of entry data in the archive, after compression
+        self.compressed_bytes = 0
+        # Time spent compressing and writing entries, summed over the
+        # compression threads and the writer thread
+        self.write_seconds = 0.0
+        self._stats_lock = threading.Lock()
+        self._volume_bytes = 0
+        self._volume_entries = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._pending: Dict[int, Optional[Future]] = {}
+        self._next_index = 0
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._aborted = False
+        self._pool = ThreadPoolExecutor(
+            compress_workers or default_compress_workers(), thread_name_prefix="archive-compress"
+        )
+        self._start_volume()
+        self._thread = threading.Thread(target=self._run, name="archive-writer", daemon=True)
+        self._thread.start()
+
+    @property
+    def pending_entries(self) -> int:
+        """Entries added but not written yet (queued or, in ordered mode,
+        waiting for an earlier index); producers use it for backpressure,
+        since add() cannot block without risking a wait on the missing index.
+        """
+        return self._queue.qsize() + len(self._pending)
+
+    def add(self, arcname: str, data: bytes, index: Optional[int] = None) -> None:
+        """Queue an entry for writing.
+
+        Args:
+            arcname: Name of the entry inside the archive
+            data: Entry contents
+            index: Sequence index (required in ordered mode)
+        """
+        if self._error is not None:
+            raise self._error
+        if self.ordered and index is None:
+            raise ValueError("Ordered archives require an entry index")
+        future = self._pool.submit(self._timed_prepare, arcname.replace(os.sep, '/'), data)
+        self._queue.put((index, future))
+
+    def skip(self, index: int) -> None:
+        """Mark an index as producing no entry (ordered mode)."""
+        if self.ordered:
+            self._queue.put((index, None))
+
+    def close(self) -> None:
+        """Write all queued entries and finalise the archive."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        try:
+            # Indices that were never reported leave gaps; keep the rest in order
+            for index in sorted(self._pending):
+                future = self._pending.pop(index)
+                if future is not None and self._error is None:
+                    self._write(future)
+        except BaseException as e:
+            self._error = e
+        finally:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._finish_volume()
+        if self._error is not None:
+            raise self._error
+        if self.max_volume_bytes and len(self.paths) == 1:
+            os.replace(self.paths[0], self.path)
+            self.paths = [self.path]
+
+    def abort(self) -> None:
+        """Stop writing and delete the partial archive (all its volumes).
+
+        Entries still queued or waiting for their turn are discarded and their
+        compression cancelled; at most the entry being written is finished.
+        """
+        if not self._closed:
+            self._closed = True
+            self._aborted = True
+            self._discard_queued()
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._queue.put(_STOP)
+            self._thread.join()
+            for future in self._pending.values():
+                if future is not None:
+                    future.cancel()
+            self._pending.clear()
+            try:
+                self._discard_volume()
+            except Exception:
+                pass
+        # Only files this writer created: with volumes, path itself may be
+        # an unrelated file
+        for path in self.paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            if self._aborted:
+                if item[1] is not None:
+                    item[1].cancel()
+                continue
+            if self._error is not None:
+                # Keep draining so producers never block on a dead writer
+                continue
+            index, future = item
+            try:
+                if not self.ordered:
+                    self._write(future)
+                    continue
+                self._pending[index] = future
+                while not self._aborted and self._next_index in self._pending:
+                    future = self._pending.pop(self._next_index)
+                    self._next_index += 1
+                    if future is not None:
+                        self._write(future)
+            except BaseException as e:
+                self._error = e
+
+    def _discard_queued(self) -> None:
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not _STOP and item[1] is not None:
+                item[1].cancel()
+
+    def _start_volume(self) -> None:
+        if self.max_volume_bytes:
+            path = volume_path(self.path, len(self.paths) + 1)
+        else:
+            path = self.path
+        self._open_volume(path)
+        self.paths.append(path)
+        self._volume_bytes = 0
+        self._volume_entries = 0
+
+    def _timed_prepare(self, arcname: str, data: bytes) -> _Prepared:
+        start = time.perf_counter()
+        prepared = self._prepare(arcname, data)
+        with self._stats_lock:
+            self.write_seconds += time.perf_counter() - start
+        return prepared
+
+    def _write(self, future: Future) -> None:
+        prepared = future.result()
+        start = time.perf_counter()
+        size = self._entry_size(prepared)
+        if (self.max_volume_bytes and self._volume_entries
+                and self._volume_bytes + size + self.end_size > self.max_volume_bytes):
+            self._finish_volume()
+            self._start_volume()
+        compressed = self._write_entry(prepared)
+        with self._stats_lock:
+            self.write_seconds += time.perf_counter() - start
+        self._volume_bytes += size
+        self._volume_entries += 1
+        self.entries_written += 1
+        self.bytes_written += prepared.size
+        self.compressed_bytes += compressed
+
+    def _prepare(self, arcname: str, data: bytes) -> _Prepared:
+        """Compress and frame one entry (compression threads)."""
+        raise NotImplementedError
+
+    def _entry_size(self, prepared: _Prepared) -> int:
+        """Upper bound of the bytes the entry adds to its volume."""
+        raise NotImplementedError
+
+    def _write_entry(self, prepared: _Prepared) -> int:
+        """Append the entry (writer thread); returns its compressed size."""
+        raise NotImplementedError
+
+    def _open_volume(self, path: str) -> None:
+        raise NotImplementedError
+
+    def _finish_volume(self) -> None:
+        raise NotImplementedError
+
+    def _discard_volume(self) -> None:
+        """Close the current volume without finalising it (abort)."""
+        raise NotImplementedError
+
+
+class ZipStreamWriter(ArchiveStreamWriter):
+    """Stream entries into a ZIP file (ZIP64 when sizes require it).
+
+    With ZIP_DEFLATED (or ZIP_STORED) entries are compressed and checksummed
+    by the thread pool and the writer only copies the result into the
+    archive; with adaptive compression an entry is stored when a sample of it
+    does not shrink (see is_compressible), or when deflating it turns out not
+    to save space. Other methods are applied by zipfile in the writer thread.
+    """
+
+    end_size = _ZIP_END_SIZE
+
+    def __init__(self,
+                 path: str,
+                 compression: int = zipfile.ZIP_DEFLATED,
+                 ordered: bool = False,
+                 queue_size: int = 32,
+                 compresslevel: Optional[int] = None,
+                 adaptive: bool = True,
+                 compress_workers: Optional[int] = None,
+                 max_volume_bytes: Optional[int] = None):
+        """Open the archive and start the writer thread.
+
+        Args:
+            path: Output ZIP file path
+            compression: zipfile compression constant
+            ordered: Whether to write entries in index order
+            queue_size: Maximum entries waiting for the writer (backpressure)
+            compresslevel: Deflate level (None for the zlib default)
+            adaptive: Whether to store entries that do not compress
+            compress_workers: Compression threads (None for default_compress_workers())
+            max_volume_bytes: Maximum size of each volume (None writes a single file)
+        """
+        self.compression = compression
+        self.compresslevel = -1 if compresslevel is None else compresslevel
+        self.adaptive = adaptive
+        # Entries stored uncompressed because they did not compress
+        self.entries_stored = 0
+        self._zip: Optional[zipfile.ZipFile] = None
+        super().__init__(path, ordered, queue_size, compress_workers, max_volume_bytes)
+
+    def _open_volume(self, path: str) -> None:
+        self._zip = zipfile.ZipFile(path, 'w', self.compression, allowZip64=True)
+
+    def _finish_volume(self) -> None:
+        self._zip.close()
+
+    def _discard_volume(self) -> None:
+        # Detach the file so zipfile never writes the central directory
+        fp, self._zip.fp = self._zip.fp, None
+        if fp is not None:
+            fp.close()
+
+    def _prepare(self, arcname: str, data: bytes) -> _Prepared:
+        if self.compression not in (zipfile.ZIP_DEFLATED, zipfile.ZIP_STORED):
+            # Left to zipfile in the writer thread
+            return _Prepared(arcname, len(data), data)
+
+        zinfo = zipfile.ZipInfo(arcname, date_time=time.localtime(time.time())[:6])
+        # Same permissions as ZipFile.writestr
+        zinfo.external_attr = 0o600 << 16
+        zinfo.file_size = len(data)
+        zinfo.CRC = zlib.crc32(data)
+        zinfo.compress_type = zipfile.ZIP_STORED
+        payload = data
+        if self.compression == zipfile.ZIP_DEFLATED and (not self.adaptive or is_compressible(data)):
+            compressor = zlib.compressobj(self.compresslevel, zlib.DEFLATED, -15)
+            deflated = compressor.compress(data) + compressor.flush()
+            if not self.adaptive or len(deflated) < len(data):
+                zinfo.compress_type = zipfile.ZIP_DEFLATED
+                payload = deflated
+        zinfo.compress_size = len(payload)
+        return _Prepared(arcname, len(data), payload, zinfo)
+
+    def _entry_size(self, prepared: _Prepared) -> int:
+        return len(prepared.payload) + 2 * len(prepared.arcname.encode('utf-8')) + _ZIP_ENTRY_OVERHEAD
+
+    def _write_entry(self, prepared: _Prepared) -> int:
+        zinfo = prepared.info
+        if zinfo is None:
+            self._zip.writestr(prepared.arcname, prepared.payload)
+            return self._zip.getinfo(prepared.arcname).compress_size
+        self._write_raw(zinfo, prepared.payload)
+        if self.compression == zipfile.ZIP_DEFLATED and zinfo.compress_type == zipfile.ZIP_STORED:
+            self.entries_stored += 1
+        return len(prepared.payload)
+
+    def _write_raw(self, zinfo: zipfile.ZipInfo, payload: bytes) -> None:
+        """Append an entry whose data is already compressed.
+
+        zipfile has no public API for this; the steps mirror ZipFile.mkdir()
+        (header at start_dir, then register the entry for the central
+        directory), followed by the payload.
+        """
+        archive = self._zip
+        with archive._lock:
+            archive.fp.seek(archive.start_dir)
+            zinfo.header_offset = archive.fp.tell()
+            archive._writecheck(zinfo)
+            archive._didModify = True
+            archive.fp.write(zinfo.FileHeader())
+            archive.fp.write(payload)
+            archive.filelist.append(zinfo)
+            archive.NameToInfo[zinfo.filename] = zinfo
+            archive.start_dir = archive.fp.tell()
+
+
+class TarStreamWriter(ArchiveStreamWriter):
+    """Stream entries into a tar file, optionally gzip-compressed.
+
+    The archive is written strictly sequentially, like tarfile's 'w|' modes.
+    With gzip each entry (header and data) is deflated by the thread pool on
+    its own and ended with a sync flush, so the pieces concatenate into a
+    single deflate stream (as pigz does); the writer only tracks the CRC and
+    size for the gzip trailer. Entries that do not compress are deflated at
+    level 0 when adaptive.
+    """
+
+    end_size = tarfile.RECORDSIZE
+
+    def __init__(self,
+                 path: str,
+                 compress: bool = False,
+                 ordered: bool = False,
+                 queue_size: int = 32,
+                 compresslevel: int = 6,
+                 adaptive: bool = True,
+                 compress_workers: Optional[int] = None,
+                 max_volume_bytes: Optional[int] = None):
+        """Open the archive and start the writer thread.
+
+        Args:
+            path: Output tar file path
+            compress: Whether to gzip the archive
+            ordered: Whether to write entries in index order
+            queue_size: Maximum entries waiting for the writer (backpressure)
+            compresslevel: gzip level
+            adaptive: Whether to skip compressing entries that do not compress
+            compress_workers: Compression threads (None for default_compress_workers())
+            max_volume_bytes: Maximum size of each volume (None writes a single file)
+        """
+        self.compress = compress
+        self.compresslevel = compresslevel
+        self.adaptive = adaptive
+        if compress:
+            # gzip header and trailer plus the deflated end blocks
+            self.end_size = 64 if compresslevel else 64 + tarfile.RECORDSIZE
+        self._file = None
+        # Uncompressed bytes and CRC of the current volume
+        self._offset = 0
+        self._crc = 0
+        super().__init__(path, ordered, queue_size, compress_workers, max_volume_bytes)
+
+    def _open_volume(self, path: str) -> None:
+        self._file = open(path, 'wb')
+        self._offset = 0
+        self._crc = 0
+        if self.compress:
+            # gzip member header: deflate, no flags, no mtime, unknown OS
+            self._file.write(b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff')
+
+    def _finish_volume(self) -> None:
+        try:
+            # Two zero blocks end the archive; pad to a whole record like tarfile
+            end = 2 * tarfile.BLOCKSIZE
+            end += -(self._offset + end) % tarfile.RECORDSIZE
+            trailer = bytes(end)
+            if not self.compress:
+                self._file.write(trailer)
+                return
+            compressor = zlib.compressobj(self.compresslevel, zlib.DEFLATED, -15)
+            self._file.write(compressor.compress(trailer) + compressor.flush())
+            self._crc = zlib.crc32(trailer, self._crc)
+            self._offset += end
+            self._file.write(struct.pack('<II', self._crc, self._offset & 0xFFFFFFFF))
+        finally:
+            self._file.close()
+
+    def _discard_volume(self) -> None:
+        self._file.close()
+
+    def _prepare(self, arcname: str, data: bytes) -> _Prepared:
+        info = tarfile.TarInfo(arcname)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        info.mode = 0o644
+        header = info.tobuf(tarfile.PAX_FORMAT, 'utf-8', 'surrogateescape')
+        padding = bytes(-len(data) % tarfile.BLOCKSIZE)
+        block = b''.join((header, data, padding))
+        payload = block
+        if self.compress:
+            level = self.compresslevel if not self.adaptive or is_compressible(data) else 0
+            compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+            payload = compressor.compress(block) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        return _Prepared(arcname, len(data), payload, block)
+
+    def _entry_size(self, prepared: _Prepared) -> int:
+        return len(prepared.payload)
+
+    def _write_entry(self, prepared: _Prepared) -> int:
+        self._file.write(prepared.payload)
+        if self.compress:
+            self._crc = zlib.crc32(prepared.info, self._crc)
+        self._offset += len(prepared.info)
+        return len(prepared.payload)
+
+
+def open_archive(path: str, archive_format: str = 'zip', **kwargs) -> ArchiveStreamWriter:
+    """Create the streaming writer for an archive format.
+
+    Args:
+        path: Output file path
+        archive_format: One of ARCHIVE_FORMATS
+        **kwargs: Writer options (ordered, max_volume_bytes, compress_workers...)
+
+    Returns:
+        The writer, already accepting entries
+    """
+    if archive_format == 'zip':
+        return ZipStreamWriter(path, zipfile.ZIP_DEFLATED, **kwargs)
+    if archive_format == 'zip-stored':
+        return ZipStreamWriter(path, zipfile.ZIP_STORED, **kwargs)
+    if archive_format == 'tar':
+        return TarStreamWriter(path, False, **kwargs)
+    if archive_format == 'tar.gz':
+        return TarStreamWriter(path, True, **kwargs)
+    raise ValueError(f"Unsupported archive format: {archive_format}. Use one of {tuple(ARCHIVE_FORMATS)}")
@@ -0,0 +1,199 @@
+"""
+Worker autotuning module.
+
+Adjusts how many conversions run at once by measuring throughput during the
+start of a run, and remembers the best value for the next run on the same
+machine.
+"""
+from typing import Callable, Optional
+import json
+import os
+import sys
+import time
+
+from .conversion_cache import default_cache_dir
+
+
+def default_state_file() -> str:
+    """Per-user file where tuned worker counts are stored."""
+    return os.path.join(os.path.dirname(default_cache_dir()), 'autotune.json')
+
+
+def available_memory_fraction() -> Optional[float]:
+    """Fraction of physical memory currently available, or None if unknown."""
+    try:
+        import psutil
+        memory = psutil.virtual_memory()
+        return memory.available / memory.total
+    except ImportError:
+        pass
+
+    if sys.platform.startswith('linux'):
+        try:
+            values = {}
+            with open('/proc/meminfo') as f:
+                for line in f:
+                    name, value = line.split(':', 1)
+                    values[name] = int(value.split()[0])
+            return values['MemAvailable'] / values['MemTotal']
+        except (OSError, KeyError, ValueError):
+            return None
+
+    if sys.platform == 'win32':
+        import ctypes
+
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [
+                ('dwLength', ctypes.c_ulong),
+                ('dwMemoryLoad', ctypes.c_ulong),
+                ('ullTotalPhys', ctypes.c_ulonglong),
+                ('ullAvailPhys', ctypes.c_ulonglong),
+                ('ullTotalPageFile', ctypes.c_ulonglong),
+                ('ullAvailPageFile', ctypes.c_ulonglong),
+                ('ullTotalVirtual', ctypes.c_ulonglong),
+                ('ullAvailVirtual', ctypes.c_ulonglong),
+                ('ullAvailExtendedVirtual', ctypes.c_ulonglong),
+            ]
+
+        status = MEMORYSTATUSEX()
+        status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullAvailPhys / status.ullTotalPhys
+    return None
+
+
+class WorkerAutotuner:
+    """Hill-climbing controller for the number of concurrent conversions.
+
+    The caller reports every completed task with record(). After each sample
+    window the measured images/second is compared with the best so far: the
+    worker count keeps moving while throughput improves, tries the other
+    direction once, and then settles on the best value. Low available memory
+    shrinks the count at any time, even after settling.
+    """
+
+    def __init__(self,
+                 maximum: int,
+                 minimum: int = 1,
+                 initial: Optional[int] = None,
+                 key: str = 'default',
+                 state_file: Optional[str] = None,
+                 min_sample_seconds: float = 0.5,
+                 max_steps: int = 8,
+                 tolerance: float = 0.05,
+                 memory_floor: float = 0.10,
+                 clock: Callable[[], float] = time.monotonic,
+                 memory_probe: Callable[[], Optional[float]] = available_memory_fraction):
+        """Initialize the tuner.
+
+        Args:
+            maximum: Largest worker count to try
+            minimum: Smallest worker count to try
+            initial: Starting count when nothing was stored for this key
+            key: Name under which the result is stored (e.g. the backend)
+            state_file: JSON file with stored results; None disables persistence
+            min_sample_seconds: Minimum duration of a sample window
+            max_steps: Sample windows after which the tuner settles
+            tolerance: Relative gain needed to count as an improvement
+            memory_floor: Available memory fraction below which workers are removed
+            clock: Time source (seconds)
+            memory_probe: Returns the available memory fraction, or None
+        """
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.key = key
+        self.state_file = state_file
+        self.min_sample_seconds = min_sample_seconds
+        self.max_steps = max_steps
+        self.tolerance = tolerance
+        self.memory_floor = memory_floor
+        self._clock = clock
+        self._memory_probe = memory_probe
+
+        stored = self._load().get(key)
+        start = stored or initial or min(4, self.maximum)
+        self.current = self._clamp(start)
+        self.settled = False
+        self.best_workers = self.current
+        self._best_rate: Optional[float] = None
+        self._direction = 1
+        self._reversed = False
+        self._steps = 0
+        self._window_start = clock()
+        self._window_count = 0
+
+    def _clamp(self, value: int) -> int:
+        return min(self.maximum, max(self.minimum, int(value)))
+
+    def _load(self) -> dict:
+        if not self.state_file:
+            return {}
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def save(self) -> None:
+        """Store the best worker count found for this key."""
+        if not self.state_file or self._best_rate is None:
+            return
+        data = self._load()
+        data[self.key] = self.best_workers
+        os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+        temp_path = self.state_file + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(temp_path, self.state_file)
+
+    def record(self, count: int = 1) -> bool:
+        """Report completed tasks.
+
+        Args:
+            count: Number of tasks completed since the last call
+
+        Returns:
+            True if the worker count changed
+        """
+        self._window_count += count
+        elapsed = self._clock() - self._window_start
+        if self._window_count < 2 * self.current or elapsed < self.min_sample_seconds:
+            return False
+
+        rate = self._window_count / elapsed
+        self._window_start = self._clock()
+        self._window_count = 0
+
+        # Memory pressure wins over throughput
+        available = self._memory_probe()
+        if available is not None and available < self.memory_floor and self.current > self.minimum:
+            self.current -= 1
+            self.maximum = self.current
+            self.best_workers = min(self.best_workers, self.current)
+            return True
+
+        if self.settled:
+            return False
+        self._steps += 1
+
+        candidate = None
+        if self._best_rate is None or rate > self._best_rate * (1 + self.tolerance):
+            self._best_rate = rate
+            self.best_workers = self.current
+            candidate = self.current + self._direction
+        if candidate is None or not self.minimum <= candidate <= self.maximum:
+            candidate = None
+            if not self._reversed:
+                # Try fewer workers than the best once before settling
+                self._reversed = True
+                self._direction = -1
+                if self.best_workers - 1 >= self.minimum:
+                    candidate = self.best_workers - 1
+        if candidate is None or self._steps >= self.max_steps:
+            self.settled = True
+            candidate = self.best_workers
+
+        changed = candidate != self.current
+        self.current = candidate
+        return changed
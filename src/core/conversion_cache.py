@@ -0,0 +1,132 @@
+"""
+Conversion cache module.
+
+On-disk, content-addressed store of converted PDFs. Entries are keyed by the
+hash of the source bytes plus the conversion settings, so the same scan copied
+into many folders is only converted once.
+"""
+from typing import Optional
+import hashlib
+import os
+import threading
+import uuid
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+
+def default_cache_dir() -> str:
+    """Per-user cache directory for converted PDFs."""
+    base = os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_CACHE_HOME')
+    if not base:
+        base = os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'promitierra', 'pdf_cache')
+
+
+class ConversionCache:
+    """Size-bounded LRU cache of PDF bytes stored as one file per entry.
+
+    The cache is safe to use from several threads and processes at once:
+    entries are written atomically and last use is tracked through the file
+    modification time. The size limit is enforced by trim(), which callers run
+    once per job rather than on every insert.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        """Initialize the cache.
+
+        Args:
+            directory: Cache directory (created on first write)
+            max_bytes: Maximum total size kept by trim()
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(source_path: str, settings: str) -> str:
+        """Compute the cache key for a source file and conversion settings.
+
+        Args:
+            source_path: Path to the source image
+            settings: Fingerprint of every setting that affects the output
+
+        Returns:
+            Hex key
+        """
+        digest = hashlib.sha256()
+        with open(source_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        digest.update(b'\0' + settings.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached bytes for key, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            # Mark as recently used for LRU eviction
+            os.utime(path)
+        except OSError:
+            return None
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Store bytes under key, replacing any existing entry atomically."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def size(self) -> int:
+        """Total bytes currently stored."""
+        return sum(size for _, _, size in self._entries())
+
+    def _entries(self):
+        try:
+            subdirs = list(os.scandir(self.directory))
+        except OSError:
+            return
+        for subdir in subdirs:
+            if not subdir.is_dir():
+                continue
+            for entry in os.scandir(subdir.path):
+                if entry.name.endswith('.tmp'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                yield entry.path, stat.st_mtime, stat.st_size
+
+    def trim(self) -> int:
+        """Evict least recently used entries until the cache fits max_bytes.
+
+        Returns:
+            Number of bytes evicted
+        """
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda e: e[1])
+            total = sum(size for _, _, size in entries)
+            evicted = 0
+            for path, _, size in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                evicted += size
+            return evicted
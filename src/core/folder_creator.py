@@ -3,7 +3,6 @@ Módulo unificado para creación de carpetas desde plantillas Excel.
 """
 from typing import Tuple, Optional, Callable
 import os
-import pandas as pd
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
 
@@ -26,6 +25,9 @@ class FolderCreator:
             Tupla con (éxito, mensaje)
         """
         try:
+            # pandas tarda en importarse: solo se carga al usar plantillas
+            import pandas as pd
+            
             # Crear DataFrame con columnas estándar
             df = pd.DataFrame(columns=['ID', 'NOMBRES', 'APELLIDOS'])
             
@@ -130,6 +132,8 @@ class FolderCreator:
             Tupla con (éxito, mensaje)
         """
         try:
+            import pandas as pd
+            
             # Leer plantilla
             df = pd.read_excel(ruta_excel)
             
@@ -0,0 +1,73 @@
+"""
+Image loading module.
+
+Helpers to open images for PDF conversion while decoding as few pixels as
+possible.
+"""
+from typing import Tuple
+import math
+from PIL import Image
+
+# How much larger than the target the coarse reduction may leave the image
+# before the final high-quality resample. 'balanced' matches the default of
+# Image.thumbnail() (reducing_gap=2.0); 'quality' keeps a wider margin but,
+# unlike a full-size decode, still lets the decoder skip most of the pixels.
+REDUCTION_GAPS = {
+    'quality': 3.0,
+    'balanced': 2.0,
+    'fast': 1.0,
+}
+
+
+def fit_size(size: Tuple[int, int], max_size: Tuple[int, int]) -> Tuple[int, int]:
+    """Compute the largest size with the same aspect ratio that fits max_size.
+
+    Args:
+        size: Original (width, height)
+        max_size: Maximum (width, height)
+
+    Returns:
+        Target (width, height), never larger than the original
+    """
+    width, height = size
+    scale = min(max_size[0] / width, max_size[1] / height, 1.0)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def downscale(image: Image.Image, max_size: Tuple[int, int], speed: str = 'balanced') -> Image.Image:
+    """Shrink an image to fit max_size using decoder-level reduction first.
+
+    JPEG files are asked to decode at 1/2, 1/4 or 1/8 scale (draft mode), and
+    other formats are pre-shrunk with an integer reduce() before the final
+    LANCZOS resample. Must be called before the image data is loaded for the
+    JPEG shortcut to apply.
+
+    Args:
+        image: Freshly opened image
+        max_size: Maximum (width, height)
+        speed: One of 'quality', 'balanced' or 'fast'
+
+    Returns:
+        The resized image, or the original if it already fits
+    """
+    if speed not in REDUCTION_GAPS:
+        raise ValueError(f"Unknown speed setting: {speed}")
+
+    target = fit_size(image.size, max_size)
+    if target == image.size:
+        return image
+
+    gap = REDUCTION_GAPS[speed]
+    if image.format == 'JPEG':
+        # The decoder picks the smallest scale that stays >= requested size
+        requested = (math.ceil(target[0] * gap), math.ceil(target[1] * gap))
+        image.draft(image.mode if image.mode in ('RGB', 'L') else None, requested)
+    else:
+        factor = int(min(image.width / target[0], image.height / target[1]) / gap)
+        if factor > 1:
+            image = image.reduce(factor)
+
+    if image.size == target:
+        return image
+
+    return image.resize(target, Image.Resampling.LANCZOS)
@@ -2,11 +2,21 @@
 Image processing module.
 """
 import os
-from typing import Callable, List
-from PIL import Image
-import zipfile
-import tempfile
-import shutil
+from contextlib import closing
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from .pdf_writer import (
+    JpegInfo, PageBlob, PdfStreamWriter, encode_jpeg, encode_page, read_jpeg_passthrough
+)
+from .archive import ARCHIVE_FORMATS, open_archive
+from .image_sniffer import ImageClassifier, open_image
+from .pipeline import ordered_map
+from .scanner import DirectoryScanner
+from .spool import DEFAULT_SPOOL_BYTES, SpooledBuffer
+from .stage_timer import StageTimer
+
+# Resolution (dpi) that sets the page size of each image
+PAGE_RESOLUTION = 100.0
 
 class ImageProcessor:
     """Class for handling image processing operations."""
@@ -14,18 +24,41 @@ class ImageProcessor:
     def __init__(self):
         """Initialize the image processor."""
         self._should_cancel = False
+        # Per-stage timings of the current or last batch
+        self.timer = StageTimer()
+        self.last_report: Optional[dict] = None
+        # Files written by the last compressed batch (several with volumes)
+        self.archive_paths: List[str] = []
+        # Image formats by (path, size, mtime), reused across batches
+        self.classifier = ImageClassifier()
+        # Threads converting images at once (None = CPUs, at most 4; 1 = sequential)
+        self.max_workers: Optional[int] = None
+        # Converted pages waiting to be written at most (None = 4 per worker);
+        # bounds memory when an early page is slow
+        self.window: Optional[int] = None
+        # Pages and per-image PDFs larger than this wait in a temporary file
+        # instead of memory (None keeps them all in memory)
+        self.spool_bytes: Optional[int] = DEFAULT_SPOOL_BYTES
         
     def cancel_processing(self):
         """Cancel current processing operation."""
         self._should_cancel = True
         
+    def _check_cancel(self) -> None:
+        """Safe point: stop the current operation if cancellation was requested."""
+        if self._should_cancel:
+            raise InterruptedError("Operación cancelada")
+        
     def batch_convert_to_pdf(
         self,
         input_dir: str,
         output_file: str,
         pattern: str = "*",
         progress_callback: Callable[[int, int], None] = None,
-        compress: bool = False
+        compress: bool = False,
+        report_callback: Callable[[dict], None] = None,
+        archive_format: str = 'zip',
+        volume_size: Optional[int] = None
     ) -> None:
         """Convert all images in a directory to PDF.
         
@@ -34,91 +67,96 @@ class ImageProcessor:
             output_file: Output PDF or ZIP file path
             pattern: Pattern to filter image files
             progress_callback: Callback for progress updates
-            compress: Whether to compress output into ZIP
+            compress: Whether to compress output into an archive
+            report_callback: Called with the per-stage timing report
+                (StageTimer.report) when the batch completes
+            archive_format: Archive format when compressing (see
+                archive.ARCHIVE_FORMATS)
+            volume_size: Split the archive into volumes of at most this many
+                bytes (see archive.volume_path for their names)
         """
+        if compress and archive_format not in ARCHIVE_FORMATS:
+            raise ValueError(f"Formato de archivo no soportado: {archive_format}")
         # Reset cancel flag
         self._should_cancel = False
+        self.timer = StageTimer()
         
         try:
-            # Create temporary directory for processing
-            with tempfile.TemporaryDirectory() as temp_dir:
-                # Get list of image files
+            # Get list of image files
+            with self.timer.stage('scan'):
                 image_files = self._get_image_files(input_dir, pattern)
-                total_files = len(image_files)
-                
-                if not total_files:
-                    raise ValueError("No se encontraron imágenes en la carpeta")
+            total_files = len(image_files)
+            
+            if not total_files:
+                raise ValueError("No se encontraron imágenes en la carpeta")
+            
+            # Preserve original directory structure
+            root_dir_name = os.path.basename(input_dir)
+            
+            if compress:
+                # Suggest filename based on root directory
+                extension = ARCHIVE_FORMATS[archive_format]
+                suggested_filename = f"{root_dir_name}_PDFs{extension}"
                 
-                # Preserve original directory structure
-                root_dir_name = os.path.basename(input_dir)
+                # Modify output_file to use suggested filename if not specified
+                if not output_file.lower().endswith(extension):
+                    output_file = os.path.join(
+                        os.path.dirname(output_file), 
+                        suggested_filename
+                    )
                 
-                # Process each image
-                processed_files = []
-                for i, image_file in enumerate(image_files, 1):
+                # Convert in parallel and stream each PDF into the archive in sorted order
+                with open_archive(output_file, archive_format, ordered=True,
+                                  max_volume_bytes=volume_size) as archive, \
+                        closing(self._ordered(self._convert_to_pdf_buffer, image_files)) as results:
+                    for i, (image_file, buffer) in enumerate(results, 1):
+                        # Check for cancellation
+                        self._check_cancel()
+                        
+                        # Preserve relative path inside the ZIP
+                        relative_path = os.path.relpath(image_file, input_dir)
+                        pdf_filename = f"{os.path.splitext(os.path.basename(image_file))[0]}.pdf"
+                        arcname = os.path.join(
+                            root_dir_name, os.path.dirname(relative_path), pdf_filename
+                        )
+                        with buffer:
+                            archive.add(arcname, buffer.getvalue(), i - 1)
+                        
+                        # Update progress
+                        if progress_callback:
+                            progress_callback(i, total_files)
+                self.timer.add(
+                    'zip', archive.write_seconds, archive.bytes_written, archive.entries_written
+                )
+                self.archive_paths = archive.paths
+                self._finish_report(report_callback, total_files, compress)
+                return
+            
+            # Suggest filename based on root directory
+            suggested_filename = f"{root_dir_name}.pdf"
+            
+            # Modify output_file to use suggested filename if not specified
+            if not output_file.lower().endswith('.pdf'):
+                output_file = os.path.join(
+                    os.path.dirname(output_file), 
+                    suggested_filename
+                )
+            
+            # Workers encode complete pages in parallel; here they are only
+            # numbered and appended to the merged PDF in sorted order
+            with PdfStreamWriter(output_file) as pdf, \
+                    closing(self._ordered(self._encode_page, image_files)) as pages:
+                for i, (image_file, page) in enumerate(pages, 1):
                     # Check for cancellation
-                    if self._should_cancel:
-                        raise InterruptedError("Operación cancelada")
-                    
-                    # Preserve relative path
-                    relative_path = os.path.relpath(image_file, input_dir)
-                    relative_dir = os.path.dirname(relative_path)
+                    self._check_cancel()
                     
-                    # Create corresponding directory in temp_dir
-                    pdf_subdir = os.path.join(temp_dir, root_dir_name, relative_dir)
-                    os.makedirs(pdf_subdir, exist_ok=True)
-                    
-                    # Convert image to PDF
-                    pdf_filename = f"{os.path.splitext(os.path.basename(image_file))[0]}.pdf"
-                    pdf_path = os.path.join(pdf_subdir, pdf_filename)
-                    
-                    self._convert_to_pdf(image_file, pdf_path)
-                    processed_files.append(pdf_path)
+                    with closing(page), self.timer.stage('merge', page.size):
+                        pdf.add_blob(page)
                     
                     # Update progress
                     if progress_callback:
                         progress_callback(i, total_files)
-                
-                # Create final output
-                if compress:
-                    # Suggest filename based on root directory
-                    suggested_filename = f"{root_dir_name}_PDFs.zip"
-                    
-                    # Modify output_file to use suggested filename if not specified
-                    if not output_file.lower().endswith('.zip'):
-                        output_file = os.path.join(
-                            os.path.dirname(output_file), 
-                            suggested_filename
-                        )
-                    
-                    # Create ZIP with all PDFs, preserving directory structure
-                    with zipfile.ZipFile(output_file, 'w', zipfile.ZIP_DEFLATED) as zf:
-                        for root, _, files in os.walk(os.path.join(temp_dir, root_dir_name)):
-                            for file in files:
-                                file_path = os.path.join(root, file)
-                                arcname = os.path.relpath(file_path, temp_dir)
-                                zf.write(file_path, arcname)
-                else:
-                    # Suggest filename based on root directory
-                    suggested_filename = f"{root_dir_name}.pdf"
-                    
-                    # Modify output_file to use suggested filename if not specified
-                    if not output_file.lower().endswith('.pdf'):
-                        output_file = os.path.join(
-                            os.path.dirname(output_file), 
-                            suggested_filename
-                        )
-                    
-                    # Merge all PDFs into one
-                    pdfs = [
-                        f for f in processed_files 
-                        if f.lower().endswith('.pdf')
-                    ]
-                    
-                    # If only one PDF, just copy it
-                    if len(pdfs) == 1:
-                        shutil.copy2(pdfs[0], output_file)
-                    elif len(pdfs) > 1:
-                        self._merge_pdfs(pdfs, output_file)
+            self._finish_report(report_callback, total_files, compress)
                     
         except Exception as e:
             # Clean up any partial output
@@ -126,6 +164,19 @@ class ImageProcessor:
                 os.remove(output_file)
             raise e
             
+    def _ordered(self, fn: Callable, image_files: List[str]) -> Iterator:
+        """Run fn over the images on the worker pool, yielding (image, result) in order."""
+        return ordered_map(fn, image_files, self.max_workers, self.window)
+            
+    def _finish_report(self, report_callback: Optional[Callable[[dict], None]],
+                       total_files: int, compress: bool) -> None:
+        """Build the timing report of the batch and pass it to report_callback."""
+        self.last_report = self.timer.report(
+            engine='core.image_processor', images=total_files, compressed=compress
+        )
+        if report_callback:
+            report_callback(self.last_report)
+            
     def _get_image_files(self, directory: str, pattern: str) -> List[str]:
         """Get list of image files in directory.
         
@@ -138,22 +189,16 @@ class ImageProcessor:
         """
         image_files = []
         
-        for root, _, files in os.walk(directory):
-            for file in files:
-                # Check if file matches pattern
-                if not self._matches_pattern(file, pattern):
-                    continue
-                    
-                # Check if file is an image
-                file_path = os.path.join(root, file)
-                try:
-                    with Image.open(file_path) as img:
-                        img.verify()
-                    image_files.append(file_path)
-                except:
-                    continue
+        # Scanner yields pattern-matching files already sorted
+        for file_path in DirectoryScanner(pattern=pattern).iter_files(directory):
+            # Reading headers is slow on large trees; allow cancelling
+            self._check_cancel()
+            
+            # Check if file is an image from its first bytes
+            if self.classifier.classify(file_path) is not None:
+                image_files.append(file_path)
                     
-        return sorted(image_files)
+        return image_files
         
     def _matches_pattern(self, filename: str, pattern: str) -> bool:
         """Check if filename matches pattern.
@@ -175,23 +220,92 @@ class ImageProcessor:
             image_path: Path to input image
             output_path: Path to output PDF
         """
+        data = self._convert_to_pdf_bytes(image_path)
+        with self.timer.stage('write', len(data)):
+            with open(output_path, 'wb') as f:
+                f.write(data)
+            
+    def _convert_to_pdf_bytes(self, image_path: str) -> bytes:
+        """Convert single image to PDF in memory.
+        
+        Args:
+            image_path: Path to input image
+            
+        Returns:
+            PDF file contents
+        """
+        with self._convert_to_pdf_buffer(image_path) as buffer:
+            return buffer.getvalue()
+            
+    def _convert_to_pdf_buffer(self, image_path: str) -> SpooledBuffer:
+        """Convert single image to PDF in a buffer that spills to disk when large.
+        
+        Args:
+            image_path: Path to input image
+            
+        Returns:
+            Buffer holding the PDF (the caller closes it)
+        """
+        page, info = self._load_page(image_path)
+        buffer = SpooledBuffer(self.spool_bytes)
+        with page, self.timer.stage('encode'):
+            with PdfStreamWriter(buffer) as pdf:
+                pdf.add_jpeg_page(page, info, PAGE_RESOLUTION)
+        self.timer.add_bytes('encode', buffer.size)
+        return buffer
+        
+    def _encode_page(self, image_path: str) -> PageBlob:
+        """Load an image and serialise its page of the merged PDF.
+        
+        Args:
+            image_path: Path to input image
+            
+        Returns:
+            Page ready for PdfStreamWriter.add_blob (the caller closes it)
+        """
+        page, info = self._load_page(image_path)
         try:
-            with Image.open(image_path) as img:
-                # Convert to RGB if necessary
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                # Save as PDF
-                img.save(output_path, 'PDF', resolution=100.0)
+            return encode_page(page, info, PAGE_RESOLUTION)
         except Exception as e:
+            page.close()
             raise ValueError(f"Error al convertir {image_path}: {str(e)}")
-            
-    def _merge_pdfs(self, pdf_files: List[str], output_file: str) -> None:
-        """Merge multiple PDFs into one.
+        
+    def _load_page(self, image_path: str) -> Tuple[SpooledBuffer, JpegInfo]:
+        """Get the JPEG stream shown on the page of an image.
+        
+        JPEG files are embedded unchanged; other images are converted to RGB
+        and encoded the same way Pillow's PDF plugin does. The stream stays
+        in memory unless it is larger than spool_bytes.
         
         Args:
-            pdf_files: List of PDF files to merge
-            output_file: Output PDF file path
+            image_path: Path to input image
+            
+        Returns:
+            (buffer holding the JPEG stream, header information); the caller
+            closes the buffer
         """
-        # For now, just copy the first PDF
-        # TODO: Implement proper PDF merging
-        shutil.copy2(pdf_files[0], output_file)
+        buffer = SpooledBuffer(self.spool_bytes)
+        try:
+            self.timer.add_bytes('open', os.path.getsize(image_path))
+            # Embed JPEG data unchanged when possible
+            with self.timer.stage('open'):
+                jpeg = read_jpeg_passthrough(image_path)
+            if jpeg is not None:
+                buffer.write(jpeg[0])
+                return buffer, jpeg[1]
+            with self.timer.stage('open'):
+                image = open_image(image_path, self.classifier.cached_format(image_path))
+            with image:
+                # Convert to RGB if necessary
+                with self.timer.stage('convert'):
+                    img = image.convert('RGB') if image.mode != 'RGB' else image
+                # Decoding is done; stop here rather than encode a page nobody wants
+                self._check_cancel()
+                with self.timer.stage('encode'):
+                    return encode_jpeg(img, buffer)
+        except InterruptedError:
+            buffer.close()
+            raise
+        except Exception as e:
+            buffer.close()
+            raise ValueError(f"Error al convertir {image_path}: {str(e)}")
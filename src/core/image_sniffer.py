@@ -0,0 +1,142 @@
+"""
+Image type detection module.
+
+Decides whether a file is a convertible image from its first bytes instead of
+letting Pillow try every registered plugin and verify() the whole file.
+Results are cached by (path, size, mtime), so scanning the same tree again
+only reads the files that changed.
+"""
+from typing import Dict, Optional, Tuple
+import os
+import threading
+from PIL import Image
+
+# Bytes read from the start of each file; enough for every signature below
+HEADER_BYTES = 16
+
+# (offset, magic bytes, Pillow format)
+SIGNATURES = (
+    (0, b'\xff\xd8\xff', 'JPEG'),
+    (0, b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (0, b'GIF87a', 'GIF'),
+    (0, b'GIF89a', 'GIF'),
+    (0, b'II*\x00', 'TIFF'),
+    (0, b'MM\x00*', 'TIFF'),
+    (0, b'BM', 'BMP'),
+    (8, b'WEBP', 'WEBP'),
+)
+
+DEFAULT_MAX_ENTRIES = 500_000
+
+
+def sniff_format(header: bytes) -> Optional[str]:
+    """Identify an image format from the first bytes of a file.
+
+    Args:
+        header: At least HEADER_BYTES bytes from the start of the file
+
+    Returns:
+        Pillow format name, or None if no signature matches
+    """
+    for offset, magic, image_format in SIGNATURES:
+        if header[offset:offset + len(magic)] == magic:
+            if image_format == 'WEBP' and not header.startswith(b'RIFF'):
+                continue
+            return image_format
+    return None
+
+
+def open_image(path: str, image_format: Optional[str] = None) -> Image.Image:
+    """Open an image, trying only the plugin for its known format.
+
+    Args:
+        path: Path to the image
+        image_format: Format from sniff_format; None lets Pillow try them all
+
+    Returns:
+        Opened (lazily loaded) image
+    """
+    return Image.open(path, formats=[image_format] if image_format else None)
+
+
+class ImageClassifier:
+    """Thread-safe classifier of files into image formats.
+
+    A file is an image when its header matches a known signature and, with
+    check_header, Pillow can parse the header with that format's plugin
+    alone. Neither step decodes pixel data.
+    """
+
+    def __init__(self, check_header: bool = True, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """Initialize the classifier.
+
+        Args:
+            check_header: Also parse the header with Pillow to reject files
+                that only start like an image
+            max_entries: Cached files kept; the oldest are dropped first
+        """
+        self.check_header = check_header
+        self.max_entries = max_entries
+        # path -> ((size, mtime_ns), format or None)
+        self._cache: Dict[str, Tuple[Tuple[int, int], Optional[str]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _detect(self, path: str) -> Optional[str]:
+        with open(path, 'rb') as f:
+            image_format = sniff_format(f.read(HEADER_BYTES))
+        if image_format is not None and self.check_header:
+            try:
+                with open_image(path, image_format):
+                    pass
+            except Exception:
+                return None
+        return image_format
+
+    def classify(self, path: str, stat: Optional[os.stat_result] = None) -> Optional[str]:
+        """Return the image format of a file, or None if it is not an image.
+
+        Args:
+            path: Path to the file
+            stat: Result of os.stat(path) if the caller already has it
+
+        Returns:
+            Pillow format name or None (also for unreadable files)
+        """
+        try:
+            if stat is None:
+                stat = os.stat(path)
+        except OSError:
+            return None
+        signature = (stat.st_size, stat.st_mtime_ns)
+
+        with self._lock:
+            cached = self._cache.get(path)
+            if cached is not None and cached[0] == signature:
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+
+        try:
+            image_format = self._detect(path) if stat.st_size else None
+        except OSError:
+            return None
+
+        with self._lock:
+            self._cache.pop(path, None)
+            self._cache[path] = (signature, image_format)
+            while len(self._cache) > self.max_entries:
+                del self._cache[next(iter(self._cache))]
+        return image_format
+
+    def cached_format(self, path: str) -> Optional[str]:
+        """Format recorded for path by the last classify(), without touching the file."""
+        with self._lock:
+            cached = self._cache.get(path)
+        return cached[1] if cached is not None else None
+
+    def clear(self) -> None:
+        """Forget every cached result."""
+        with self._lock:
+            self._cache.clear()
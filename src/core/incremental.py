@@ -0,0 +1,148 @@
+"""
+Incremental conversion module.
+
+Keeps a sidecar manifest next to the converted images so that re-runs only
+convert sources that are new or changed since their PDF was produced.
+"""
+from typing import Dict, List, Optional
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = ".pdf_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def file_digest(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Compute the SHA-256 of a file.
+
+    Args:
+        path: File to hash
+        chunk_size: Bytes read per iteration
+
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ConversionManifest:
+    """Record of which sources produced which outputs, and from what state.
+
+    A source is up to date when its output exists, the conversion settings
+    match and its size and modification time are unchanged. With use_hash the
+    content hash is compared when only the time differs (e.g. after a copy
+    that touched timestamps). Sources without a manifest entry fall back to the
+    make rule: the output is current if it is newer than the source.
+    """
+
+    def __init__(self, root: str, settings: str = "", use_hash: bool = False):
+        """Load the manifest stored in root, if any.
+
+        Args:
+            root: Directory whose tree the manifest describes
+            settings: Conversion settings fingerprint; a change invalidates entries
+            use_hash: Whether to store and compare content hashes
+        """
+        self.root = os.path.abspath(root)
+        self.path = os.path.join(self.root, MANIFEST_NAME)
+        self.settings = settings
+        self.use_hash = use_hash
+        self.entries: Dict[str, dict] = {}
+        self._load()
+
+    def _key(self, source: str) -> str:
+        return os.path.relpath(os.path.abspath(source), self.root).replace(os.sep, '/')
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') == MANIFEST_VERSION:
+            self.entries = data.get('entries', {})
+
+    def save(self) -> None:
+        """Write the manifest atomically."""
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'entries': self.entries}, f)
+        os.replace(temp_path, self.path)
+
+    def is_up_to_date(self, source: str, output: str, stat: Optional[os.stat_result] = None) -> bool:
+        """Check whether output is current for source.
+
+        Args:
+            source: Source image path
+            output: Expected output PDF path
+            stat: Source stat result, if already available
+
+        Returns:
+            True if the source does not need converting
+        """
+        try:
+            output_stat = os.stat(output)
+        except OSError:
+            return False
+        stat = stat or os.stat(source)
+
+        entry = self.entries.get(self._key(source))
+        if entry is None:
+            # Outputs from earlier runs without a manifest: plain make rule
+            return output_stat.st_mtime_ns >= stat.st_mtime_ns
+
+        if entry.get('settings') != self.settings:
+            return False
+        if entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns:
+            return True
+        if self.use_hash and entry.get('sha256') and entry.get('size') == stat.st_size:
+            if file_digest(source) == entry['sha256']:
+                # Same content, only the timestamp moved
+                entry['mtime_ns'] = stat.st_mtime_ns
+                return True
+        return False
+
+    def record(self, source: str, output: str, stat: Optional[os.stat_result] = None) -> None:
+        """Record a successful conversion.
+
+        Args:
+            source: Source image path
+            output: Output PDF path
+            stat: Source stat taken before converting (preferred, so that a
+                change during conversion is detected on the next run)
+        """
+        stat = stat or os.stat(source)
+        entry = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'output': os.path.relpath(os.path.abspath(output), self.root).replace(os.sep, '/'),
+            'settings': self.settings,
+        }
+        if self.use_hash:
+            entry['sha256'] = file_digest(source)
+        self.entries[self._key(source)] = entry
+
+    def remove_orphans(self) -> List[str]:
+        """Delete outputs whose source no longer exists.
+
+        Only outputs recorded in the manifest are considered, so PDFs that
+        were not produced by the converter are never touched.
+
+        Returns:
+            Paths of the deleted outputs
+        """
+        removed = []
+        for key in list(self.entries):
+            if os.path.exists(os.path.join(self.root, key)):
+                continue
+            entry = self.entries.pop(key)
+            output = os.path.join(self.root, entry['output'])
+            if os.path.exists(output):
+                os.remove(output)
+                removed.append(output)
+        return removed
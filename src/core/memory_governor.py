@@ -0,0 +1,145 @@
+"""
+Memory governor module.
+
+Estimates how much memory decoding an image will take by reading only its
+header, and keeps the sum of those estimates for the images being converted
+at once under a global budget.
+"""
+from typing import Optional, Tuple, Union
+import os
+import threading
+import warnings
+from PIL import Image
+
+from .pdf_writer import read_jpeg_info
+
+# Pillow refuses to open images above twice its warning threshold; use the
+# same limit so that every image the governor accepts can also be decoded.
+DEFAULT_MAX_PIXELS = 2 * Image.MAX_IMAGE_PIXELS
+
+# Budget used when the amount of physical memory cannot be determined.
+DEFAULT_LIMIT_BYTES = 2 * 1024 * 1024 * 1024
+
+# Bytes per pixel of the decoded image, by Pillow mode.
+_BYTES_PER_PIXEL = {
+    '1': 1, 'L': 1, 'P': 1, 'LA': 2, 'PA': 2, 'I;16': 2,
+    'RGB': 3, 'YCbCr': 3, 'LAB': 3, 'HSV': 3,
+    'RGBA': 4, 'RGBX': 4, 'CMYK': 4, 'I': 4, 'F': 4,
+}
+
+# The decoded image plus the RGB copy made before resizing and encoding.
+_WORKING_COPIES = 2
+
+_JPEG_MODES = {1: 'L', 3: 'RGB', 4: 'CMYK'}
+
+
+class ImageTooLargeError(ValueError):
+    """Raised for images whose pixel count exceeds the configured limit."""
+
+
+def default_memory_limit() -> int:
+    """Half of the physical memory, or DEFAULT_LIMIT_BYTES if unknown."""
+    try:
+        total = os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        try:
+            import psutil
+            total = psutil.virtual_memory().total
+        except ImportError:
+            return DEFAULT_LIMIT_BYTES
+    return max(total // 2, 1)
+
+
+def read_image_header(path: Union[str, os.PathLike]) -> Tuple[int, int, str]:
+    """Read the size and mode of an image without decoding its pixels.
+
+    Args:
+        path: Path to the image
+
+    Returns:
+        (width, height, mode)
+
+    Raises:
+        ImageTooLargeError: If Pillow itself rejects the image as a decompression bomb
+        OSError: If the file cannot be read or is not an image
+    """
+    info = read_jpeg_info(path)
+    if info is not None:
+        return info.width, info.height, _JPEG_MODES.get(info.components, 'RGB')
+
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+            with Image.open(path) as img:
+                return img.width, img.height, img.mode
+    except Image.DecompressionBombError as e:
+        raise ImageTooLargeError(str(e)) from e
+
+
+def estimate_decode_bytes(width: int, height: int, mode: str) -> int:
+    """Estimate the peak memory needed to decode and convert an image."""
+    return width * height * _BYTES_PER_PIXEL.get(mode, 4) * _WORKING_COPIES
+
+
+class MemoryGovernor:
+    """Byte budget shared by the images being converted at the same time.
+
+    Callers estimate() an image before submitting it, try_reserve() the
+    estimate and release() it when the conversion finishes. An image that
+    does not fit waits until others complete; one larger than the whole
+    budget is let through only when nothing else is reserved, so it runs
+    alone instead of never running.
+    """
+
+    def __init__(self, limit_bytes: Optional[int] = None, max_pixels: Optional[int] = DEFAULT_MAX_PIXELS):
+        """Initialize the governor.
+
+        Args:
+            limit_bytes: Total budget; None uses default_memory_limit()
+            max_pixels: Images with more pixels are rejected; None disables the check
+        """
+        self.limit_bytes = limit_bytes or default_memory_limit()
+        self.max_pixels = max_pixels
+        self.in_use = 0
+        self._lock = threading.Lock()
+
+    def estimate(self, path: Union[str, os.PathLike]) -> int:
+        """Estimate the bytes needed to convert an image.
+
+        Args:
+            path: Path to the image
+
+        Returns:
+            Estimated bytes; 0 if the header cannot be read (the conversion
+            itself will then report the error)
+
+        Raises:
+            ImageTooLargeError: If the image exceeds max_pixels
+        """
+        try:
+            width, height, mode = read_image_header(path)
+        except OSError:
+            return 0
+        if self.max_pixels is not None and width * height > self.max_pixels:
+            raise ImageTooLargeError(
+                f"Imagen demasiado grande ({width}x{height} píxeles, "
+                f"máximo {self.max_pixels}): posible bomba de descompresión"
+            )
+        return estimate_decode_bytes(width, height, mode)
+
+    def try_reserve(self, nbytes: int) -> bool:
+        """Reserve nbytes of the budget if available.
+
+        Returns:
+            True if reserved; the caller must release() it later
+        """
+        with self._lock:
+            if self.in_use and self.in_use + nbytes > self.limit_bytes:
+                return False
+            self.in_use += nbytes
+            return True
+
+    def release(self, nbytes: int) -> None:
+        """Return a reservation to the budget."""
+        with self._lock:
+            self.in_use = max(0, self.in_use - nbytes)
@@ -1,18 +1,38 @@
 """
 PDF conversion module for creating PDFs from images.
 """
+from contextlib import closing
 from typing import List, Optional, Callable
 from pathlib import Path
 import os
 from PIL import Image
-from PyPDF2 import PdfMerger
-import tempfile
+
+from .pdf_writer import (
+    PageBlob, PdfStreamWriter, encode_image_page, encode_jpeg, encode_page,
+    read_jpeg_passthrough, try_jpeg_passthrough
+)
+from .pipeline import ordered_map
+from .scanner import DirectoryScanner
+from .spool import DEFAULT_SPOOL_BYTES, SpooledBuffer
+from .stage_timer import StageTimer
 
 class PDFConverter:
     """Handles conversion of images to PDF format."""
     
+    IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff'}
+    
     def __init__(self):
         self._cancel_requested = False
+        # Per-stage timings of the current or last conversion
+        self.timer = StageTimer()
+        self.last_report: Optional[dict] = None
+        # Pages larger than this are encoded into a temporary file instead
+        # of memory (None keeps them all in memory)
+        self.spool_bytes: Optional[int] = DEFAULT_SPOOL_BYTES
+        # Threads encoding pages at once (None = CPUs, at most 4; 1 = sequential)
+        self.max_workers: Optional[int] = None
+        # Encoded pages waiting to be written at most (None = 4 per worker)
+        self.window: Optional[int] = None
         
     def convert_image_to_pdf(self,
                             image_path: str,
@@ -33,13 +53,27 @@ class PDFConverter:
             output_path = str(Path(image_path).with_suffix('.pdf'))
             
         try:
-            with Image.open(image_path) as img:
+            # Embed JPEG data unchanged when possible
+            with self.timer.stage('write'):
+                passthrough = try_jpeg_passthrough(image_path, output_path, 100.0)
+            if passthrough:
+                self.timer.add_bytes('write', os.path.getsize(output_path))
+                if progress_callback:
+                    progress_callback(1, 1)
+                return output_path
+                
+            with self.timer.stage('open'):
+                image = Image.open(image_path)
+            with image as img:
                 # Convert to RGB if necessary
-                if img.mode in ('RGBA', 'P'):
-                    img = img.convert('RGB')
+                with self.timer.stage('convert'):
+                    if img.mode in ('RGBA', 'P'):
+                        img = img.convert('RGB')
                     
-                # Save as PDF
-                img.save(output_path, 'PDF', resolution=100.0)
+                # Save as PDF (encoding and writing happen together)
+                with self.timer.stage('encode'):
+                    img.save(output_path, 'PDF', resolution=100.0)
+                self.timer.add_bytes('encode', os.path.getsize(output_path))
                 
                 if progress_callback:
                     progress_callback(1, 1)
@@ -53,7 +87,8 @@ class PDFConverter:
                          input_dir: str,
                          output_path: str,
                          pattern: str = "*",
-                         progress_callback: Optional[Callable[[int, int], None]] = None) -> str:
+                         progress_callback: Optional[Callable[[int, int], None]] = None,
+                         report_callback: Optional[Callable[[dict], None]] = None) -> str:
         """
         Convert all images in a directory to a single PDF.
         
@@ -62,52 +97,101 @@ class PDFConverter:
             output_path: Output PDF path
             pattern: File pattern to match
             progress_callback: Optional progress callback
+            report_callback: Optional callback receiving the per-stage timing
+                report (StageTimer.report) when the conversion completes
             
         Returns:
             Path to output PDF
         """
         self._cancel_requested = False
-        image_files = []
+        self.timer = StageTimer()
         
-        # Collect image files
-        for ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff']:
-            image_files.extend(Path(input_dir).glob(f"*{ext}"))
-            image_files.extend(Path(input_dir).glob(f"*{ext.upper()}"))
+        # Collect image files (top level only, sorted) in a single listing
+        scanner = DirectoryScanner(
+            extensions=self.IMAGE_EXTENSIONS,
+            pattern=pattern,
+            recursive=False
+        )
+        with self.timer.stage('scan'):
+            image_files = [Path(p) for p in scanner.iter_files(input_dir)]
             
         if not image_files:
             raise ValueError(f"No image files found in {input_dir}")
-            
-        # Sort files for consistent ordering
-        image_files.sort()
         
-        # Create temporary directory for individual PDFs
-        with tempfile.TemporaryDirectory() as temp_dir:
-            pdf_files = []
-            total_files = len(image_files)
-            
-            # Convert each image to PDF
-            for i, image_path in enumerate(image_files, 1):
-                if self._cancel_requested:
-                    raise InterruptedError("Conversion cancelled by user")
-                    
-                temp_pdf = Path(temp_dir) / f"{image_path.stem}.pdf"
-                self.convert_image_to_pdf(str(image_path), str(temp_pdf))
-                pdf_files.append(temp_pdf)
+        total_files = len(image_files)
+        
+        # Workers encode complete pages in parallel; they are numbered and
+        # written straight into the output PDF in sorted order (a failed or
+        # cancelled conversion leaves no truncated file behind)
+        pages = ordered_map(self._encode_page, [str(p) for p in image_files],
+                            self.max_workers, self.window)
+        with PdfStreamWriter(output_path) as pdf, closing(pages):
+            for i, (_, page) in enumerate(pages, 1):
+                self._check_cancel()
+                
+                with closing(page), self.timer.stage('merge', page.size):
+                    pdf.add_blob(page)
                 
                 if progress_callback:
                     progress_callback(i, total_files)
-                    
-            # Merge PDFs
-            merger = PdfMerger()
-            for pdf_file in pdf_files:
-                merger.append(str(pdf_file))
-                
-            # Save final PDF
-            merger.write(output_path)
-            merger.close()
-            
+        
+        self.last_report = self.timer.report(
+            engine='core.pdf_converter', images=len(image_files)
+        )
+        if report_callback:
+            report_callback(self.last_report)
         return output_path
         
+    def _encode_page(self, image_path: str) -> PageBlob:
+        """
+        Load an image and serialise its page (runs on the worker threads).
+        
+        JPEG files are embedded unchanged. Bilevel and CMYK images keep their
+        own encoding (CCITT Group 4 and CMYK JPEG, as Pillow's PDF plugin
+        stores them); other images are converted to RGB (or kept grayscale)
+        and JPEG-encoded. The JPEG stream stays in memory unless it is
+        larger than spool_bytes.
+        
+        Args:
+            image_path: Path to input image
+            
+        Returns:
+            Page ready for PdfStreamWriter.add_blob
+        """
+        self._check_cancel()
+        buffer = SpooledBuffer(self.spool_bytes)
+        try:
+            with self.timer.stage('open'):
+                jpeg = read_jpeg_passthrough(image_path)
+            if jpeg is not None:
+                buffer.write(jpeg[0])
+                return encode_page(buffer, jpeg[1], 100.0)
+                
+            with self.timer.stage('open'):
+                image = Image.open(image_path)
+            with image as img:
+                if img.mode in ('1', 'CMYK'):
+                    buffer.close()
+                    with self.timer.stage('encode'):
+                        page = encode_image_page(img, 100.0)
+                    self.timer.add_bytes('encode', page.size)
+                    return page
+                with self.timer.stage('convert'):
+                    if img.mode not in ('RGB', 'L'):
+                        img = img.convert('RGB')
+                with self.timer.stage('encode'):
+                    _, info = encode_jpeg(img, buffer)
+            self.timer.add_bytes('encode', buffer.size)
+            return encode_page(buffer, info, 100.0)
+        except Exception as e:
+            buffer.close()
+            raise RuntimeError(f"Error converting {image_path}: {e}")
+        
     def cancel_conversion(self):
         """Cancel ongoing conversion process."""
         self._cancel_requested = True
+        
+    def _check_cancel(self) -> None:
+        """Safe point: stop the current conversion if cancellation was requested."""
+        if self._cancel_requested:
+            raise InterruptedError("Conversion cancelled by user")
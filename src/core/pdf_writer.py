@@ -0,0 +1,557 @@
+"""
+Low-level PDF writing module.
+
+Builds PDF files directly from encoded image data so that JPEG sources can be
+embedded as-is (DCTDecode) instead of being decoded and re-encoded by Pillow,
+either one image per file or many pages streamed into a single file.
+"""
+from typing import BinaryIO, NamedTuple, Optional, Tuple, Union
+import io
+import os
+import zlib
+
+from .spool import SpooledBuffer
+
+# Start-of-frame markers whose streams PDF readers can decode with DCTDecode:
+# baseline, extended sequential and progressive Huffman-coded JPEG.
+_SOF_PASSTHROUGH = {0xC0, 0xC1, 0xC2}
+
+# Every other start-of-frame marker (lossless, hierarchical, arithmetic).
+_SOF_OTHER = {0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+# Markers without a length field.
+_STANDALONE_MARKERS = {0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7}
+
+_COLOR_SPACES = {1: b"/DeviceGray", 3: b"/DeviceRGB"}
+
+
+class JpegInfo(NamedTuple):
+    """Header information of a JPEG stream."""
+    width: int
+    height: int
+    components: int
+    precision: int
+    sof_marker: int
+
+    @property
+    def can_passthrough(self) -> bool:
+        """Whether the stream can be embedded unchanged as a DCTDecode image."""
+        return (
+            self.sof_marker in _SOF_PASSTHROUGH
+            and self.precision == 8
+            and self.components in _COLOR_SPACES
+            and self.width > 0
+            and self.height > 0
+        )
+
+
+def read_jpeg_info(source: Union[str, os.PathLike, BinaryIO]) -> Optional[JpegInfo]:
+    """Read the frame header of a JPEG file without decoding it.
+
+    Only the marker segments up to the start-of-frame are read.
+
+    Args:
+        source: Path or binary file object positioned at the start of the JPEG
+
+    Returns:
+        JpegInfo, or None if the source is not a readable JPEG
+    """
+    if isinstance(source, (str, os.PathLike)):
+        try:
+            with open(source, "rb") as f:
+                return read_jpeg_info(f)
+        except OSError:
+            return None
+
+    f = source
+    if f.read(2) != b"\xff\xd8":
+        return None
+
+    while True:
+        byte = f.read(1)
+        if not byte:
+            return None
+        if byte != b"\xff":
+            continue
+        marker = f.read(1)
+        # Skip fill bytes
+        while marker == b"\xff":
+            marker = f.read(1)
+        if not marker:
+            return None
+        code = marker[0]
+        if code in _STANDALONE_MARKERS:
+            continue
+        if code in (0xD9, 0xDA):
+            # End of image or start of scan before any frame header
+            return None
+
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = int.from_bytes(length_bytes, "big")
+        if length < 2:
+            return None
+
+        if code in _SOF_PASSTHROUGH or code in _SOF_OTHER:
+            header = f.read(6)
+            if len(header) < 6:
+                return None
+            return JpegInfo(
+                width=int.from_bytes(header[3:5], "big"),
+                height=int.from_bytes(header[1:3], "big"),
+                components=header[5],
+                precision=header[0],
+                sof_marker=code,
+            )
+
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def page_size(width: int, height: int, resolution: float) -> Tuple[float, float]:
+    """Page size in points for an image shown at the given resolution (dpi)."""
+    return width * 72.0 / resolution, height * 72.0 / resolution
+
+
+def _format_number(value: float) -> bytes:
+    """Format a number the way PDF expects (no exponent, trimmed zeros)."""
+    text = f"{value:.4f}".rstrip("0").rstrip(".")
+    return text.encode("ascii")
+
+
+def _xobject_header(width: int, height: int, attributes: bytes, length: int) -> bytes:
+    """Start of an image XObject whose stream is length bytes long.
+
+    attributes holds the color space, bit depth, filter and any decode
+    entries of the dictionary.
+    """
+    return (
+        b"<< /Type /XObject /Subtype /Image /Width %d /Height %d " % (width, height)
+        + attributes + b" /Length %d >>\nstream\n" % length
+    )
+
+
+def _image_xobject_header(length: int, info: JpegInfo) -> bytes:
+    """Start of an image XObject embedding a JPEG stream of length bytes unchanged."""
+    return _xobject_header(
+        info.width, info.height,
+        b"/ColorSpace %s /BitsPerComponent 8 /Filter /DCTDecode" % _COLOR_SPACES[info.components],
+        length,
+    )
+
+
+def _image_xobject(data: bytes, info: JpegInfo) -> bytes:
+    """Body of an image XObject embedding a JPEG stream unchanged."""
+    return _image_xobject_header(len(data), info) + data + b"\nendstream"
+
+
+def _page_geometry(width: int, height: int, resolution: float) -> Tuple[bytes, bytes]:
+    """MediaBox array and content stream body showing one full-page image."""
+    width_pt, height_pt = page_size(width, height, resolution)
+    w = _format_number(width_pt)
+    h = _format_number(height_pt)
+    stream = b"q " + w + b" 0 0 " + h + b" 0 0 cm /Im0 Do Q"
+    return (
+        b"[0 0 " + w + b" " + h + b"]",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+    )
+
+
+def _page_body(media_box: bytes, parent: int, image: int, content: int) -> bytes:
+    """Body of a page object showing image through the content stream."""
+    return (
+        b"<< /Type /Page /Parent %d 0 R /MediaBox " % parent + media_box
+        + b" /Resources << /XObject << /Im0 %d 0 R >> >> /Contents %d 0 R >>" % (image, content)
+    )
+
+
+def _page_objects(info: JpegInfo, resolution: float, parent: int,
+                  image: int, content: int) -> Tuple[bytes, bytes]:
+    """Bodies of the page object and content stream showing one full-page image."""
+    media_box, content_body = _page_geometry(info.width, info.height, resolution)
+    return _page_body(media_box, parent, image, content), content_body
+
+
+class PageBlob(NamedTuple):
+    """A page serialised ahead of time by encode_page(), ready to append.
+
+    Object numbers are only known once the page takes its place in the
+    output, so the blob holds the image and content stream bodies without
+    their 'N 0 obj' lines and the writer adds those, and the small page
+    object, as it appends them.
+    """
+    # Image XObject dictionary up to the 'stream' keyword
+    image_header: bytes
+    # JPEG stream, in memory or spooled
+    image_data: Union[bytes, SpooledBuffer]
+    # Complete content stream body
+    content: bytes
+    # Page MediaBox array
+    media_box: bytes
+
+    @property
+    def size(self) -> int:
+        """Bytes of the JPEG stream."""
+        data = self.image_data
+        return data.size if isinstance(data, SpooledBuffer) else len(data)
+
+    def close(self) -> None:
+        """Release a spooled JPEG stream."""
+        if isinstance(self.image_data, SpooledBuffer):
+            self.image_data.close()
+
+
+def encode_page(data: Union[bytes, SpooledBuffer], info: JpegInfo, resolution: float = 100.0) -> PageBlob:
+    """Serialise everything about a page that does not depend on its position.
+
+    Safe to call from worker threads; PdfStreamWriter.add_blob() then only
+    numbers the objects and writes them.
+
+    Args:
+        data: Complete JPEG stream, as bytes or a spool.SpooledBuffer
+        info: Its header information (read_jpeg_info or encode_jpeg)
+        resolution: Resolution in dpi used to compute the page size
+
+    Returns:
+        PageBlob owning data
+    """
+    if not info.can_passthrough:
+        raise ValueError("JPEG stream cannot be embedded without re-encoding")
+    length = data.size if isinstance(data, SpooledBuffer) else len(data)
+    media_box, content = _page_geometry(info.width, info.height, resolution)
+    return PageBlob(_image_xobject_header(length, info), data, content, media_box)
+
+
+def _group4_stream(image) -> Optional[bytes]:
+    """CCITT Group 4 data of a bilevel image, or None without libtiff."""
+    from PIL import Image, features
+    if not features.check('libtiff'):
+        return None
+    tiff = io.BytesIO()
+    # A single strip holds the whole image as one G4 stream
+    image.save(tiff, 'TIFF', compression='group4',
+               strip_size=(image.width + 7) // 8 * image.height)
+    tiff.seek(0)
+    with Image.open(tiff) as encoded:
+        offsets = encoded.tag_v2[273]
+        counts = encoded.tag_v2[279]
+    if len(offsets) != 1:
+        return None
+    data = tiff.getvalue()
+    return data[offsets[0]:offsets[0] + counts[0]]
+
+
+def encode_image_page(image, resolution: float = 100.0) -> PageBlob:
+    """Serialise the page of an image that must not become an RGB JPEG.
+
+    Bilevel images ('1') are stored losslessly as CCITT Group 4 (Flate when
+    Pillow lacks libtiff), usually far smaller than any JPEG of the same
+    scan. CMYK images keep their color space in a DCTDecode stream, the way
+    Pillow's PDF plugin writes them.
+
+    Args:
+        image: Image in mode '1' or 'CMYK'
+        resolution: Resolution in dpi used to compute the page size
+
+    Returns:
+        PageBlob
+    """
+    width, height = image.size
+    if image.mode == '1':
+        data = _group4_stream(image)
+        if data is not None:
+            attributes = (
+                b"/ColorSpace /DeviceGray /BitsPerComponent 1 /Filter [/CCITTFaxDecode]"
+                b" /DecodeParms [<< /K -1 /BlackIs1 true /Columns %d /Rows %d >>]" % (width, height)
+            )
+        else:
+            # Pillow packs '1' rows with 1 = white, as DeviceGray expects
+            data = zlib.compress(image.tobytes(), 6)
+            attributes = b"/ColorSpace /DeviceGray /BitsPerComponent 1 /Filter /FlateDecode"
+    elif image.mode == 'CMYK':
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG')
+        data = buffer.getvalue()
+        # Pillow writes Adobe-style inverted CMYK JPEGs
+        attributes = (
+            b"/ColorSpace /DeviceCMYK /BitsPerComponent 8 /Filter /DCTDecode"
+            b" /Decode [1 0 1 0 1 0 1 0]"
+        )
+    else:
+        raise ValueError(f"Unsupported image mode for encode_image_page: {image.mode}")
+    media_box, content = _page_geometry(width, height, resolution)
+    return PageBlob(_xobject_header(width, height, attributes, len(data)), data, content, media_box)
+
+
+def _xref_and_trailer(offsets, xref_offset: int) -> bytes:
+    """Cross-reference table and trailer for objects 1..len(offsets), root object 1."""
+    out = bytearray(b"xref\n0 %d\n0000000000 65535 f \n" % (len(offsets) + 1))
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(offsets) + 1, xref_offset
+    )
+    return bytes(out)
+
+
+_HEADER = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+
+
+def jpeg_to_pdf_bytes(data: bytes, info: JpegInfo, resolution: float = 100.0) -> bytes:
+    """Build a single-page PDF that embeds a JPEG stream unchanged.
+
+    Args:
+        data: Complete JPEG file contents
+        info: Header information returned by read_jpeg_info
+        resolution: Resolution in dpi used to compute the page size
+
+    Returns:
+        PDF file contents
+    """
+    if not info.can_passthrough:
+        raise ValueError("JPEG stream cannot be embedded without re-encoding")
+
+    page, content = _page_objects(info, resolution, 2, 4, 5)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        page,
+        _image_xobject(data, info),
+        content,
+    ]
+
+    out = bytearray(_HEADER)
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    out += _xref_and_trailer(offsets, len(out))
+    return bytes(out)
+
+
+def encode_jpeg(image, output: Optional[BinaryIO] = None, **params) -> Tuple[Union[bytes, BinaryIO], JpegInfo]:
+    """Encode a Pillow image as a JPEG stream that can be embedded in a PDF.
+
+    Args:
+        image: Image in mode 'RGB' or 'L'
+        output: Writable buffer to encode into (e.g. a spool.SpooledBuffer);
+            by default the stream is returned as bytes
+        **params: JPEG save options (quality, subsampling...); Pillow's
+            defaults match what its own PDF plugin embeds
+
+    Returns:
+        (JPEG bytes or output, header information)
+    """
+    if image.mode not in ('RGB', 'L'):
+        raise ValueError(f"Unsupported image mode for DCTDecode: {image.mode}")
+    buffer = io.BytesIO() if output is None else output
+    image.save(buffer, 'JPEG', **params)
+    info = JpegInfo(image.width, image.height, 3 if image.mode == 'RGB' else 1, 8, 0xC0)
+    return (buffer.getvalue() if output is None else output), info
+
+
+class PdfStreamWriter:
+    """Write a multi-page PDF one page at a time.
+
+    The image, content stream and page object of each page go straight to the
+    output as they are added and only their byte offsets are kept, so memory
+    stays flat whatever the page count. close() writes the page tree, the
+    catalog and the cross-reference table. Not thread-safe: a single caller
+    adds pages in order.
+    """
+
+    # Object numbers reserved for the objects written by close()
+    _CATALOG = 1
+    _PAGES = 2
+
+    def __init__(self, output: Union[str, os.PathLike, BinaryIO]):
+        """Start the PDF.
+
+        Args:
+            output: Path of the file to create, or a binary file object
+                (left open by close())
+        """
+        if isinstance(output, (str, os.PathLike)):
+            self.path: Optional[str] = os.fspath(output)
+            self._file = open(self.path, 'wb')
+        else:
+            self.path = None
+            self._file = output
+        # Offset of each object by number - 1; the reserved ones are set by close()
+        self._offsets = [0, 0]
+        self._kids = []
+        self._position = 0
+        self._closed = False
+        self._write(_HEADER)
+
+    @property
+    def page_count(self) -> int:
+        return len(self._kids)
+
+    @property
+    def bytes_written(self) -> int:
+        return self._position
+
+    def _write(self, data: bytes) -> None:
+        self._file.write(data)
+        self._position += len(data)
+
+    def _write_object(self, number: int, body: bytes) -> None:
+        self._offsets[number - 1] = self._position
+        self._write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+
+    def _allocate(self) -> int:
+        self._offsets.append(0)
+        return len(self._offsets)
+
+    def add_jpeg_page(self, data: Union[bytes, SpooledBuffer], info: JpegInfo,
+                      resolution: float = 100.0) -> None:
+        """Append a page showing a JPEG stream, embedded unchanged.
+
+        Args:
+            data: Complete JPEG stream, as bytes or a spool.SpooledBuffer
+                (copied in chunks, so a spilled page is never fully loaded)
+            info: Its header information (read_jpeg_info or encode_jpeg)
+            resolution: Resolution in dpi used to compute the page size
+        """
+        self.add_blob(encode_page(data, info, resolution))
+
+    def add_blob(self, blob: PageBlob) -> None:
+        """Append a page serialised by encode_page().
+
+        Numbers its objects after those already written and records their
+        offsets for the xref; the image stream is copied as is.
+
+        Args:
+            blob: Page to append (left open; the caller closes it)
+        """
+        if self._closed:
+            raise ValueError("PDF already closed")
+        image, content, page = self._allocate(), self._allocate(), self._allocate()
+        self._offsets[image - 1] = self._position
+        self._write(b"%d 0 obj\n" % image + blob.image_header)
+        if isinstance(blob.image_data, SpooledBuffer):
+            self._position += blob.image_data.copy_to(self._file)
+        else:
+            self._write(blob.image_data)
+        self._write(b"\nendstream\nendobj\n")
+        self._write_object(content, blob.content)
+        self._write_object(page, _page_body(blob.media_box, self._PAGES, image, content))
+        self._kids.append(page)
+
+    def close(self) -> None:
+        """Write the page tree, catalog and xref and close the file."""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            kids = b" ".join(b"%d 0 R" % number for number in self._kids)
+            self._write_object(
+                self._PAGES, b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(self._kids)
+            )
+            self._write_object(self._CATALOG, b"<< /Type /Catalog /Pages %d 0 R >>" % self._PAGES)
+            self._write(_xref_and_trailer(self._offsets, self._position))
+        finally:
+            if self.path is not None:
+                self._file.close()
+
+    def abort(self) -> None:
+        """Stop writing and delete the partial file (when given a path)."""
+        self._closed = True
+        if self.path is not None:
+            self._file.close()
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def __enter__(self) -> 'PdfStreamWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def read_jpeg_passthrough(
+    image_path: Union[str, os.PathLike],
+    max_size: Optional[Tuple[int, int]] = None,
+) -> Optional[Tuple[bytes, JpegInfo]]:
+    """Read a JPEG that can be embedded in a PDF without re-encoding.
+
+    Args:
+        image_path: Path to the source image
+        max_size: Optional (width, height) limit; larger images need resizing
+
+    Returns:
+        (JPEG bytes, header information), or None if the caller must fall
+        back to Pillow
+    """
+    if os.path.splitext(str(image_path))[1].lower() not in (".jpg", ".jpeg", ".jpe", ".jfif"):
+        return None
+
+    try:
+        with open(image_path, "rb") as f:
+            info = read_jpeg_info(f)
+            if info is None or not info.can_passthrough:
+                return None
+            if max_size and (info.width > max_size[0] or info.height > max_size[1]):
+                return None
+            f.seek(0)
+            data = f.read()
+    except OSError:
+        return None
+
+    # A truncated file would produce a PDF that readers cannot render
+    if not data.rstrip(b"\x00").endswith(b"\xff\xd9"):
+        return None
+
+    return data, info
+
+
+def jpeg_passthrough_bytes(
+    image_path: Union[str, os.PathLike],
+    resolution: float = 100.0,
+    max_size: Optional[Tuple[int, int]] = None,
+) -> Optional[bytes]:
+    """Build a PDF from a JPEG without re-encoding when no pixel changes are needed.
+
+    Args:
+        image_path: Path to the source image
+        resolution: Resolution in dpi used to compute the page size
+        max_size: Optional (width, height) limit; larger images need resizing
+
+    Returns:
+        PDF file contents, or None if the caller must fall back to Pillow
+    """
+    jpeg = read_jpeg_passthrough(image_path, max_size)
+    if jpeg is None:
+        return None
+    return jpeg_to_pdf_bytes(jpeg[0], jpeg[1], resolution)
+
+
+def try_jpeg_passthrough(
+    image_path: Union[str, os.PathLike],
+    output_path: Union[str, os.PathLike],
+    resolution: float = 100.0,
+    max_size: Optional[Tuple[int, int]] = None,
+) -> bool:
+    """Write a JPEG to PDF without re-encoding when no pixel changes are needed.
+
+    Args:
+        image_path: Path to the source image
+        output_path: Path to the output PDF
+        resolution: Resolution in dpi used to compute the page size
+        max_size: Optional (width, height) limit; larger images need resizing
+
+    Returns:
+        True if the PDF was written, False if the caller must fall back to Pillow
+    """
+    pdf = jpeg_passthrough_bytes(image_path, resolution, max_size)
+    if pdf is None:
+        return False
+    with open(output_path, "wb") as f:
+        f.write(pdf)
+    return True
@@ -0,0 +1,66 @@
+"""
+Ordered parallel pipeline module.
+
+Runs the per-image work of a batch on a thread pool while the caller consumes
+the results one by one in input order, so a merged PDF or archive keeps the
+sorted page order. Pillow releases the GIL while decoding, resizing and
+encoding, which is where the time goes.
+"""
+from typing import Callable, Iterable, Iterator, Optional, Tuple, TypeVar
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+def default_workers() -> int:
+    """Worker threads used when none are given: the CPUs, at most 4."""
+    return min(os.cpu_count() or 1, 4)
+
+
+def ordered_map(fn: Callable[[T], R],
+                items: Iterable[T],
+                workers: Optional[int] = None,
+                window: Optional[int] = None) -> Iterator[Tuple[T, R]]:
+    """Apply fn to every item in parallel and yield the results in input order.
+
+    At most window items are submitted and not yet consumed, which bounds
+    the reorder buffer: when the next item in order is slow, finished results
+    wait behind it and no more work is submitted until it is done. An
+    exception raised by fn is re-raised when its item is reached; closing the
+    iterator early cancels the work not yet started.
+
+    Args:
+        fn: Work for one item, called from worker threads
+        items: Items in output order
+        workers: Worker threads (default: default_workers()); 1 runs inline
+        window: Items in flight at most (default: 4 per worker)
+
+    Yields:
+        (item, fn(item)) in the order of items
+    """
+    workers = workers or default_workers()
+    if workers <= 1:
+        for item in items:
+            yield item, fn(item)
+        return
+
+    window = max(window or workers * 4, workers)
+    pending = deque()
+    source = iter(items)
+    executor = ThreadPoolExecutor(workers, thread_name_prefix="pipeline")
+    try:
+        while True:
+            for item in source:
+                pending.append((item, executor.submit(fn, item)))
+                if len(pending) >= window:
+                    break
+            if not pending:
+                return
+            item, future = pending.popleft()
+            yield item, future.result()
+    finally:
+        # Work already running stops at its own cancellation points
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,143 @@
+"""
+Progress reporting module.
+
+Coalesces per-file progress callbacks into batches delivered at a bounded
+rate, so that the cost of updating a user interface does not grow with the
+number of files converted.
+"""
+from typing import Callable, List, NamedTuple, Optional, Tuple
+import threading
+import time
+
+
+class ProgressBatch(NamedTuple):
+    """Everything that happened since the previous batch."""
+    # Names converted since the previous batch (at most max_names)
+    converted: Tuple[str, ...]
+    # (name, error) pairs since the previous batch (at most max_names)
+    errors: Tuple[Tuple[str, str], ...]
+    # Names left out of the two lists above because of the limit
+    omitted: int
+    # Latest progress fraction reported, or None if none yet
+    progress: Optional[float]
+    # Running totals since the job started
+    total_converted: int
+    total_errors: int
+    # Whether this is the last batch of the job
+    final: bool = False
+
+
+class CoalescingCallbacks:
+    """Callbacks wrapper that turns per-file events into ProgressBatch events.
+
+    on_file_converted, on_file_error and on_progress are recorded instead of
+    forwarded, and at most max_rate times per second the wrapped object's
+    on_progress_batch(batch) is called with what accumulated. Any other
+    callback is forwarded unchanged after flushing pending events, so the
+    receiver sees events in the order they happened. The producer should
+    call poll() periodically so that batches are delivered while it waits.
+    """
+
+    def __init__(self,
+                 target,
+                 max_rate: float = 10.0,
+                 max_names: int = 50,
+                 clock: Callable[[], float] = time.monotonic):
+        """Wrap a callbacks object.
+
+        Args:
+            target: Object implementing on_progress_batch and the other callbacks
+            max_rate: Maximum batches per second
+            max_names: Maximum file names listed per batch
+            clock: Time source (seconds)
+        """
+        self._target = target
+        self._interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self._max_names = max_names
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._last_emit: Optional[float] = None
+        self._converted: List[str] = []
+        self._errors: List[Tuple[str, str]] = []
+        self._omitted = 0
+        self._progress: Optional[float] = None
+        self._total_converted = 0
+        self._total_errors = 0
+        self._dirty = False
+
+    def _room(self) -> bool:
+        if len(self._converted) + len(self._errors) < self._max_names:
+            return True
+        self._omitted += 1
+        return False
+
+    def on_file_converted(self, name: str) -> None:
+        """Record a converted file."""
+        with self._lock:
+            self._total_converted += 1
+            if self._room():
+                self._converted.append(name)
+            self._dirty = True
+        self.poll()
+
+    def on_file_error(self, name: str, error: str) -> None:
+        """Record a file that failed to convert."""
+        with self._lock:
+            self._total_errors += 1
+            if self._room():
+                self._errors.append((name, error))
+            self._dirty = True
+        self.poll()
+
+    def on_progress(self, value: float) -> None:
+        """Record the latest progress fraction."""
+        with self._lock:
+            self._progress = value
+            self._dirty = True
+        self.poll()
+
+    def _take(self, final: bool) -> ProgressBatch:
+        batch = ProgressBatch(
+            converted=tuple(self._converted),
+            errors=tuple(self._errors),
+            omitted=self._omitted,
+            progress=self._progress,
+            total_converted=self._total_converted,
+            total_errors=self._total_errors,
+            final=final,
+        )
+        self._converted = []
+        self._errors = []
+        self._omitted = 0
+        self._dirty = False
+        self._last_emit = self._clock()
+        return batch
+
+    def poll(self) -> None:
+        """Deliver pending events if the rate limit allows it."""
+        with self._lock:
+            if not self._dirty:
+                return
+            if self._last_emit is not None and self._clock() - self._last_emit < self._interval:
+                return
+            batch = self._take(False)
+        self._target.on_progress_batch(batch)
+
+    def flush(self, final: bool = False) -> None:
+        """Deliver pending events now, regardless of the rate limit."""
+        with self._lock:
+            if not self._dirty and not final:
+                return
+            batch = self._take(final)
+        self._target.on_progress_batch(batch)
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._target, name)
+        if not callable(attribute) or not name.startswith('on_'):
+            return attribute
+
+        def forward(*args, **kwargs):
+            # Keep ordering: pending file events happened before this one
+            self.flush(final=name == 'on_finish')
+            return attribute(*args, **kwargs)
+        return forward
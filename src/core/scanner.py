@@ -0,0 +1,207 @@
+"""
+Directory scanning module.
+
+Shared file discovery for the converters, built on os.scandir so that file
+types come from the directory entries (d_type) instead of one stat per file.
+Directory listings are fetched ahead of time by a thread pool, which hides the
+per-call latency of network shares, while files are still yielded one by one
+in sorted depth-first order.
+"""
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatch
+import os
+import threading
+import time
+
+# (name, path, is_dir)
+_Entry = Tuple[str, str, bool]
+
+
+class DirectoryScanner:
+    """Find files in a directory tree.
+
+    Files are yielded in the same order as sorting all their paths, each
+    directory being listed sorted (case-insensitively on Windows) and walked
+    depth-first. Directories reached twice through symbolic links are walked
+    only once, which also breaks symlink loops.
+    """
+
+    def __init__(self,
+                 extensions: Optional[Iterable[str]] = None,
+                 pattern: str = "*",
+                 recursive: bool = True,
+                 follow_symlinks: bool = True,
+                 workers: int = 8,
+                 max_prefetch: int = 64,
+                 progress_callback: Optional[Callable[[int], None]] = None,
+                 progress_interval: float = 0.2):
+        """Configure the scanner.
+
+        Args:
+            extensions: Lower-case extensions to keep (with dot); None keeps all files
+            pattern: Case-insensitive fnmatch pattern applied to file names
+            recursive: Whether to descend into subdirectories
+            follow_symlinks: Whether to descend into symlinked directories
+            workers: Threads listing directories in parallel (1 disables prefetch)
+            max_prefetch: Maximum directory listings fetched ahead of the walk
+            progress_callback: Called with the number of files found so far
+            progress_interval: Minimum seconds between progress calls
+        """
+        self.extensions = {e.lower() for e in extensions} if extensions is not None else None
+        self.pattern = pattern.lower() if pattern and pattern != "*" else None
+        self.recursive = recursive
+        self.follow_symlinks = follow_symlinks
+        self.workers = workers
+        self.max_prefetch = max_prefetch
+        self.progress_callback = progress_callback
+        self.progress_interval = progress_interval
+
+    def _matches(self, name: str) -> bool:
+        if self.extensions is not None and os.path.splitext(name)[1].lower() not in self.extensions:
+            return False
+        return self.pattern is None or fnmatch(name.lower(), self.pattern)
+
+    def _list(self, path: str) -> Tuple[Optional[Tuple[int, int]], List[_Entry]]:
+        """List one directory.
+
+        Returns:
+            ((st_dev, st_ino) or None if unknown, sorted matching entries)
+        """
+        try:
+            stat = os.stat(path)
+            key = (stat.st_dev, stat.st_ino) if stat.st_ino else None
+            entries = []
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=self.follow_symlinks):
+                            if self.recursive:
+                                entries.append((entry.name, entry.path, True))
+                        elif entry.is_file() and self._matches(entry.name):
+                            entries.append((entry.name, entry.path, False))
+                    except OSError:
+                        continue
+        except OSError:
+            return None, []
+        entries.sort(key=lambda e: os.path.normcase(e[0]))
+        return key, entries
+
+    def iter_files(self, root: str) -> Iterator[str]:
+        """Yield matching file paths under root.
+
+        Args:
+            root: Directory to scan
+
+        Yields:
+            Path of each matching file
+        """
+        pool = ThreadPoolExecutor(self.workers, thread_name_prefix="scanner") if self.workers > 1 else None
+        futures = {}
+        wanted = deque()
+        consumed = set()
+        visited = set()
+        found = 0
+        last_report = time.monotonic()
+
+        def fetch(path):
+            consumed.add(path)
+            future = futures.pop(path, None)
+            return future.result() if future is not None else self._list(path)
+
+        def prefetch(subdirs):
+            # Children of the directory just entered are needed before the
+            # remaining siblings of its ancestors
+            wanted.extendleft(reversed(subdirs))
+            while pool is not None and wanted and len(futures) < self.max_prefetch:
+                path = wanted.popleft()
+                if path not in consumed and path not in futures:
+                    futures[path] = pool.submit(self._list, path)
+
+        try:
+            key, entries = self._list(root)
+            if key is not None:
+                visited.add(key)
+            stack = [iter(entries)]
+            prefetch([path for _, path, is_dir in entries if is_dir])
+
+            while stack:
+                item = next(stack[-1], None)
+                if item is None:
+                    stack.pop()
+                    continue
+                _, path, is_dir = item
+                if not is_dir:
+                    found += 1
+                    if self.progress_callback and time.monotonic() - last_report >= self.progress_interval:
+                        last_report = time.monotonic()
+                        self.progress_callback(found)
+                    yield path
+                    continue
+
+                key, entries = fetch(path)
+                if key is not None and key in visited:
+                    prefetch([])
+                    continue
+                if key is not None:
+                    visited.add(key)
+                stack.append(iter(entries))
+                prefetch([p for _, p, d in entries if d])
+
+            if self.progress_callback:
+                self.progress_callback(found)
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+
+    def scan(self, root: str) -> List[str]:
+        """Return all matching file paths under root, sorted."""
+        return list(self.iter_files(root))
+
+
+class FileCounter:
+    """Count the files a scanner finds under root, in a background thread.
+
+    Only the running count is kept, so counting a huge tree costs a second
+    walk of its directory listings but no memory. It gives callers whose own
+    walk is throttled by the work it feeds a total long before that walk
+    reaches the end.
+    """
+
+    def __init__(self, scanner: DirectoryScanner, root: str):
+        """Start counting.
+
+        Args:
+            scanner: Scanner configured like the walk being measured
+            root: Directory to scan
+        """
+        self.count = 0
+        self._done = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(scanner, root), name="file-counter", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def total(self) -> Optional[int]:
+        """Number of files once the count is complete, None until then."""
+        return self.count if self._done.is_set() else None
+
+    def stop(self) -> None:
+        """Abandon the count; the thread ends at its next file or directory."""
+        self._stopped.set()
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[int]:
+        """Wait for the count to complete and return total."""
+        self._done.wait(timeout)
+        return self.total
+
+    def _run(self, scanner: DirectoryScanner, root: str) -> None:
+        for _ in scanner.iter_files(root):
+            if self._stopped.is_set():
+                return
+            self.count += 1
+        if not self._stopped.is_set():
+            self._done.set()
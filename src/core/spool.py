@@ -0,0 +1,88 @@
+"""
+Spooled buffer module.
+
+Intermediate per-image output (encoded pages, single-image PDFs) is kept in
+memory and only moved to a temporary file once it grows past a size limit, so
+ordinary pages never touch the filesystem (where every temp file is scanned
+by antivirus software on Windows) while a huge page cannot exhaust RAM.
+"""
+from typing import BinaryIO, Optional
+import shutil
+import tempfile
+
+# Bytes a buffer may hold in memory before moving to a temporary file
+DEFAULT_SPOOL_BYTES = 32 * 1024 * 1024
+
+# Chunk size used when copying a buffer into its destination
+COPY_CHUNK = 1024 * 1024
+
+
+class SpooledBuffer:
+    """Growable binary buffer that spills to disk above max_memory bytes.
+
+    Writable like a file (Pillow can save into it) but deliberately without
+    fileno(): Pillow asks for one to encode straight to disk, and that would
+    move every buffer to a temporary file.
+    """
+
+    def __init__(self, max_memory: Optional[int] = DEFAULT_SPOOL_BYTES, directory: Optional[str] = None):
+        """Create an empty buffer.
+
+        Args:
+            max_memory: Bytes kept in memory at most; None never spills
+            directory: Where the temporary file is created (default: system temp)
+        """
+        self._file = tempfile.SpooledTemporaryFile(max_size=max_memory or 0, dir=directory)
+
+    @property
+    def spilled(self) -> bool:
+        """Whether the contents were moved to a temporary file."""
+        return self._file._rolled
+
+    @property
+    def size(self) -> int:
+        position = self._file.tell()
+        self._file.seek(0, 2)
+        size = self._file.tell()
+        self._file.seek(position)
+        return size
+
+    def write(self, data: bytes) -> int:
+        return self._file.write(data)
+
+    def read(self, size: int = -1) -> bytes:
+        return self._file.read(size)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self._file.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def getvalue(self) -> bytes:
+        """Whole contents as bytes."""
+        self._file.seek(0)
+        return self._file.read()
+
+    def copy_to(self, output: BinaryIO) -> int:
+        """Copy the whole contents into output in chunks.
+
+        Returns:
+            Bytes copied
+        """
+        self._file.seek(0)
+        shutil.copyfileobj(self._file, output, COPY_CHUNK)
+        return self._file.tell()
+
+    def close(self) -> None:
+        """Release the memory or delete the temporary file."""
+        self._file.close()
+
+    def __enter__(self) -> 'SpooledBuffer':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
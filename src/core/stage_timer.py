@@ -0,0 +1,122 @@
+"""
+Stage timing module.
+
+Low-overhead wall-clock timers and byte counters for the stages of a
+conversion run (scan, open, thumbnail, convert, encode, write, zip), with an
+end-of-run breakdown that can be saved as JSON.
+"""
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+import json
+import os
+import threading
+import time
+
+# Stages in pipeline order; reports list them first, then any other stage.
+STAGES = ('scan', 'cache', 'open', 'thumbnail', 'convert', 'encode', 'write', 'zip', 'merge')
+
+REPORT_VERSION = 1
+
+
+class StageTimer:
+    """Accumulate seconds, call counts and bytes per stage.
+
+    Safe to share between threads. Stage times measured in workers are summed,
+    so with several workers the stage total can exceed the run's wall time;
+    workers in other processes report their own StageTimer.as_dict(), which
+    the parent combines with merge().
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        """Initialize an empty timer.
+
+        Args:
+            clock: Time source (seconds)
+        """
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Dict[str, float]] = {}
+        self._start = clock()
+
+    def add(self, stage: str, seconds: float, nbytes: int = 0, count: int = 1) -> None:
+        """Add a measurement to a stage."""
+        with self._lock:
+            totals = self._stages.setdefault(stage, {'seconds': 0.0, 'count': 0, 'bytes': 0})
+            totals['seconds'] += seconds
+            totals['count'] += count
+            totals['bytes'] += nbytes
+
+    def add_bytes(self, stage: str, nbytes: int) -> None:
+        """Count bytes for a stage without counting a call."""
+        self.add(stage, 0.0, nbytes, 0)
+
+    @contextmanager
+    def stage(self, name: str, nbytes: int = 0) -> Iterator[None]:
+        """Time the enclosed block as one call of stage name."""
+        start = self._clock()
+        try:
+            yield
+        finally:
+            self.add(name, self._clock() - start, nbytes)
+
+    def merge(self, stages: Optional[Dict[str, Dict[str, float]]]) -> None:
+        """Add the totals returned by another timer's as_dict()."""
+        for name, totals in (stages or {}).items():
+            self.add(name, totals['seconds'], int(totals['bytes']), int(totals['count']))
+
+    def as_dict(self) -> Dict[str, Dict[str, float]]:
+        """Per-stage totals: {stage: {'seconds', 'count', 'bytes'}}."""
+        with self._lock:
+            return {name: dict(totals) for name, totals in self._stages.items()}
+
+    def report(self, **extra) -> dict:
+        """Build the end-of-run breakdown.
+
+        Args:
+            **extra: Additional top-level fields (e.g. image counts, engine)
+
+        Returns:
+            Dictionary with wall_seconds, the stages in pipeline order with
+            their share of the measured time, and the extra fields
+        """
+        stages = self.as_dict()
+        order = [s for s in STAGES if s in stages] + sorted(s for s in stages if s not in STAGES)
+        measured = sum(totals['seconds'] for totals in stages.values())
+        breakdown = []
+        for name in order:
+            totals = stages[name]
+            breakdown.append({
+                'stage': name,
+                'seconds': round(totals['seconds'], 6),
+                'count': int(totals['count']),
+                'bytes': int(totals['bytes']),
+                'share': round(totals['seconds'] / measured, 4) if measured else 0.0,
+            })
+        report = {
+            'version': REPORT_VERSION,
+            'wall_seconds': round(self._clock() - self._start, 6),
+            'stages': breakdown,
+        }
+        report.update(extra)
+        return report
+
+
+def write_report(report: dict, path: str) -> None:
+    """Save a report as JSON, replacing any existing file atomically."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    os.replace(temp_path, path)
+
+
+def format_report(report: dict) -> str:
+    """Human-readable one-line-per-stage summary of a report."""
+    lines = [f"Tiempo total: {report['wall_seconds']:.2f} s"]
+    for entry in report['stages']:
+        line = f"{entry['stage']}: {entry['seconds']:.2f} s ({entry['share']:.0%}, {entry['count']} llamadas"
+        if entry['bytes']:
+            line += f", {entry['bytes'] / (1024 * 1024):.1f} MB"
+        lines.append(line + ")")
+    return "\n".join(lines)
@@ -0,0 +1,331 @@
+"""
+Folder watching module.
+
+Detects files created or modified under a directory tree and reports them once
+they have stopped changing, so that a file still being written by a scanner or
+a copy is never handed to a converter. Uses inotify on Linux and periodic
+directory snapshots elsewhere (or when inotify is unavailable).
+"""
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from fnmatch import fnmatch
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+
+# inotify constants (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+_WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_ONLYDIR
+# struct inotify_event: wd, mask, cookie, len (followed by the name)
+_EVENT = struct.Struct('iIII')
+_READ_SIZE = 64 * 1024
+
+# (size, mtime_ns)
+_Signature = Tuple[int, int]
+
+
+def _snapshot(root: str, matches: Callable[[str], bool]) -> Dict[str, _Signature]:
+    """Signature of every matching file under root.
+
+    DirEntry.stat() is served from the directory listing on Windows, so a
+    snapshot there costs one system call per directory rather than per file.
+    Symlinked directories are not followed.
+    """
+    files = {}
+    stack = [root]
+    while stack:
+        path = stack.pop()
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif matches(entry.name) and entry.is_file():
+                            stat = entry.stat()
+                            files[entry.path] = (stat.st_size, stat.st_mtime_ns)
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return files
+
+
+class _PollingBackend:
+    """Compare directory snapshots taken every interval seconds."""
+
+    name = 'polling'
+
+    def __init__(self, root: str, matches: Callable[[str], bool], interval: float,
+                 clock: Callable[[], float]):
+        self._root = root
+        self._matches = matches
+        self._interval = interval
+        self._clock = clock
+        self._files = _snapshot(root, matches)
+        self._next = clock() + interval
+
+    def read(self, timeout: float) -> Tuple[Set[str], bool]:
+        """Wait up to timeout for the next snapshot.
+
+        Returns:
+            (paths created or modified since the previous snapshot, False)
+        """
+        remaining = self._next - self._clock()
+        if remaining > timeout:
+            if timeout > 0:
+                time.sleep(timeout)
+            return set(), False
+        if remaining > 0:
+            time.sleep(remaining)
+        files = _snapshot(self._root, self._matches)
+        self._next = self._clock() + self._interval
+        changed = {path for path, signature in files.items() if self._files.get(path) != signature}
+        self._files = files
+        return changed, False
+
+    def close(self) -> None:
+        self._files = {}
+
+
+def _load_libc():
+    """The C library if it provides inotify, else None."""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+    except OSError:
+        return None
+    if not hasattr(libc, 'inotify_init1'):
+        return None
+    return libc
+
+
+class _InotifyBackend:
+    """Kernel change notifications for every directory of the tree."""
+
+    name = 'inotify'
+
+    def __init__(self, root: str, libc):
+        self._libc = libc
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            code = ctypes.get_errno()
+            raise OSError(code, os.strerror(code))
+        self._dirs: Dict[int, str] = {}
+        try:
+            self._watch_tree(root)
+        except OSError:
+            self.close()
+            raise
+
+    def _watch_tree(self, root: str) -> List[str]:
+        """Watch root and its subdirectories.
+
+        Returns:
+            Files already present in them (they may have landed before the
+            watch was added)
+        """
+        files = []
+        stack = [root]
+        while stack:
+            path = stack.pop()
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), _WATCH_MASK)
+            if wd < 0:
+                code = ctypes.get_errno()
+                if code in (errno.ENOENT, errno.ENOTDIR):
+                    # Removed or replaced before we got to it
+                    continue
+                # ENOSPC: fs.inotify.max_user_watches reached
+                raise OSError(code, os.strerror(code), path)
+            self._dirs[wd] = path
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        else:
+                            files.append(entry.path)
+            except OSError:
+                continue
+        return files
+
+    def read(self, timeout: float) -> Tuple[Set[str], bool]:
+        """Wait up to timeout for events.
+
+        Returns:
+            (paths with activity, whether the kernel queue overflowed and
+            events were lost)
+        """
+        ready, _, _ = select.select([self._fd], [], [], max(timeout, 0.0))
+        if not ready:
+            return set(), False
+        try:
+            data = os.read(self._fd, _READ_SIZE)
+        except BlockingIOError:
+            return set(), False
+
+        changed = set()
+        overflow = False
+        offset = 0
+        # The kernel only returns whole events
+        while offset + _EVENT.size <= len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b'\0')
+            offset += _EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    changed.update(self._watch_tree(path))
+                continue
+            changed.add(path)
+        return changed, overflow
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+        self._dirs = {}
+
+
+class FolderWatcher:
+    """Report files under a directory once they are created or modified and settled.
+
+    A file is reported when its size and modification time have not changed
+    for settle_seconds since the last activity seen on it, and it is not
+    empty. Files are reported again each time they change and settle. If
+    inotify cannot be used, or fails later (e.g. the watch limit is reached
+    when a directory is added), the watcher switches to polling and reports
+    every matching file once so that nothing is lost; consumers are expected
+    to skip files that are already up to date.
+    """
+
+    def __init__(self,
+                 root: str,
+                 extensions: Optional[Iterable[str]] = None,
+                 pattern: str = "*",
+                 settle_seconds: float = 1.0,
+                 poll_interval: float = 2.0,
+                 use_inotify: bool = True,
+                 clock: Callable[[], float] = time.monotonic):
+        """Start watching.
+
+        Args:
+            root: Directory to watch (including subdirectories)
+            extensions: Lower-case extensions to report (with dot); None reports all files
+            pattern: Case-insensitive fnmatch pattern applied to file names
+            settle_seconds: Quiet time after which a file is considered fully written
+            poll_interval: Seconds between snapshots when polling
+            use_inotify: Whether to use inotify when the platform supports it
+            clock: Time source (seconds)
+        """
+        self.root = os.path.abspath(root)
+        self.extensions = {e.lower() for e in extensions} if extensions is not None else None
+        self.pattern = pattern.lower() if pattern and pattern != "*" else None
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self._clock = clock
+        # path -> (last signature seen or None, time of the last change)
+        self._pending: Dict[str, Tuple[Optional[_Signature], float]] = {}
+        self._backend = None
+        libc = _load_libc() if use_inotify else None
+        if libc is not None:
+            try:
+                self._backend = _InotifyBackend(self.root, libc)
+            except OSError:
+                self._backend = None
+        if self._backend is None:
+            self._backend = _PollingBackend(self.root, self._matches, poll_interval, clock)
+
+    @property
+    def backend(self) -> str:
+        """'inotify' or 'polling'."""
+        return self._backend.name
+
+    @property
+    def pending(self) -> int:
+        """Files seen changing that have not settled yet."""
+        return len(self._pending)
+
+    def _matches(self, name: str) -> bool:
+        if self.extensions is not None and os.path.splitext(name)[1].lower() not in self.extensions:
+            return False
+        return self.pattern is None or fnmatch(name.lower(), self.pattern)
+
+    def _fall_back(self) -> Set[str]:
+        """Switch to polling; every matching file becomes a candidate."""
+        self._backend.close()
+        self._backend = _PollingBackend(self.root, self._matches, self.poll_interval, self._clock)
+        return set(self._backend._files)
+
+    def poll(self, timeout: float = 0.0) -> List[str]:
+        """Collect activity for up to timeout seconds.
+
+        Returns:
+            Sorted paths of the files that have settled since the last call
+        """
+        if self._pending:
+            # Do not sleep past the moment a pending file may settle
+            timeout = min(timeout, self.settle_seconds)
+        try:
+            changed, overflow = self._backend.read(timeout)
+            if overflow:
+                changed |= set(_snapshot(self.root, self._matches))
+        except OSError:
+            changed = self._fall_back()
+
+        now = self._clock()
+        for path in changed:
+            if self._matches(os.path.basename(path)):
+                self._pending[path] = (None, now)
+
+        ready = []
+        for path, (signature, since) in list(self._pending.items()):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # Deleted or renamed away before settling
+                del self._pending[path]
+                continue
+            current = (stat.st_size, stat.st_mtime_ns)
+            if current != signature:
+                self._pending[path] = (current, now if signature is not None else since)
+                continue
+            if stat.st_size and now - since >= self.settle_seconds:
+                del self._pending[path]
+                ready.append(path)
+        return sorted(ready)
+
+    def close(self) -> None:
+        """Stop watching."""
+        self._backend.close()
+        self._pending = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -3,13 +3,10 @@ Main window module for the PDF converter application.
 """
 import os
 import customtkinter as ctk
-from PIL import Image
 from tkinter import filedialog, messagebox
 import threading
-import pandas as pd
 from datetime import datetime
 
-from ..core.image_processor import ImageProcessor
 from ..core.text_normalizer import TextNormalizer
 
 class MainWindow(ctk.CTk):
@@ -18,8 +15,8 @@ class MainWindow(ctk.CTk):
     def __init__(self):
         super().__init__()
         
-        # Initialize components
-        self.image_processor = ImageProcessor()
+        # Initialize components (the image processor is created on first use)
+        self._image_processor = None
         self.text_normalizer = TextNormalizer()
         self.procesando = False
         self.modo_comprimido = ctk.BooleanVar(value=False)
@@ -28,6 +25,17 @@ class MainWindow(ctk.CTk):
         self._setup_window()
         self._create_widgets()
         
+    @property
+    def image_processor(self):
+        """Image processor, imported and created on first use.
+
+        Importing it loads Pillow, which is not needed to show the window.
+        """
+        if self._image_processor is None:
+            from ..core.image_processor import ImageProcessor
+            self._image_processor = ImageProcessor()
+        return self._image_processor
+        
     def _setup_window(self):
         """Configure main window properties."""
         self.title("Herramientas de Productividad")
@@ -41,16 +49,30 @@ class MainWindow(ctk.CTk):
     def _create_widgets(self):
         """Create and configure GUI widgets."""
         # Create tab view
-        self.notebook = ctk.CTkTabview(self)
+        self.notebook = ctk.CTkTabview(self, command=self._on_tab_changed)
         self.notebook.pack(pady=20, padx=20, fill="both", expand=True)
         
         # Add tabs in desired order
         self.tab_folders = self.notebook.add("Crear Carpetas")
         self.tab_convert = self.notebook.add("imagenes a PDFs")
         
-        # Create tab contents
-        self._create_folders_tab()
-        self._create_convert_tab()
+        # Create the visible tab's contents; the others are built when
+        # first selected
+        self._pending_tabs = {
+            "Crear Carpetas": self._create_folders_tab,
+            "imagenes a PDFs": self._create_convert_tab,
+        }
+        self._build_tab(self.notebook.get())
+        
+    def _on_tab_changed(self):
+        """Build the selected tab's contents if needed."""
+        self._build_tab(self.notebook.get())
+        
+    def _build_tab(self, name: str):
+        """Create a tab's contents the first time it is needed."""
+        create = self._pending_tabs.pop(name, None)
+        if create is not None:
+            create()
         
     def _create_folders_tab(self):
         """Create content for folders tab."""
@@ -207,6 +229,9 @@ class MainWindow(ctk.CTk):
     def _download_template(self):
         """Handle template download."""
         try:
+            # pandas is slow to import; load it only for templates
+            import pandas as pd
+            
             # Create new workbook
             wb = pd.DataFrame(columns=['ID', 'NOMBRES', 'APELLIDOS'])
             
@@ -257,6 +282,7 @@ class MainWindow(ctk.CTk):
             self._add_folder_detail(f"Cargando plantilla: {excel_path}")
             
             # Read Excel file
+            import pandas as pd
             df = pd.read_excel(excel_path)
             
             # Validate required columns
@@ -4,6 +4,12 @@ import time
 
 def agregar_detalle(text_widget, mensaje, tipo="info"):
     """Agregar mensaje al widget de detalles"""
+    agregar_detalles(text_widget, [mensaje], tipo)
+
+def agregar_detalles(text_widget, mensajes, tipo="info"):
+    """Agregar varios mensajes al widget de detalles con un solo redibujado"""
+    if not mensajes:
+        return
     prefijos = {
         "info": "ℹ️",
         "error": "❌",
@@ -12,7 +18,8 @@ def agregar_detalle(text_widget, mensaje, tipo="info"):
     }
     prefijo = prefijos.get(tipo, "")
     timestamp = datetime.now().strftime("%H:%M:%S")
-    text_widget.insert("end", f"[{timestamp}] {prefijo} {mensaje}\n")
+    texto = "".join(f"[{timestamp}] {prefijo} {mensaje}\n" for mensaje in mensajes)
+    text_widget.insert("end", texto)
     text_widget.see("end")
 
 def actualizar_progreso(progressbar, valor):
@@ -0,0 +1,211 @@
+"""
+Tests for the streaming archive writer.
+"""
+import os
+import tempfile
+import tarfile
+import threading
+import zipfile
+import pytest
+from src.core.archive import (
+    ARCHIVE_FORMATS, ZipStreamWriter, is_compressible, open_archive, volume_path
+)
+
+@pytest.fixture
+def zip_path():
+    """Create a temporary ZIP path."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        yield os.path.join(tmp_dir, 'output.zip')
+
+def test_writes_entries_from_many_threads(zip_path):
+    """Test that concurrent producers all end up in a valid archive."""
+    with ZipStreamWriter(zip_path) as archive:
+        def produce(n):
+            for i in range(20):
+                archive.add(f"dir{n}/file{i}.pdf", b"%PDF" * (i + 1))
+        threads = [threading.Thread(target=produce, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    with zipfile.ZipFile(zip_path) as zf:
+        assert zf.testzip() is None
+        assert len(zf.namelist()) == 80
+        assert zf.read("dir2/file3.pdf") == b"%PDF" * 4
+    assert archive.entries_written == 80
+
+def test_ordered_mode(zip_path):
+    """Test that ordered mode writes entries by index, skipping failures."""
+    with ZipStreamWriter(zip_path, ordered=True) as archive:
+        archive.add("c.pdf", b"c", 2)
+        archive.skip(1)
+        archive.add("d.pdf", b"d", 3)
+        archive.add("a.pdf", b"a", 0)
+
+    with zipfile.ZipFile(zip_path) as zf:
+        assert zf.namelist() == ["a.pdf", "c.pdf", "d.pdf"]
+
+    with pytest.raises(ValueError):
+        with ZipStreamWriter(zip_path, ordered=True) as archive:
+            archive.add("a.pdf", b"a")
+
+def test_abort_removes_partial_archive(zip_path):
+    """Test that aborting deletes the output file."""
+    with pytest.raises(RuntimeError):
+        with ZipStreamWriter(zip_path) as archive:
+            archive.add("a.pdf", b"a")
+            raise RuntimeError("fallo")
+    assert not os.path.exists(zip_path)
+
+def test_abort_discards_queued_entries(zip_path):
+    """Test that aborting never compresses or writes the entries still queued."""
+    gate = threading.Event()
+    prepared = []
+
+    class SlowWriter(ZipStreamWriter):
+        def _prepare(self, arcname, data):
+            prepared.append(arcname)
+            gate.wait()
+            return super()._prepare(arcname, data)
+
+    archive = SlowWriter(zip_path, queue_size=100, compress_workers=1)
+    for i in range(20):
+        archive.add(f"{i}.pdf", b"x" * 1000)
+    threading.Timer(0.2, gate.set).start()
+    archive.abort()
+    assert prepared == ["0.pdf"]
+    assert archive.entries_written <= 1
+    assert not os.path.exists(zip_path)
+
+    gate.set()
+    archive = ZipStreamWriter(zip_path, ordered=True)
+    for i in range(1, 20):
+        archive.add(f"{i}.pdf", b"x" * 1000, i)
+    archive.abort()
+    assert archive.entries_written == 0
+    assert not os.path.exists(zip_path)
+
+def test_os_separators_are_normalised(zip_path):
+    """Test that entry names use forward slashes."""
+    with ZipStreamWriter(zip_path) as archive:
+        archive.add(os.path.join("sub", "a.pdf"), b"a")
+    with zipfile.ZipFile(zip_path) as zf:
+        assert zf.namelist() == ["sub/a.pdf"]
+
+def test_adaptive_compression(zip_path):
+    """Test that incompressible entries are stored and the rest deflated."""
+    noise = os.urandom(200 * 1024)
+    text = b"%PDF-1.4 " * 20000
+    with ZipStreamWriter(zip_path, compress_workers=3) as archive:
+        archive.add("noise.pdf", noise)
+        archive.add("text.pdf", text)
+        archive.add("small.pdf", b"x")
+
+    with zipfile.ZipFile(zip_path) as zf:
+        assert zf.testzip() is None
+        assert zf.getinfo("noise.pdf").compress_type == zipfile.ZIP_STORED
+        assert zf.getinfo("text.pdf").compress_type == zipfile.ZIP_DEFLATED
+        # Deflating one byte makes it larger
+        assert zf.getinfo("small.pdf").compress_type == zipfile.ZIP_STORED
+        assert zf.read("noise.pdf") == noise
+        assert zf.read("text.pdf") == text
+    assert archive.entries_stored == 2
+    assert archive.bytes_written == len(noise) + len(text) + 1
+    assert archive.compressed_bytes < archive.bytes_written
+
+@pytest.mark.parametrize('compression', [zipfile.ZIP_STORED, zipfile.ZIP_BZIP2])
+def test_other_methods(zip_path, compression):
+    """Test that stored and zipfile-compressed archives stay valid."""
+    with ZipStreamWriter(zip_path, compression, ordered=True) as archive:
+        for i in reversed(range(10)):
+            archive.add(f"{i}.pdf", b"%PDF" * 1000 * (i + 1), i)
+
+    with zipfile.ZipFile(zip_path) as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == [f"{i}.pdf" for i in range(10)]
+        assert {info.compress_type for info in zf.infolist()} == {compression}
+
+def test_is_compressible():
+    """Test the sampling heuristic on both kinds of data."""
+    assert is_compressible(b"a" * 10)
+    assert is_compressible(b"0123456789" * 100000)
+    assert not is_compressible(os.urandom(1024 * 1024))
+
+@pytest.mark.parametrize('archive_format', ['tar', 'tar.gz'])
+def test_tar_formats(zip_path, archive_format):
+    """Test that tar archives are valid in both random and stream reading."""
+    path = zip_path.replace('.zip', ARCHIVE_FORMATS[archive_format])
+    noise = os.urandom(100 * 1024)
+    with open_archive(path, archive_format, ordered=True) as archive:
+        archive.add("b/noise.pdf", noise, 1)
+        archive.add("a.pdf", b"%PDF" * 5000, 0)
+        archive.add(os.path.join("ñ", "x" * 120 + ".pdf"), b"long name", 2)
+
+    with tarfile.open(path) as tf:
+        assert tf.getnames() == ["a.pdf", "b/noise.pdf", "ñ/" + "x" * 120 + ".pdf"]
+        assert tf.extractfile("b/noise.pdf").read() == noise
+    with tarfile.open(path, 'r|*') as tf:
+        assert len([tf.extractfile(member).read() for member in tf]) == 3
+    if archive_format == 'tar.gz':
+        assert archive.compressed_bytes < archive.bytes_written + 3 * 512
+
+@pytest.mark.parametrize('archive_format', ['zip', 'tar.gz'])
+def test_split_volumes(zip_path, archive_format):
+    """Test that volumes stay under the cap and are complete archives."""
+    path = zip_path.replace('.zip', ARCHIVE_FORMATS[archive_format])
+    cap = 250 * 1024
+    with open_archive(path, archive_format, ordered=True, max_volume_bytes=cap) as archive:
+        for i in range(10):
+            archive.add(f"{i}.pdf", os.urandom(60 * 1024), i)
+
+    assert archive.paths == [volume_path(path, n) for n in range(1, len(archive.paths) + 1)]
+    assert len(archive.paths) == 3
+    names = []
+    for volume in archive.paths:
+        assert os.path.getsize(volume) <= cap
+        if archive_format == 'zip':
+            with zipfile.ZipFile(volume) as zf:
+                assert zf.testzip() is None
+                names += zf.namelist()
+        else:
+            with tarfile.open(volume) as tf:
+                names += tf.getnames()
+    assert names == [f"{i}.pdf" for i in range(10)]
+
+def test_single_volume_keeps_name(zip_path):
+    """Test that an archive under the cap is not renamed as a volume."""
+    with open_archive(zip_path, max_volume_bytes=10 * 1024 * 1024) as archive:
+        archive.add("a.pdf", b"a")
+    assert archive.paths == [zip_path]
+    assert os.listdir(os.path.dirname(zip_path)) == ['output.zip']
+
+def test_abort_removes_volumes(zip_path):
+    """Test that aborting deletes every volume written so far."""
+    with pytest.raises(RuntimeError):
+        with open_archive(zip_path, 'zip-stored', ordered=True, max_volume_bytes=1024) as archive:
+            for i in range(5):
+                archive.add(f"{i}.pdf", b"x" * 800, i)
+            archive.close()
+            assert len(archive.paths) == 5
+            raise RuntimeError("fallo")
+    assert os.listdir(os.path.dirname(zip_path)) == []
+
+def test_abort_keeps_unrelated_file(zip_path):
+    """Test that aborting a split archive leaves a file at the plain path alone."""
+    with open(zip_path, 'wb') as f:
+        f.write(b"previo")
+    archive = open_archive(zip_path, max_volume_bytes=1024)
+    archive.add("a.pdf", b"a")
+    archive.abort()
+    with open(zip_path, 'rb') as f:
+        assert f.read() == b"previo"
+    assert os.listdir(os.path.dirname(zip_path)) == ['output.zip']
+
+def test_unknown_format(zip_path):
+    with pytest.raises(ValueError):
+        open_archive(zip_path, 'rar')
+
+def test_volume_path():
+    assert volume_path('/x/out.zip', 1) == '/x/out.part001.zip'
+    assert volume_path('out.tar.gz', 12) == 'out.part012.tar.gz'
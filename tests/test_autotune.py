@@ -0,0 +1,69 @@
+"""
+Tests for the worker autotuner.
+"""
+import json
+import os
+import tempfile
+from src.core.autotune import WorkerAutotuner
+
+class FakeClock:
+    """Manually advanced clock."""
+    def __init__(self):
+        self.now = 0.0
+    def __call__(self):
+        return self.now
+
+def _run(tuner, clock, throughput, windows):
+    """Feed the tuner with simulated throughput per worker count."""
+    history = []
+    for _ in range(windows):
+        rate = throughput(tuner.current)
+        count = 2 * tuner.current
+        clock.now += count / rate
+        tuner.record(count)
+        history.append(tuner.current)
+    return history
+
+def test_climbs_to_best_worker_count():
+    """Test that the tuner settles where throughput peaks."""
+    clock = FakeClock()
+    tuner = WorkerAutotuner(maximum=16, initial=2, clock=clock, min_sample_seconds=0, memory_probe=lambda: None)
+    # Throughput grows until 6 workers, then contention makes it worse
+    _run(tuner, clock, lambda n: 10 * n if n <= 6 else 60 - 5 * (n - 6), 20)
+    assert tuner.settled
+    assert tuner.current == 6
+
+def test_tries_fewer_workers_when_start_is_too_high():
+    """Test that the tuner also moves down."""
+    clock = FakeClock()
+    tuner = WorkerAutotuner(maximum=16, initial=8, clock=clock, min_sample_seconds=0, memory_probe=lambda: None)
+    _run(tuner, clock, lambda n: 100 - 10 * abs(n - 3), 20)
+    assert tuner.settled
+    assert tuner.current == 3
+
+def test_memory_pressure_shrinks_workers():
+    """Test that low memory removes workers even after settling."""
+    clock = FakeClock()
+    memory = [0.5]
+    tuner = WorkerAutotuner(maximum=8, initial=4, clock=clock, min_sample_seconds=0, memory_probe=lambda: memory[0])
+    _run(tuner, clock, lambda n: 10.0, 10)
+    before = tuner.current
+    memory[0] = 0.05
+    _run(tuner, clock, lambda n: 10.0, 1)
+    assert tuner.current == before - 1
+    assert tuner.maximum == tuner.current
+
+def test_persists_best_value():
+    """Test that the result is stored per key and reused."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        state_file = os.path.join(tmp_dir, 'autotune.json')
+        clock = FakeClock()
+        tuner = WorkerAutotuner(maximum=16, initial=2, key='threads',
+                                state_file=state_file, clock=clock, min_sample_seconds=0, memory_probe=lambda: None)
+        _run(tuner, clock, lambda n: 10 * min(n, 5), 20)
+        tuner.save()
+
+        with open(state_file) as f:
+            assert json.load(f) == {'threads': 5}
+        assert WorkerAutotuner(maximum=16, key='threads', state_file=state_file).current == 5
+        assert WorkerAutotuner(maximum=16, initial=2, key='processes', state_file=state_file).current == 2
@@ -0,0 +1,54 @@
+"""
+Tests for the benchmark suite.
+"""
+import hashlib
+import os
+import tempfile
+import pytest
+from benchmarks.corpus import CorpusSpec, generate_corpus, relative_path
+from benchmarks.bench import run_case, compare
+
+SPEC = CorpusSpec('tiny', 8, ('jpeg', 'png', 'tiff', 'palette', 'rgba'), ((64, 48), (120, 90)), depth=1, fanout=2)
+
+def _digests(root, files):
+    digests = []
+    for name in files:
+        with open(os.path.join(root, name), 'rb') as f:
+            digests.append(hashlib.sha256(f.read()).hexdigest())
+    return digests
+
+def test_corpus_is_deterministic():
+    """Test that the same spec produces identical files."""
+    with tempfile.TemporaryDirectory() as first, tempfile.TemporaryDirectory() as second:
+        files = generate_corpus(first, SPEC)
+        assert files == generate_corpus(second, SPEC)
+        assert _digests(first, files) == _digests(second, files)
+        assert len(files) == 8
+        # A matching manifest means the corpus is reused, not regenerated
+        assert generate_corpus(first, SPEC) == files
+
+def test_nested_paths():
+    """Test directory layout for nested corpora."""
+    spec = CorpusSpec('n', 100, depth=2, fanout=3)
+    assert relative_path(spec, 5, '.jpg') == os.path.join('d02', 'd01', 'img_000005.jpg')
+
+@pytest.mark.parametrize('engine, mode', [
+    ('app', 'threads'), ('app', 'threads-zip'), ('processor', 'zip'), ('core', 'pdf'),
+])
+def test_run_case_metrics(engine, mode):
+    """Test that every engine reports the benchmark metrics."""
+    with tempfile.TemporaryDirectory() as corpus, tempfile.TemporaryDirectory() as output:
+        # The core converter only reads the top level of the directory
+        generate_corpus(corpus, SPEC._replace(depth=0) if engine == 'core' else SPEC)
+        result = run_case(engine, mode, corpus, output)
+        assert result['images'] > 0
+        assert result['images_per_second'] > 0
+        assert result['time_to_first_output'] is not None
+        # Directory-mode runs must not leave PDFs in the corpus
+        assert not any(f.endswith('.pdf') for _, _, names in os.walk(corpus) for f in names)
+
+def test_compare_reports_relative_change():
+    """Test the baseline comparison."""
+    base = [{'profile': 'p', 'engine': 'app', 'mode': 'threads', 'images_per_second': 10.0}]
+    new = [{'profile': 'p', 'engine': 'app', 'mode': 'threads', 'images_per_second': 12.0}]
+    assert 'images_per_second +20.0%' in compare(new, base)[0]
@@ -0,0 +1,93 @@
+"""
+Pruebas del conversor por línea de comandos.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import zipfile
+import pytest
+from PIL import Image
+from src.cli import main, SALIDA_OK, SALIDA_CON_ERRORES, SALIDA_FALLO
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def carpeta():
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, 'sub'))
+        for i in range(3):
+            Image.new('RGB', (50, 50), color='red').save(os.path.join(tmp, f'img_{i}.png'))
+        Image.new('RGB', (50, 50), color='blue').save(os.path.join(tmp, 'sub', 'otra.jpg'))
+        yield tmp
+
+def test_modo_carpeta(carpeta, capsys):
+    """Prueba la conversión junto a las imágenes con resumen JSON"""
+    codigo = main([carpeta, '--workers', '2', '--backend', 'threads'])
+    resumen = json.loads(capsys.readouterr().out)
+    
+    assert codigo == SALIDA_OK
+    assert resumen['convertidas'] == 4
+    assert resumen['completado']
+    assert os.path.exists(os.path.join(carpeta, 'sub', 'otra.pdf'))
+    assert resumen['informe']['stages']
+
+def test_modo_zip_con_patron(carpeta, capsys):
+    """Prueba el ZIP de salida y el filtro por patrón"""
+    salida = os.path.join(carpeta, 'salida.zip')
+    codigo = main([carpeta, '--modo', 'zip', '--patron', 'img_*', '--salida', salida, '--silencioso'])
+    captura = capsys.readouterr()
+    
+    assert codigo == SALIDA_OK
+    assert captura.err == ''
+    assert json.loads(captura.out)['salida'] == salida
+    with zipfile.ZipFile(salida) as archivo:
+        assert sorted(archivo.namelist()) == ['img_0.pdf', 'img_1.pdf', 'img_2.pdf']
+
+def test_errores_en_codigo_de_salida(carpeta, capsys):
+    """Prueba que los archivos con error se reflejan en el código de salida"""
+    with open(os.path.join(carpeta, 'rota.png'), 'wb') as f:
+        f.write(b'no es una imagen')
+    codigo = main([carpeta, '--silencioso'])
+    resumen = json.loads(capsys.readouterr().out)
+    
+    assert codigo == SALIDA_CON_ERRORES
+    assert resumen['detalle_errores'][0]['archivo'] == 'rota.png'
+
+def test_errores_omitidos_en_lotes():
+    """Prueba que el total de errores no depende de los nombres listados en cada lote"""
+    from src.cli import ProgresoConsola
+    from src.core.progress import ProgressBatch
+    progreso = ProgresoConsola(silencioso=True)
+    errores = tuple((f"{i}.png", "rota") for i in range(50))
+    progreso.on_progress_batch(ProgressBatch((), errores, 10, 0.5, 0, 60))
+    
+    assert progreso.total_errores == 60
+    assert len(progreso.errores) == 50
+
+def test_motor_processor(carpeta, capsys):
+    """Prueba el motor ImageProcessor con un único PDF"""
+    salida = os.path.join(carpeta, 'todo.pdf')
+    codigo = main([carpeta, '--motor', 'processor', '--salida', salida])
+    resumen = json.loads(capsys.readouterr().out)
+    
+    assert codigo == SALIDA_OK
+    assert resumen['convertidas'] == 4
+    assert os.path.exists(salida)
+
+def test_combinacion_invalida(carpeta, capsys):
+    """Prueba que un modo no soportado por el motor falla sin convertir"""
+    assert main([carpeta, '--modo', 'pdf']) == SALIDA_FALLO
+    assert not any(f.endswith('.pdf') for f in os.listdir(carpeta))
+
+def test_no_importa_tkinter():
+    """Prueba que la línea de comandos no carga tkinter ni customtkinter"""
+    codigo = (
+        "import sys, src.cli; "
+        "print(sorted(m for m in sys.modules if 'tkinter' in m))"
+    )
+    salida = subprocess.run(
+        [sys.executable, '-c', codigo], cwd=RAIZ, capture_output=True, text=True, check=True
+    ).stdout
+    assert salida.strip() == '[]'
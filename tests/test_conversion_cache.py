@@ -0,0 +1,50 @@
+"""
+Tests for the content-addressed conversion cache.
+"""
+import os
+import tempfile
+import pytest
+from src.core.conversion_cache import ConversionCache
+
+@pytest.fixture
+def cache_dir():
+    """Create a temporary cache directory."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        yield tmp_dir
+
+def test_key_depends_on_content_and_settings(cache_dir):
+    """Test that keys are content-addressed and settings-aware."""
+    paths = []
+    for name, content in (('a.png', b'same'), ('b.png', b'same'), ('c.png', b'other')):
+        path = os.path.join(cache_dir, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        paths.append(path)
+
+    key_a = ConversionCache.make_key(paths[0], 'balanced')
+    assert key_a == ConversionCache.make_key(paths[1], 'balanced')
+    assert key_a != ConversionCache.make_key(paths[2], 'balanced')
+    assert key_a != ConversionCache.make_key(paths[0], 'fast')
+
+def test_get_and_put(cache_dir):
+    """Test storing and retrieving entries."""
+    cache = ConversionCache(os.path.join(cache_dir, 'cache'))
+    assert cache.get('ab' * 32) is None
+    cache.put('ab' * 32, b'%PDF-data')
+    assert cache.get('ab' * 32) == b'%PDF-data'
+    assert cache.size() == len(b'%PDF-data')
+
+def test_trim_evicts_least_recently_used(cache_dir):
+    """Test LRU eviction down to the size limit."""
+    cache = ConversionCache(os.path.join(cache_dir, 'cache'), max_bytes=250)
+    keys = [f"{i:02d}" * 32 for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.put(key, b'x' * 100)
+        os.utime(cache._path(key), (1000 + i, 1000 + i))
+
+    # Using the oldest entry makes it the most recent
+    cache.get(keys[0])
+    assert cache.trim() == 100
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[2]) is not None
@@ -0,0 +1,67 @@
+"""
+Tests for the core PDFConverter (single merged PDF).
+"""
+import os
+import tempfile
+import pytest
+from PIL import Image
+from PyPDF2 import PdfReader
+from src.core.pdf_converter import PDFConverter
+
+@pytest.fixture
+def image_dir():
+    """Create images in several modes and formats."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        Image.new('RGB', (100, 50), color='red').save(os.path.join(tmp_dir, 'a.jpg'))
+        Image.new('RGBA', (200, 50), color='blue').save(os.path.join(tmp_dir, 'b.png'))
+        Image.new('P', (300, 50)).save(os.path.join(tmp_dir, 'c.gif'))
+        Image.new('L', (400, 50), color=128).save(os.path.join(tmp_dir, 'd.bmp'))
+        with open(os.path.join(tmp_dir, 'notes.txt'), 'w') as f:
+            f.write('x')
+        yield tmp_dir
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_convert_directory_writes_every_page(image_dir, workers):
+    """Test that every image becomes a page, in sorted order."""
+    reports = []
+    with tempfile.TemporaryDirectory() as out_dir:
+        output = os.path.join(out_dir, 'out.pdf')
+        converter = PDFConverter()
+        converter.max_workers = workers
+        assert converter.convert_directory(image_dir, output, report_callback=reports.append) == output
+        
+        reader = PdfReader(output)
+        assert [round(float(p.mediabox.width) * 100 / 72) for p in reader.pages] == [100, 200, 300, 400]
+        assert os.listdir(out_dir) == ['out.pdf']
+    stages = {s['stage']: s for s in reports[0]['stages']}
+    assert stages['merge']['count'] == 4
+
+def test_cancel_removes_output(image_dir):
+    """Test that a cancelled conversion leaves no partial PDF."""
+    with tempfile.TemporaryDirectory() as out_dir:
+        output = os.path.join(out_dir, 'out.pdf')
+        converter = PDFConverter()
+        
+        def cancel(current, total):
+            converter.cancel_conversion()
+        
+        with pytest.raises(InterruptedError):
+            converter.convert_directory(image_dir, output, progress_callback=cancel)
+        assert os.listdir(out_dir) == []
+
+def test_bilevel_and_cmyk_keep_their_encoding():
+    """Test that bilevel scans stay lossless and CMYK keeps its color space."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        scan = Image.new('1', (800, 1100), 1)
+        scan.paste(0, (100, 100, 700, 140))
+        scan.save(os.path.join(tmp_dir, 'a.tiff'), compression='group4')
+        Image.new('CMYK', (40, 40), (0, 255, 0, 0)).save(os.path.join(tmp_dir, 'b.tiff'))
+        output = os.path.join(tmp_dir, 'out.pdf')
+        PDFConverter().convert_directory(tmp_dir, output)
+        
+        reader = PdfReader(output)
+        bilevel = reader.pages[0]['/Resources']['/XObject']['/Im0'].get_object()
+        assert bilevel['/Filter'] != '/DCTDecode'
+        assert bilevel['/BitsPerComponent'] == 1
+        cmyk = reader.pages[1]['/Resources']['/XObject']['/Im0'].get_object()
+        assert cmyk['/ColorSpace'] == '/DeviceCMYK'
@@ -3,7 +3,7 @@ import tkinter as tk
 import os
 import tempfile
 from datetime import datetime
-from src.utils.helpers import agregar_detalle, actualizar_progreso, generar_nombre_zip, validar_directorio
+from src.utils.helpers import agregar_detalle, agregar_detalles, actualizar_progreso, generar_nombre_zip, validar_directorio
 
 class TestHelpers(unittest.TestCase):
     def setUp(self):
@@ -46,6 +46,18 @@ class TestHelpers(unittest.TestCase):
         timestamp_format = r"\[\d{2}:\d{2}:\d{2}\]"
         self.assertRegex(contenido, timestamp_format)
 
+    def test_agregar_detalles(self):
+        """Prueba agregar varios detalles de una vez"""
+        agregar_detalles(self.text_widget, ["Uno", "Dos", "Tres"], "error")
+        lineas = self.text_widget.get("1.0", tk.END).strip().split("\n")
+        self.assertEqual(len(lineas), 3)
+        self.assertTrue(all("❌" in linea for linea in lineas))
+        self.assertIn("Dos", lineas[1])
+        
+        # Una lista vacía no agrega nada
+        agregar_detalles(self.text_widget, [])
+        self.assertEqual(len(self.text_widget.get("1.0", tk.END).strip().split("\n")), 3)
+
     def test_actualizar_progreso(self):
         """Prueba la actualización de la barra de progreso"""
         valores = [0, 0.5, 1]
@@ -0,0 +1,49 @@
+"""
+Tests for the image loading helpers.
+"""
+import os
+import tempfile
+import pytest
+from PIL import Image
+from src.core.image_loader import fit_size, downscale
+
+@pytest.fixture
+def large_images():
+    """Create large JPEG and PNG images."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        Image.new('RGB', (4000, 3000), color='red').save(os.path.join(tmp_dir, 'large.jpg'))
+        Image.new('RGB', (4000, 3000), color='blue').save(os.path.join(tmp_dir, 'large.png'))
+        Image.new('RGB', (500, 400), color='green').save(os.path.join(tmp_dir, 'small.jpg'))
+        yield tmp_dir
+
+def test_fit_size():
+    """Test aspect-preserving target size."""
+    assert fit_size((4000, 3000), (2000, 2000)) == (2000, 1500)
+    assert fit_size((3000, 4000), (2000, 2000)) == (1500, 2000)
+    assert fit_size((500, 400), (2000, 2000)) == (500, 400)
+
+@pytest.mark.parametrize("speed", ['quality', 'balanced', 'fast'])
+@pytest.mark.parametrize("name", ['large.jpg', 'large.png'])
+def test_downscale_reaches_target(large_images, speed, name):
+    """Test that every speed setting produces the exact target size."""
+    with Image.open(os.path.join(large_images, name)) as img:
+        result = downscale(img, (2000, 2000), speed)
+        assert result.size == (2000, 1500)
+
+def test_downscale_uses_jpeg_draft(large_images):
+    """Test that the fast setting decodes JPEGs at reduced scale."""
+    with Image.open(os.path.join(large_images, 'large.jpg')) as img:
+        downscale(img, (500, 500), 'fast')
+        # Draft mode reduced the decoded size to 1/8
+        assert img.size == (500, 375)
+
+def test_downscale_keeps_small_images(large_images):
+    """Test that images within the limit are returned untouched."""
+    with Image.open(os.path.join(large_images, 'small.jpg')) as img:
+        assert downscale(img, (2000, 2000)) is img
+
+def test_downscale_invalid_speed(large_images):
+    """Test that unknown settings are rejected."""
+    with Image.open(os.path.join(large_images, 'small.jpg')) as img:
+        with pytest.raises(ValueError):
+            downscale(img, (100, 100), 'turbo')
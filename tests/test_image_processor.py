@@ -180,3 +180,75 @@ def test_batch_convert_to_pdf_preserve_structure(image_processor, sample_images)
                 assert "test1.pdf" in pdf_files
                 assert "test2.pdf" in pdf_files
                 assert "test3.pdf" in pdf_files
+
+def test_stage_report(image_processor, sample_images):
+    """Test the per-stage timing report."""
+    reports = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        output_file = os.path.join(output_dir, "output.zip")
+        image_processor.batch_convert_to_pdf(
+            sample_images, output_file, "*", None, True, reports.append
+        )
+    
+    assert reports == [image_processor.last_report]
+    stages = {s['stage']: s for s in reports[0]['stages']}
+    assert {'scan', 'open', 'encode', 'zip'} <= set(stages)
+    assert stages['zip']['count'] == 3
+    assert stages['open']['bytes'] > 0
+    assert reports[0]['images'] == 3
+
+def test_merged_pdf_keeps_every_page(image_processor, sample_images):
+    """Test that the merged PDF has one page per image, in sorted order."""
+    from PyPDF2 import PdfReader
+    with tempfile.TemporaryDirectory() as output_dir:
+        output_file = os.path.join(output_dir, "merged.pdf")
+        image_processor.batch_convert_to_pdf(sample_images, output_file, "*", None)
+        
+        reader = PdfReader(output_file)
+        widths = [round(float(page.mediabox.width)) for page in reader.pages]
+        # test1.png, test2.jpg, test3.bmp at 100 dpi
+        assert widths == [72, 144, 216]
+        assert os.listdir(output_dir) == ["merged.pdf"]
+
+def test_parallel_batch_keeps_sorted_order(image_processor):
+    """Test that parallel conversion writes pages and entries in sorted order."""
+    from PyPDF2 import PdfReader
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        input_dir = os.path.join(tmp_dir, "scans")
+        os.makedirs(input_dir)
+        # Larger images first, so later pages finish before earlier ones
+        for i in range(12):
+            Image.new('RGB', (1200 - 90 * i, 50), color='red').save(
+                os.path.join(input_dir, f"{i:02d}.png")
+            )
+        image_processor.max_workers = 4
+        image_processor.window = 5
+        
+        output_file = os.path.join(tmp_dir, "merged.pdf")
+        image_processor.batch_convert_to_pdf(input_dir, output_file)
+        widths = [round(float(page.mediabox.width) * 100 / 72) for page in PdfReader(output_file).pages]
+        assert widths == [1200 - 90 * i for i in range(12)]
+        
+        zip_output = os.path.join(tmp_dir, "scans_PDFs.zip")
+        image_processor.batch_convert_to_pdf(input_dir, zip_output, compress=True)
+        with zipfile.ZipFile(zip_output) as zf:
+            assert zf.namelist() == [f"scans/{i:02d}.pdf" for i in range(12)]
+
+def test_large_pages_spool_to_disk(image_processor, sample_images, monkeypatch):
+    """Test that pages over spool_bytes go through temporary files and back."""
+    from PyPDF2 import PdfReader
+    from src.core import spool
+    spilled = []
+    
+    class Recorder(spool.SpooledBuffer):
+        def close(self):
+            spilled.append(self.spilled)
+            super().close()
+    
+    monkeypatch.setattr('src.core.image_processor.SpooledBuffer', Recorder)
+    image_processor.spool_bytes = 100
+    with tempfile.TemporaryDirectory() as output_dir:
+        output_file = os.path.join(output_dir, "merged.pdf")
+        image_processor.batch_convert_to_pdf(sample_images, output_file)
+        assert len(PdfReader(output_file).pages) == 3
+    assert spilled == [True] * 3
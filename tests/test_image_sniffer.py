@@ -0,0 +1,69 @@
+"""
+Tests for header-based image detection.
+"""
+import os
+import tempfile
+import pytest
+from PIL import Image
+from src.core.image_sniffer import ImageClassifier, open_image, sniff_format
+
+FORMATS = {'.jpg': 'JPEG', '.png': 'PNG', '.gif': 'GIF', '.bmp': 'BMP', '.tif': 'TIFF', '.webp': 'WEBP'}
+
+@pytest.fixture
+def files():
+    """Create one image per format plus files that are not images."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for extension in FORMATS:
+            Image.new('RGB', (20, 10), color='red').save(os.path.join(tmp_dir, 'img' + extension))
+        with open(os.path.join(tmp_dir, 'notes.jpg'), 'w') as f:
+            f.write('not an image')
+        with open(os.path.join(tmp_dir, 'fake.png'), 'wb') as f:
+            f.write(b'\x89PNG\r\n\x1a\n' + b'\0' * 40)
+        open(os.path.join(tmp_dir, 'empty.jpg'), 'wb').close()
+        yield tmp_dir
+
+def test_sniff_format():
+    assert sniff_format(b'\xff\xd8\xff\xe0' + b'\0' * 12) == 'JPEG'
+    assert sniff_format(b'RIFF\0\0\0\0WEBPVP8 ') == 'WEBP'
+    assert sniff_format(b'RIFF\0\0\0\0WAVEfmt ') is None
+    assert sniff_format(b'%PDF-1.4') is None
+
+def test_classify(files):
+    """Test that every format is detected and non-images are rejected."""
+    classifier = ImageClassifier()
+    for extension, image_format in FORMATS.items():
+        assert classifier.classify(os.path.join(files, 'img' + extension)) == image_format
+    assert classifier.classify(os.path.join(files, 'notes.jpg')) is None
+    assert classifier.classify(os.path.join(files, 'fake.png')) is None
+    assert classifier.classify(os.path.join(files, 'empty.jpg')) is None
+    assert classifier.classify(os.path.join(files, 'missing.jpg')) is None
+    # Without the header check only the signature counts
+    assert ImageClassifier(check_header=False).classify(os.path.join(files, 'fake.png')) == 'PNG'
+
+def test_cache_by_size_and_mtime(files):
+    """Test that unchanged files are not read again and changed ones are."""
+    path = os.path.join(files, 'notes.jpg')
+    classifier = ImageClassifier()
+    assert classifier.classify(path) is None
+    assert classifier.classify(path) is None
+    assert (classifier.hits, classifier.misses) == (1, 1)
+
+    Image.new('RGB', (5, 5)).save(path, 'JPEG')
+    assert classifier.classify(path) == 'JPEG'
+    assert classifier.cached_format(path) == 'JPEG'
+    assert classifier.misses == 2
+
+def test_cache_is_bounded(files):
+    classifier = ImageClassifier(max_entries=2)
+    for extension in ('.jpg', '.png', '.gif'):
+        classifier.classify(os.path.join(files, 'img' + extension))
+    assert classifier.cached_format(os.path.join(files, 'img.jpg')) is None
+    assert classifier.cached_format(os.path.join(files, 'img.gif')) == 'GIF'
+
+def test_open_image_restricts_plugins(files):
+    """Test that a known format only tries that plugin."""
+    path = os.path.join(files, 'img.png')
+    with open_image(path, 'PNG') as img:
+        assert img.size == (20, 10)
+    with pytest.raises(Exception):
+        open_image(path, 'JPEG')
@@ -0,0 +1,80 @@
+"""
+Tests for the incremental conversion manifest.
+"""
+import os
+import tempfile
+import pytest
+from src.core.incremental import ConversionManifest, MANIFEST_NAME
+
+@pytest.fixture
+def tree():
+    """Create a directory with one source and its output."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source = os.path.join(tmp_dir, 'a.jpg')
+        output = os.path.join(tmp_dir, 'a.pdf')
+        with open(source, 'wb') as f:
+            f.write(b'image')
+        with open(output, 'wb') as f:
+            f.write(b'pdf')
+        yield tmp_dir, source, output
+
+def _touch(path, mtime_ns):
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+def test_make_rule_without_entry(tree):
+    """Test that outputs newer than their source are current."""
+    root, source, output = tree
+    manifest = ConversionManifest(root)
+    _touch(source, 1_000_000_000)
+    _touch(output, 2_000_000_000)
+    assert manifest.is_up_to_date(source, output)
+    _touch(source, 3_000_000_000)
+    assert not manifest.is_up_to_date(source, output)
+
+def test_recorded_entry_round_trip(tree):
+    """Test that recorded conversions survive a reload."""
+    root, source, output = tree
+    manifest = ConversionManifest(root, settings='balanced')
+    manifest.record(source, output)
+    manifest.save()
+    assert os.path.exists(os.path.join(root, MANIFEST_NAME))
+
+    reloaded = ConversionManifest(root, settings='balanced')
+    assert reloaded.is_up_to_date(source, output)
+
+    # Changed settings or a missing output force reconversion
+    assert not ConversionManifest(root, settings='fast').is_up_to_date(source, output)
+    os.remove(output)
+    assert not reloaded.is_up_to_date(source, output)
+
+def test_changed_source_is_stale(tree):
+    """Test that modified sources are detected."""
+    root, source, output = tree
+    manifest = ConversionManifest(root)
+    manifest.record(source, output)
+    with open(source, 'ab') as f:
+        f.write(b'more')
+    assert not manifest.is_up_to_date(source, output)
+
+def test_hash_confirms_unchanged_content(tree):
+    """Test that a touched but identical source is still current with hashing."""
+    root, source, output = tree
+    manifest = ConversionManifest(root, use_hash=True)
+    manifest.record(source, output)
+    stat = os.stat(source)
+    _touch(source, stat.st_mtime_ns + 5_000_000_000)
+    assert manifest.is_up_to_date(source, output)
+
+def test_remove_orphans(tree):
+    """Test that only recorded outputs of deleted sources are removed."""
+    root, source, output = tree
+    unrelated = os.path.join(root, 'manual.pdf')
+    with open(unrelated, 'wb') as f:
+        f.write(b'pdf')
+    manifest = ConversionManifest(root)
+    manifest.record(source, output)
+    os.remove(source)
+
+    assert manifest.remove_orphans() == [output]
+    assert not os.path.exists(output)
+    assert os.path.exists(unrelated)
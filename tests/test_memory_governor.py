@@ -0,0 +1,64 @@
+"""
+Tests for the memory governor.
+"""
+import os
+import tempfile
+import pytest
+from PIL import Image
+from src.core.memory_governor import (
+    MemoryGovernor, ImageTooLargeError, read_image_header, estimate_decode_bytes
+)
+
+@pytest.fixture
+def tmp_dir():
+    with tempfile.TemporaryDirectory() as tmp:
+        yield tmp
+
+def test_read_header_jpeg_and_png(tmp_dir):
+    """Test that sizes and modes come from the headers."""
+    jpeg = os.path.join(tmp_dir, 'a.jpg')
+    png = os.path.join(tmp_dir, 'b.png')
+    Image.new('RGB', (64, 32), 'red').save(jpeg)
+    Image.new('RGBA', (20, 10)).save(png)
+
+    assert read_image_header(jpeg) == (64, 32, 'RGB')
+    assert read_image_header(png) == (20, 10, 'RGBA')
+
+def test_estimate_scales_with_pixels_and_mode():
+    """Test the decode estimate."""
+    assert estimate_decode_bytes(100, 100, 'RGBA') > estimate_decode_bytes(100, 100, 'L')
+    assert estimate_decode_bytes(200, 100, 'RGB') == 2 * estimate_decode_bytes(100, 100, 'RGB')
+
+def test_rejects_decompression_bombs(tmp_dir):
+    """Test that images above max_pixels are rejected before decoding."""
+    path = os.path.join(tmp_dir, 'big.png')
+    Image.new('L', (100, 100)).save(path)
+
+    assert MemoryGovernor(10 ** 9, max_pixels=10 ** 6).estimate(path) > 0
+    with pytest.raises(ImageTooLargeError):
+        MemoryGovernor(10 ** 9, max_pixels=5000).estimate(path)
+
+def test_unreadable_file_has_no_estimate(tmp_dir):
+    """Test that a broken file is left for the converter to report."""
+    path = os.path.join(tmp_dir, 'broken.png')
+    with open(path, 'wb') as f:
+        f.write(b'not an image')
+    assert MemoryGovernor(1000).estimate(path) == 0
+
+def test_budget_reservations():
+    """Test reserving and releasing against the limit."""
+    governor = MemoryGovernor(100)
+    assert governor.try_reserve(60)
+    assert not governor.try_reserve(60)
+    assert governor.try_reserve(40)
+    governor.release(60)
+    assert governor.try_reserve(50)
+    assert governor.in_use == 90
+
+def test_oversized_reservation_runs_alone():
+    """Test that a task larger than the budget is allowed when nothing else runs."""
+    governor = MemoryGovernor(100)
+    assert governor.try_reserve(500)
+    assert not governor.try_reserve(1)
+    governor.release(500)
+    assert governor.in_use == 0
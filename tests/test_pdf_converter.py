@@ -2,9 +2,12 @@ import unittest
 import os
 import tempfile
 import shutil
+import tarfile
 import time
+import zipfile
 from concurrent.futures import ThreadPoolExecutor
-from src.app.pdf_converter import PDFConverter
+from unittest import mock
+from src.app.pdf_converter import PDFConverter, ruta_pdf_relativa
 from PIL import Image
 
 class TestPDFConverter(unittest.TestCase):
@@ -76,6 +79,20 @@ class TestPDFConverter(unittest.TestCase):
         self.assertEqual(len(callbacks.errors), 1)  # 1 imagen corrupta
         self.assertTrue(callbacks.completed)
     
+    def test_convertir_rutas_con_pool_propio(self):
+        """Prueba la conversión de una lista de rutas en un pool del llamador"""
+        rutas = [os.path.join(self.temp_dir, 'test_rgb.png'), os.path.join(self.temp_dir, 'test_gray.jpg')]
+        with self.converter.crear_executor('threads') as executor:
+            futuros = self.converter.convertir_rutas(executor, rutas, self.temp_dir)
+            resultados = {ruta: futuro.result() for futuro, ruta in futuros.items()}
+            # El pool sigue disponible para más conversiones
+            executor.submit(int).result()
+        
+        self.assertEqual(sorted(resultados), sorted(rutas))
+        for resultado in resultados.values():
+            self.assertTrue(resultado.exito)
+            self.assertTrue(resultado.datos.startswith(b'%PDF'))
+    
     def test_conversion_paralela(self):
         """Prueba que la conversión paralela funciona correctamente"""
         tiempos = []
@@ -311,3 +328,493 @@ class TestPDFConverter(unittest.TestCase):
         
         # Debería encontrar las dos imágenes independientemente del caso
         self.assertEqual(len(callbacks.converted), len(extensiones))
+    
+    def test_backend_procesos(self):
+        """Prueba que el backend de procesos mantiene el contrato de callbacks"""
+        class BackendCallbacks:
+            def __init__(self):
+                self.converted = []
+                self.errors = []
+                self.completed = False
+            def on_start(self): pass
+            def on_images_found(self, total): self.total = total
+            def on_file_converted(self, name): self.converted.append(name)
+            def on_file_error(self, name, error): self.errors.append((name, error))
+            def on_complete(self, *args): self.completed = True
+            def on_progress(self, *args): pass
+            def on_finish(self): pass
+        
+        converter = PDFConverter(backend='processes')
+        converter.max_workers_procesos = 2
+        callbacks = BackendCallbacks()
+        converter.procesar_carpeta(self.temp_dir, False, callbacks)
+        
+        self.assertTrue(callbacks.completed)
+        self.assertEqual(len(callbacks.converted), 5)
+        self.assertEqual(len(callbacks.errors), 1)
+        self.assertTrue(os.path.exists(os.path.join(self.temp_dir, 'subdir', 'test_sub.pdf')))
+    
+    def test_resolver_backend(self):
+        """Prueba la selección de backend"""
+        self.assertEqual(PDFConverter(backend='threads').resolver_backend(1000), 'threads')
+        self.assertEqual(PDFConverter(backend='processes').resolver_backend(1), 'processes')
+        self.assertEqual(PDFConverter(backend='auto').resolver_backend(1), 'threads')
+        with self.assertRaises(ValueError):
+            PDFConverter(backend='gpu')
+    
+    def test_modo_comprimido(self):
+        """Prueba que el ZIP se escribe directamente desde memoria"""
+        class ZipCallbacks:
+            def __init__(self):
+                self.converted = []
+                self.zip_path = None
+                self.completed = False
+            def on_start(self): pass
+            def on_images_found(self, total): pass
+            def on_file_converted(self, name): self.converted.append(name)
+            def on_file_error(self, name, error): pass
+            def on_creating_zip(self): pass
+            def on_zip_created(self, ruta): self.zip_path = ruta
+            def on_complete(self, *args): self.completed = True
+            def on_progress(self, *args): pass
+            def on_finish(self): pass
+        
+        callbacks = ZipCallbacks()
+        self.converter.zip_ordenado = True
+        self.converter.procesar_carpeta(self.temp_dir, True, callbacks)
+        
+        self.assertTrue(callbacks.completed)
+        with zipfile.ZipFile(callbacks.zip_path) as zf:
+            nombres = zf.namelist()
+        # En modo ordenado las entradas siguen el orden de descubrimiento
+        esperados = [
+            ruta_pdf_relativa(img, self.temp_dir).as_posix()
+            for img in self.converter.encontrar_imagenes(self.temp_dir)
+            if img.name != 'corrupted.jpg'
+        ]
+        self.assertEqual(nombres, esperados)
+        self.assertIn('subdir/test_sub.pdf', nombres)
+        # No se escriben PDFs junto a las imágenes en modo comprimido
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, 'test_rgb.pdf')))
+    
+    def test_cabeceras_por_adelantado(self):
+        """Prueba que las cabeceras se leen en hilos aparte, no en el que reparte el trabajo"""
+        import threading
+        import src.core.memory_governor as memoria
+        leer = memoria.read_image_header
+        hilos = set()
+        def registrar(ruta):
+            hilos.add(threading.current_thread())
+            return leer(ruta)
+        
+        class Callbacks:
+            def __init__(self): self.converted = []
+            def on_start(self): pass
+            def on_images_found(self, total): pass
+            def on_file_converted(self, name): self.converted.append(name)
+            def on_file_error(self, name, error): pass
+            def on_complete(self, *args): pass
+            def on_progress(self, *args): pass
+            def on_finish(self): pass
+        
+        callbacks = Callbacks()
+        self.converter.max_pixeles = 200 * 200
+        with mock.patch.object(memoria, 'read_image_header', registrar):
+            self.converter.procesar_carpeta(self.temp_dir, False, callbacks)
+        
+        self.assertTrue(hilos)
+        self.assertNotIn(threading.current_thread(), hilos)
+        # La imagen grande se rechaza por su cabecera sin convertirla
+        self.assertFalse(any('test_large' in nombre for nombre in callbacks.converted))
+        self.assertEqual(len(callbacks.converted), 4)
+    
+    def test_total_antes_de_terminar_recorrido(self):
+        """Prueba que el total se conoce mucho antes del final aunque la ventana frene el recorrido"""
+        import src.app.pdf_converter as modulo
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        for i in range(100):
+            Image.new('RGB', (10, 10), color='blue').save(os.path.join(directorio, f'img{i:03d}.png'))
+        
+        procesar = modulo._procesar_imagen
+        def lenta(*args, **kwargs):
+            time.sleep(0.01)
+            return procesar(*args, **kwargs)
+        
+        class Callbacks:
+            def __init__(self):
+                self.converted = []
+                self.totales = []
+                self.progresos = []
+            def on_start(self): pass
+            def on_images_found(self, total): self.totales.append((total, len(self.converted)))
+            def on_file_converted(self, name): self.converted.append(name)
+            def on_file_error(self, name, error): pass
+            def on_complete(self, *args): pass
+            def on_progress(self, valor): self.progresos.append(valor)
+            def on_finish(self): pass
+        
+        callbacks = Callbacks()
+        self.converter.backend = 'threads'
+        self.converter.max_workers = 2
+        self.converter.ventana_envio = 2
+        with mock.patch.object(modulo, '_procesar_imagen', lenta):
+            self.converter.procesar_carpeta(directorio, False, callbacks)
+        
+        self.assertEqual(len(callbacks.converted), 100)
+        # Un solo aviso, con el total correcto y cuando quedaba casi todo
+        self.assertEqual(len(callbacks.totales), 1)
+        total, convertidas = callbacks.totales[0]
+        self.assertEqual(total, 100)
+        self.assertLess(convertidas, 50)
+        self.assertEqual(callbacks.progresos[-1], 1.0)
+        self.assertTrue(all(0 <= p <= 1 for p in callbacks.progresos))
+    
+    def test_zip_ordenado_limita_pendientes(self):
+        """Prueba que los PDFs a la espera de uno lento no desbordan la ventana"""
+        import src.app.pdf_converter as modulo
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        for i in range(40):
+            Image.new('RGB', (20, 20), color='blue').save(os.path.join(directorio, f'img{i:02d}.png'))
+        
+        procesar = modulo._procesar_imagen
+        def lenta(ruta, *args, **kwargs):
+            if ruta.endswith('img00.png'):
+                time.sleep(0.5)
+            return procesar(ruta, *args, **kwargs)
+        
+        archivos = []
+        abrir_archivo = modulo.open_archive
+        def abrir(*args, **kwargs):
+            archivo = abrir_archivo(*args, **kwargs)
+            archivos.append(archivo)
+            return archivo
+        
+        class Callbacks:
+            def __init__(self):
+                self.zip_path = None
+                self.error = None
+            def on_start(self): pass
+            def on_images_found(self, total): pass
+            def on_file_converted(self, name):
+                archivos[0].maximo = max(getattr(archivos[0], 'maximo', 0), archivos[0].pending_entries)
+            def on_file_error(self, name, error): pass
+            def on_creating_zip(self): pass
+            def on_zip_created(self, ruta): self.zip_path = ruta
+            def on_complete(self, *args): pass
+            def on_error(self, error): self.error = error
+            def on_progress(self, *args): pass
+            def on_finish(self): pass
+        
+        callbacks = Callbacks()
+        self.converter.zip_ordenado = True
+        self.converter.backend = 'threads'
+        self.converter.max_workers = 2
+        self.converter.ventana_envio = 4
+        with mock.patch.object(modulo, '_procesar_imagen', lenta), \
+                mock.patch.object(modulo, 'open_archive', side_effect=abrir):
+            self.converter.procesar_carpeta(directorio, True, callbacks)
+        
+        self.assertIsNone(callbacks.error)
+        self.assertLessEqual(archivos[0].maximo, 4)
+        with zipfile.ZipFile(callbacks.zip_path) as zf:
+            self.assertEqual(zf.namelist(), [f'img{i:02d}.pdf' for i in range(40)])
+    
+    def test_formato_tar_por_volumenes(self):
+        """Prueba el archivo tar.gz dividido en volúmenes"""
+        class VolumenCallbacks:
+            def __init__(self):
+                self.zip_path = None
+                self.volumenes = None
+                self.completed = False
+            def on_start(self): pass
+            def on_images_found(self, total): pass
+            def on_file_converted(self, name): pass
+            def on_file_error(self, name, error): pass
+            def on_creating_zip(self): pass
+            def on_zip_created(self, ruta): self.zip_path = ruta
+            def on_volumes_created(self, rutas): self.volumenes = rutas
+            def on_complete(self, *args): self.completed = True
+            def on_progress(self, *args): pass
+            def on_finish(self): pass
+        
+        callbacks = VolumenCallbacks()
+        self.converter.formato_archivo = 'tar.gz'
+        self.converter.tamano_volumen = 1024
+        self.converter.procesar_carpeta(self.temp_dir, True, callbacks)
+        
+        self.assertTrue(callbacks.completed)
+        self.assertEqual(callbacks.zip_path, callbacks.volumenes[0])
+        self.assertTrue(callbacks.zip_path.endswith('.part001.tar.gz'))
+        nombres = []
+        for volumen in callbacks.volumenes:
+            with tarfile.open(volumen) as tf:
+                nombres += tf.getnames()
+        self.assertEqual(len(nombres), 5)
+        self.assertIn('subdir/test_sub.pdf', nombres)
+    
+    def test_modo_incremental(self):
+        """Prueba que una segunda ejecución solo convierte lo modificado"""
+        class IncrementalCallbacks:
+            def __init__(self):
+                self.converted = []
+                self.skipped = 0
+            def on_start(self): pass
+            def on_images_found(self, total): pass
+            def on_file_converted(self, name): self.converted.append(name)
+            def on_file_error(self, name, error): pass
+            def on_files_skipped(self, cantidad): self.skipped = cantidad
+            def on_complete(self, *args): pass
+            def on_progress(self, *args): pass
+            def on_finish(self): pass
+        
+        self.converter.incremental = True
+        self.converter.procesar_carpeta(self.temp_dir, False, IncrementalCallbacks())
+        
+        # Modificar una imagen y eliminar otra
+        Image.new('RGB', (50, 50), color='white').save(os.path.join(self.temp_dir, 'test_rgb.png'))
+        os.remove(os.path.join(self.temp_dir, 'subdir', 'test_sub.png'))
+        
+        self.converter.eliminar_huerfanos = True
+        callbacks = IncrementalCallbacks()
+        self.converter.procesar_carpeta(self.temp_dir, False, callbacks)
+        
+        # La imagen corrupta se reintenta porque nunca tuvo PDF
+        self.assertEqual(callbacks.converted, ['test_rgb.png'])
+        self.assertEqual(callbacks.skipped, 3)
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, 'subdir', 'test_sub.pdf')))
+        
+        # Un cambio en los ajustes de salida invalida todos los PDFs
+        import src.app.pdf_converter as modulo
+        callbacks = IncrementalCallbacks()
+        with mock.patch.object(modulo, 'TAMANO_MAXIMO', (30, 30)):
+            self.converter.procesar_carpeta(self.temp_dir, False, callbacks)
+        self.assertEqual(callbacks.skipped, 0)
+        self.assertEqual(len(callbacks.converted), 4)
+    
+    def test_cache_conversiones(self):
+        """Prueba que las imágenes duplicadas se convierten una sola vez"""
+        class CacheCallbacks:
+            def __init__(self):
+                self.stats = None
+                self.converted = []
+            def on_start(self): pass
+            def on_images_found(self, total): pass
+            def on_file_converted(self, name): self.converted.append(name)
+            def on_file_error(self, name, error): pass
+            def on_cache_stats(self, aciertos, fallos): self.stats = (aciertos, fallos)
+            def on_complete(self, *args): pass
+            def on_progress(self, *args): pass
+            def on_finish(self): pass
+        
+        # Copias idénticas de la misma imagen en carpetas distintas
+        test_dir = os.path.join(self.temp_dir, 'duplicados')
+        for persona in ('ana', 'luis', 'maria'):
+            os.makedirs(os.path.join(test_dir, persona))
+            shutil.copy2(
+                os.path.join(self.temp_dir, 'test_rgb.png'),
+                os.path.join(test_dir, persona, 'cedula.png')
+            )
+        
+        self.converter.max_workers = 1
+        self.converter.directorio_cache = os.path.join(self.temp_dir, 'cache')
+        callbacks = CacheCallbacks()
+        self.converter.procesar_carpeta(test_dir, False, callbacks)
+        
+        self.assertEqual(len(callbacks.converted), 3)
+        self.assertEqual(callbacks.stats, (2, 1))
+        self.assertTrue(os.path.exists(os.path.join(test_dir, 'luis', 'cedula.pdf')))
+    
+    def test_ventana_acotada(self):
+        """Prueba que nunca hay más tareas en vuelo que la ventana configurada"""
+        test_dir = os.path.join(self.temp_dir, 'ventana')
+        os.makedirs(test_dir)
+        for i in range(50):
+            Image.new('RGB', (10, 10), color='red').save(os.path.join(test_dir, f'img_{i:02d}.png'))
+        
+        converter = PDFConverter(backend='threads')
+        converter.ventana_envio = 3
+        pendientes = []
+        maximo = []
+        
+        class ExecutorContador(ThreadPoolExecutor):
+            def submit(self, *args, **kwargs):
+                pendientes.append(1)
+                maximo.append(len(pendientes))
+                return super().submit(*args, **kwargs)
+        converter.crear_executor = lambda backend, max_workers=None: ExecutorContador(max_workers=2)
+        
+        class VentanaCallbacks:
+            def __init__(self):
+                self.converted = []
+                self.total = None
+            def on_start(self): pass
+            def on_images_found(self, total): self.total = total
+            def on_file_converted(self, name):
+                self.converted.append(name)
+                pendientes.pop()
+            def on_file_error(self, name, error): pendientes.pop()
+            def on_complete(self, *args): pass
+            def on_progress(self, *args): pass
+            def on_finish(self): pass
+        
+        callbacks = VentanaCallbacks()
+        converter.procesar_carpeta(test_dir, False, callbacks)
+        
+        self.assertEqual(callbacks.total, 50)
+        self.assertEqual(len(callbacks.converted), 50)
+        self.assertEqual(max(maximo), 3)
+    
+    def test_presupuesto_memoria(self):
+        """Prueba que las imágenes grandes esperan memoria y las bombas se rechazan"""
+        test_dir = os.path.join(self.temp_dir, 'memoria')
+        os.makedirs(test_dir)
+        for i in range(6):
+            Image.new('RGB', (200, 200), color='red').save(os.path.join(test_dir, f'grande_{i}.png'))
+        Image.new('RGB', (1000, 1000), color='blue').save(os.path.join(test_dir, 'z_bomba.png'))
+        
+        converter = PDFConverter(backend='threads')
+        # Cada imagen de 200x200 ocupa unos 240 KB: solo cabe una a la vez
+        converter.limite_memoria = 300 * 1024
+        converter.max_pixeles = 500 * 500
+        en_vuelo = []
+        maximo = []
+        
+        class ExecutorContador(ThreadPoolExecutor):
+            def submit(self, *args, **kwargs):
+                en_vuelo.append(1)
+                maximo.append(len(en_vuelo))
+                return super().submit(*args, **kwargs)
+        converter.crear_executor = lambda backend, max_workers=None: ExecutorContador(max_workers=4)
+        
+        class MemoriaCallbacks:
+            def __init__(self):
+                self.converted = []
+                self.errors = []
+            def on_start(self): pass
+            def on_images_found(self, total): pass
+            def on_file_converted(self, name):
+                self.converted.append(name)
+                en_vuelo.pop()
+            def on_file_error(self, name, error): self.errors.append((name, error))
+            def on_complete(self, *args): pass
+            def on_progress(self, *args): pass
+            def on_finish(self): pass
+        
+        callbacks = MemoriaCallbacks()
+        converter.procesar_carpeta(test_dir, False, callbacks)
+        
+        self.assertEqual(len(callbacks.converted), 6)
+        self.assertEqual(max(maximo), 1)
+        self.assertEqual([nombre for nombre, _ in callbacks.errors], ['z_bomba.png'])
+        self.assertFalse(os.path.exists(os.path.join(test_dir, 'z_bomba.pdf')))
+    
+    def _cancelar_tras_primera(self, converter, test_dir):
+        """Convierte test_dir cancelando al completarse la primera imagen"""
+        class CancelCallbacks:
+            def __init__(self):
+                self.converted = []
+                self.latencia = None
+                self.finished = False
+            def on_start(self): pass
+            def on_images_found(self, total): pass
+            def on_file_converted(self, name):
+                self.converted.append(name)
+                converter.cancelar_proceso()
+            def on_file_error(self, name, error): pass
+            def on_complete(self, *args): pass
+            def on_progress(self, *args): pass
+            def on_cancelled(self, latencia): self.latencia = latencia
+            def on_finish(self): self.finished = True
+        
+        callbacks = CancelCallbacks()
+        converter.procesar_carpeta(test_dir, False, callbacks)
+        return callbacks
+    
+    def test_cancelacion_rapida(self):
+        """Prueba que cancelar descarta la cola sin esperarla y mide la latencia"""
+        test_dir = os.path.join(self.temp_dir, 'cancelar')
+        os.makedirs(test_dir)
+        for i in range(300):
+            Image.new('RGB', (400, 400), color='red').save(os.path.join(test_dir, f'img_{i:03d}.png'))
+        
+        for backend in ('threads', 'processes'):
+            converter = PDFConverter(backend=backend)
+            converter.ventana_envio = 100
+            callbacks = self._cancelar_tras_primera(converter, test_dir)
+            
+            self.assertTrue(callbacks.finished)
+            self.assertLess(len(callbacks.converted), 300)
+            self.assertIsNotNone(callbacks.latencia)
+            self.assertLess(converter.latencia_cancelacion, 1.0)
+            restos = [f for f in os.listdir(test_dir) if f.endswith('.part')]
+            self.assertEqual(restos, [])
+    
+    def test_progreso_agrupado(self):
+        """Prueba que on_progress_batch recibe los eventos por archivo agrupados"""
+        test_dir = os.path.join(self.temp_dir, 'lotes')
+        os.makedirs(test_dir)
+        for i in range(200):
+            Image.new('RGB', (10, 10), color='red').save(os.path.join(test_dir, f'img_{i:03d}.png'))
+        
+        class LoteCallbacks:
+            def __init__(self):
+                self.lotes = []
+                self.completed = False
+            def on_start(self): pass
+            def on_images_found(self, total): pass
+            def on_progress_batch(self, lote): self.lotes.append(lote)
+            def on_file_converted(self, name):
+                raise AssertionError("no debe llamarse con on_progress_batch")
+            def on_complete(self, *args): self.completed = True
+            def on_finish(self): pass
+        
+        converter = PDFConverter(backend='threads')
+        converter.max_actualizaciones = 5
+        callbacks = LoteCallbacks()
+        converter.procesar_carpeta(test_dir, False, callbacks)
+        
+        self.assertTrue(callbacks.completed)
+        self.assertLess(len(callbacks.lotes), 100)
+        self.assertTrue(callbacks.lotes[-1].final)
+        self.assertEqual(callbacks.lotes[-1].total_converted, 200)
+        self.assertEqual(callbacks.lotes[-1].progress, 1.0)
+        self.assertEqual(sum(len(l.converted) + l.omitted for l in callbacks.lotes), 200)
+    
+    def test_informe_etapas(self):
+        """Prueba el desglose de tiempos por etapa al terminar"""
+        test_dir = os.path.join(self.temp_dir, 'etapas')
+        os.makedirs(test_dir)
+        for i in range(5):
+            Image.new('RGB', (50, 50), color='red').save(os.path.join(test_dir, f'img_{i}.png'))
+        
+        class InformeCallbacks:
+            def __init__(self):
+                self.informe = None
+            def on_start(self): pass
+            def on_images_found(self, total): pass
+            def on_file_converted(self, name): pass
+            def on_file_error(self, name, error): pass
+            def on_progress(self, *args): pass
+            def on_stage_report(self, informe): self.informe = informe
+            def on_creating_zip(self): pass
+            def on_zip_created(self, ruta): pass
+            def on_complete(self, *args): pass
+            def on_finish(self): pass
+        
+        converter = PDFConverter(backend='threads')
+        converter.directorio_salida = os.path.join(self.temp_dir, 'etapas.zip')
+        converter.archivo_informe = os.path.join(self.temp_dir, 'informe.json')
+        callbacks = InformeCallbacks()
+        converter.procesar_carpeta(test_dir, True, callbacks)
+        
+        self.assertIs(callbacks.informe, converter.ultimo_informe)
+        etapas = {e['stage']: e for e in callbacks.informe['stages']}
+        for etapa in ('scan', 'open', 'thumbnail', 'convert', 'encode', 'zip'):
+            self.assertIn(etapa, etapas)
+        self.assertEqual(etapas['encode']['count'], 5)
+        self.assertEqual(etapas['zip']['count'], 5)
+        self.assertGreater(etapas['zip']['bytes'], 0)
+        self.assertEqual(callbacks.informe['converted'], 5)
+        self.assertTrue(os.path.exists(converter.archivo_informe))
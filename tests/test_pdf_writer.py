@@ -0,0 +1,144 @@
+"""
+Tests for the low-level PDF writer.
+"""
+import io
+import os
+import tempfile
+import pytest
+from PIL import Image
+from PyPDF2 import PdfReader
+from src.core.pdf_writer import (
+    PdfStreamWriter, encode_jpeg, encode_page, read_jpeg_info, jpeg_to_pdf_bytes, try_jpeg_passthrough
+)
+
+@pytest.fixture
+def tmp_dir():
+    """Create a temporary directory."""
+    with tempfile.TemporaryDirectory() as tmp:
+        yield tmp
+
+def _jpeg_bytes(mode='RGB', size=(120, 80), **kwargs):
+    buffer = io.BytesIO()
+    Image.new(mode, size, color=100 if mode == 'L' else 'red').save(buffer, 'JPEG', **kwargs)
+    return buffer.getvalue()
+
+def test_read_jpeg_info():
+    """Test reading size and components from the frame header."""
+    info = read_jpeg_info(io.BytesIO(_jpeg_bytes()))
+    assert (info.width, info.height, info.components) == (120, 80, 3)
+    assert info.can_passthrough
+
+    info = read_jpeg_info(io.BytesIO(_jpeg_bytes('L')))
+    assert info.components == 1
+    assert info.can_passthrough
+
+    info = read_jpeg_info(io.BytesIO(_jpeg_bytes(progressive=True)))
+    assert info.can_passthrough
+
+def test_read_jpeg_info_rejects_unsupported():
+    """Test that non-JPEG and CMYK streams are not passed through."""
+    assert read_jpeg_info(io.BytesIO(b"Not an image file")) is None
+    assert read_jpeg_info(io.BytesIO(b"\xff\xd8\xff")) is None
+    assert not read_jpeg_info(io.BytesIO(_jpeg_bytes('CMYK'))).can_passthrough
+
+def test_jpeg_to_pdf_bytes_embeds_original_stream():
+    """Test that the JPEG stream is embedded unchanged."""
+    data = _jpeg_bytes()
+    pdf = jpeg_to_pdf_bytes(data, read_jpeg_info(io.BytesIO(data)), 100.0)
+
+    reader = PdfReader(io.BytesIO(pdf))
+    assert len(reader.pages) == 1
+    page = reader.pages[0]
+    assert float(page.mediabox.width) == pytest.approx(120 * 72 / 100)
+    image = page['/Resources']['/XObject']['/Im0'].get_object()
+    assert image['/Filter'] == '/DCTDecode'
+    assert image.get_data() == data
+
+def test_try_jpeg_passthrough(tmp_dir):
+    """Test the passthrough decision and fallbacks."""
+    jpg_path = os.path.join(tmp_dir, 'photo.jpg')
+    png_path = os.path.join(tmp_dir, 'photo.png')
+    out_path = os.path.join(tmp_dir, 'out.pdf')
+    with open(jpg_path, 'wb') as f:
+        f.write(_jpeg_bytes())
+    Image.new('RGB', (10, 10)).save(png_path)
+
+    assert try_jpeg_passthrough(jpg_path, out_path)
+    assert len(PdfReader(out_path).pages) == 1
+
+    # Needs resizing or is not a JPEG: caller falls back to Pillow
+    assert not try_jpeg_passthrough(jpg_path, out_path, max_size=(100, 100))
+    assert not try_jpeg_passthrough(png_path, out_path)
+
+    # Truncated files are not embedded
+    with open(jpg_path, 'rb') as f:
+        data = f.read()
+    with open(jpg_path, 'wb') as f:
+        f.write(data[:len(data) // 2])
+    assert not try_jpeg_passthrough(jpg_path, out_path)
+
+def test_stream_writer_many_pages(tmp_dir):
+    """Test that pages are streamed in order into one valid PDF."""
+    out_path = os.path.join(tmp_dir, 'merged.pdf')
+    data = _jpeg_bytes()
+    with PdfStreamWriter(out_path) as pdf:
+        for i in range(300):
+            if i % 2:
+                pdf.add_jpeg_page(data, read_jpeg_info(io.BytesIO(data)))
+            else:
+                pdf.add_jpeg_page(*encode_jpeg(Image.new('L', (10 + i, 20))), 72.0)
+    assert pdf.page_count == 300
+    assert pdf.bytes_written == os.path.getsize(out_path)
+
+    reader = PdfReader(out_path)
+    assert len(reader.pages) == 300
+    assert float(reader.pages[4].mediabox.width) == 14
+    image = reader.pages[1]['/Resources']['/XObject']['/Im0'].get_object()
+    assert image.get_data() == data
+
+def test_stream_writer_abort(tmp_dir):
+    """Test that a failed write leaves no partial file."""
+    out_path = os.path.join(tmp_dir, 'merged.pdf')
+    with pytest.raises(RuntimeError):
+        with PdfStreamWriter(out_path) as pdf:
+            pdf.add_jpeg_page(*encode_jpeg(Image.new('RGB', (5, 5))))
+            raise RuntimeError("fallo")
+    assert os.listdir(tmp_dir) == []
+
+    with pytest.raises(ValueError):
+        encode_jpeg(Image.new('RGBA', (5, 5)))
+
+def test_blobs_encoded_in_parallel(tmp_dir):
+    """Test that pages serialised by workers are numbered when appended."""
+    from concurrent.futures import ThreadPoolExecutor
+    out_path = os.path.join(tmp_dir, 'merged.pdf')
+    with ThreadPoolExecutor(4) as pool:
+        blobs = list(pool.map(
+            lambda i: encode_page(*encode_jpeg(Image.new('RGB', (10 + i, 10))), 72.0), range(50)
+        ))
+    with PdfStreamWriter(out_path) as pdf:
+        for blob in blobs:
+            pdf.add_blob(blob)
+    reader = PdfReader(out_path)
+    assert [float(page.mediabox.width) for page in reader.pages] == [10 + i for i in range(50)]
+    assert blobs[0].size == len(blobs[0].image_data)
+
+def test_encode_image_page_bilevel_is_lossless(tmp_dir, monkeypatch):
+    """Test the CCITT and Flate encodings of bilevel pages."""
+    import zlib
+    from PIL import features
+    from src.core.pdf_writer import encode_image_page
+    scan = Image.new('1', (99, 60), 1)
+    scan.paste(0, (10, 10, 50, 20))
+    
+    blob = encode_image_page(scan)
+    if features.check('libtiff'):
+        assert b"/CCITTFaxDecode" in blob.image_header
+    
+    monkeypatch.setattr(features, 'check', lambda name: False)
+    blob = encode_image_page(scan)
+    assert b"/FlateDecode" in blob.image_header
+    assert zlib.decompress(blob.image_data) == scan.tobytes()
+    
+    with pytest.raises(ValueError):
+        encode_image_page(Image.new('RGB', (5, 5)))
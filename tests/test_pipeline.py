@@ -0,0 +1,53 @@
+"""
+Tests for the ordered parallel pipeline.
+"""
+import random
+import threading
+import time
+import pytest
+from src.core.pipeline import ordered_map
+
+def _slow_square(n):
+    time.sleep(random.random() / 500)
+    return n * n
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_results_keep_input_order(workers):
+    """Test that out-of-order completion is yielded in input order."""
+    results = list(ordered_map(_slow_square, range(200), workers, window=8))
+    assert results == [(n, n * n) for n in range(200)]
+
+def test_window_bounds_work_in_flight():
+    """Test that a slow head item stops submission at the window size."""
+    started = []
+    release = threading.Event()
+    
+    def work(n):
+        started.append(n)
+        if n == 0:
+            release.wait(5)
+        return n
+    
+    results = ordered_map(work, range(100), workers=3, window=6)
+    timer = threading.Timer(0.2, release.set)
+    timer.start()
+    assert next(results) == (0, 0)
+    assert len(started) <= 7
+    assert [n for n, _ in results] == list(range(1, 100))
+    timer.cancel()
+
+def test_error_raised_in_order_and_rest_cancelled():
+    """Test that a failure surfaces at its position and stops later work."""
+    done = []
+    
+    def work(n):
+        if n == 5:
+            raise ValueError("fallo")
+        done.append(n)
+        return n
+    
+    results = ordered_map(work, range(1000), workers=2, window=4)
+    assert [next(results)[0] for _ in range(5)] == [0, 1, 2, 3, 4]
+    with pytest.raises(ValueError):
+        next(results)
+    assert len(done) < 20
@@ -0,0 +1,74 @@
+"""
+Tests for the progress coalescing callbacks.
+"""
+from src.core.progress import CoalescingCallbacks
+
+class FakeClock:
+    """Manually advanced clock."""
+    def __init__(self):
+        self.now = 0.0
+    def __call__(self):
+        return self.now
+
+class Receiver:
+    """Records every callback it gets."""
+    def __init__(self):
+        self.events = []
+    def on_progress_batch(self, batch):
+        self.events.append(('batch', batch))
+    def on_complete(self, *args):
+        self.events.append(('complete', args))
+    def on_finish(self):
+        self.events.append(('finish', ()))
+
+def test_rate_limit_batches_files():
+    """Test that many files produce few batches."""
+    clock = FakeClock()
+    receiver = Receiver()
+    callbacks = CoalescingCallbacks(receiver, max_rate=10, clock=clock)
+
+    for i in range(1000):
+        callbacks.on_file_converted(f'img_{i}.png')
+        callbacks.on_progress((i + 1) / 1000)
+        clock.now += 0.001
+    callbacks.on_finish()
+
+    batches = [b for kind, b in receiver.events if kind == 'batch']
+    assert len(batches) <= 12
+    assert batches[-1].final
+    assert batches[-1].total_converted == 1000
+    assert batches[-1].progress == 1.0
+    listed = sum(len(b.converted) + b.omitted for b in batches)
+    assert listed == 1000
+
+def test_name_lists_are_capped():
+    """Test that a batch lists at most max_names files."""
+    clock = FakeClock()
+    receiver = Receiver()
+    callbacks = CoalescingCallbacks(receiver, max_rate=1, max_names=5, clock=clock)
+
+    callbacks.on_file_converted('first.png')
+    for i in range(20):
+        callbacks.on_file_error(f'bad_{i}.png', 'broken')
+    callbacks.flush()
+
+    first, second = [b for _, b in receiver.events]
+    assert first.converted == ('first.png',)
+    assert len(second.errors) == 5
+    assert second.omitted == 15
+    assert second.total_errors == 20
+
+def test_other_callbacks_keep_order():
+    """Test that pending events are delivered before other callbacks."""
+    clock = FakeClock()
+    receiver = Receiver()
+    callbacks = CoalescingCallbacks(receiver, max_rate=1, clock=clock)
+
+    callbacks.on_file_converted('a.png')
+    callbacks.on_file_converted('b.png')
+    callbacks.on_complete(2, 2, 0, False)
+
+    kinds = [kind for kind, _ in receiver.events]
+    assert kinds == ['batch', 'batch', 'complete']
+    assert receiver.events[1][1].converted == ('b.png',)
+    assert not hasattr(callbacks, 'on_scan_progress')
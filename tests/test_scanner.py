@@ -0,0 +1,74 @@
+"""
+Tests for the shared directory scanner.
+"""
+import os
+import tempfile
+import pytest
+from src.core.scanner import DirectoryScanner, FileCounter
+
+@pytest.fixture
+def tree():
+    """Create a nested tree with mixed files."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        files = [
+            'a.png', 'b.JPG', 'notes.txt',
+            'a/x.png', 'a/y.jpeg',
+            'a/deep/z.png',
+            'b/w.png',
+        ] + [f'wide/person{i:03d}/scan.png' for i in range(50)]
+        for rel in files:
+            path = os.path.join(tmp_dir, *rel.split('/'))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(b'x')
+        yield tmp_dir
+
+def _rel(root, paths):
+    return [os.path.relpath(p, root).replace(os.sep, '/') for p in paths]
+
+@pytest.mark.parametrize("workers", [1, 8])
+def test_sorted_depth_first_order(tree, workers):
+    """Test that output matches sorting every path, with or without prefetch."""
+    scanner = DirectoryScanner(extensions={'.png', '.jpg', '.jpeg'}, workers=workers, max_prefetch=4)
+    found = _rel(tree, scanner.scan(tree))
+    expected = sorted(found, key=lambda p: p.split('/'))
+    assert found == expected
+    assert len(found) == 56
+    assert 'notes.txt' not in found
+
+def test_pattern_and_non_recursive(tree):
+    """Test pattern filtering and top-level only scanning."""
+    assert _rel(tree, DirectoryScanner(pattern='*.jpg').scan(tree)) == ['b.JPG']
+    assert _rel(tree, DirectoryScanner(recursive=False).scan(tree)) == ['a.png', 'b.JPG', 'notes.txt']
+
+@pytest.mark.skipif(not hasattr(os, 'symlink'), reason="symlinks not supported")
+def test_symlink_loop_is_walked_once(tree):
+    """Test that a link back to an ancestor does not loop."""
+    try:
+        os.symlink(tree, os.path.join(tree, 'a', 'loop'))
+    except OSError:
+        pytest.skip("cannot create symlinks")
+    found = _rel(tree, DirectoryScanner(extensions={'.png'}).scan(tree))
+    assert found.count('a/x.png') == 1
+    assert not any('loop' in p for p in found)
+
+def test_progress_callback(tree):
+    """Test that the final count is always reported."""
+    counts = []
+    DirectoryScanner(progress_callback=counts.append, progress_interval=0).scan(tree)
+    assert counts[-1] == 57
+    assert counts == sorted(counts)
+
+def test_missing_root():
+    """Test that a missing directory yields nothing."""
+    assert DirectoryScanner().scan(os.path.join(tempfile.gettempdir(), 'does-not-exist-xyz')) == []
+
+def test_file_counter(tree):
+    """Test that the background count matches the walk."""
+    scanner = DirectoryScanner(extensions={'.png', '.jpg', '.jpeg'})
+    counter = FileCounter(scanner, tree)
+    assert counter.wait(10) == len(scanner.scan(tree)) == 56
+
+    stopped = FileCounter(scanner, tree)
+    stopped.stop()
+    assert stopped.wait(0.2) is None
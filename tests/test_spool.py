@@ -0,0 +1,41 @@
+"""
+Tests for the spooled intermediate buffers.
+"""
+import io
+import os
+import tempfile
+from PIL import Image
+from src.core.spool import SpooledBuffer
+
+def test_small_buffer_stays_in_memory():
+    """Test that contents under the limit never create a file."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with SpooledBuffer(1024, tmp_dir) as buffer:
+            buffer.write(b"a" * 1000)
+            assert not buffer.spilled
+            assert os.listdir(tmp_dir) == []
+            assert buffer.size == 1000
+            assert buffer.getvalue() == b"a" * 1000
+
+def test_large_buffer_spills_and_is_deleted():
+    """Test that contents over the limit move to a file removed on close."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        buffer = SpooledBuffer(1024, tmp_dir)
+        buffer.write(b"a" * 1000)
+        buffer.write(b"b" * 1000)
+        assert buffer.spilled
+        out = io.BytesIO()
+        assert buffer.copy_to(out) == 2000
+        assert out.getvalue() == b"a" * 1000 + b"b" * 1000
+        buffer.close()
+        assert os.listdir(tmp_dir) == []
+
+def test_pillow_saves_without_spilling():
+    """Test that Pillow encodes into the buffer without forcing a file."""
+    with SpooledBuffer(10 * 1024 * 1024) as buffer:
+        Image.new('RGB', (500, 500), 'red').save(buffer, 'JPEG')
+        assert not buffer.spilled
+        assert buffer.getvalue().startswith(b"\xff\xd8")
+    with SpooledBuffer(None) as buffer:
+        buffer.write(os.urandom(100 * 1024))
+        assert not buffer.spilled
@@ -0,0 +1,65 @@
+"""
+Tests for the stage timer.
+"""
+import json
+import os
+import tempfile
+from src.core.stage_timer import StageTimer, write_report, format_report
+
+class FakeClock:
+    """Manually advanced clock."""
+    def __init__(self):
+        self.now = 0.0
+    def __call__(self):
+        return self.now
+
+def test_stages_accumulate_time_calls_and_bytes():
+    """Test timing blocks and counting bytes."""
+    clock = FakeClock()
+    timer = StageTimer(clock)
+    for _ in range(3):
+        with timer.stage('open', 100):
+            clock.now += 0.5
+    with timer.stage('encode'):
+        clock.now += 1.0
+    timer.add_bytes('encode', 42)
+
+    stages = timer.as_dict()
+    assert stages['open'] == {'seconds': 1.5, 'count': 3, 'bytes': 300}
+    assert stages['encode'] == {'seconds': 1.0, 'count': 1, 'bytes': 42}
+
+def test_merge_worker_timings():
+    """Test combining totals measured elsewhere."""
+    worker = StageTimer()
+    worker.add('convert', 0.25, 10)
+    timer = StageTimer()
+    timer.add('convert', 0.75, 5)
+    timer.merge(worker.as_dict())
+    timer.merge(None)
+    assert timer.as_dict()['convert'] == {'seconds': 1.0, 'count': 2, 'bytes': 15}
+
+def test_report_order_and_shares():
+    """Test the report layout."""
+    clock = FakeClock()
+    timer = StageTimer(clock)
+    timer.add('zip', 1.0)
+    timer.add('custom', 1.0)
+    timer.add('scan', 2.0)
+    clock.now = 5.0
+
+    report = timer.report(engine='test', images=3)
+    assert [s['stage'] for s in report['stages']] == ['scan', 'zip', 'custom']
+    assert report['stages'][0]['share'] == 0.5
+    assert report['wall_seconds'] == 5.0
+    assert report['engine'] == 'test' and report['images'] == 3
+    assert 'scan' in format_report(report)
+
+def test_write_report_is_json():
+    """Test saving a report."""
+    timer = StageTimer()
+    timer.add('open', 0.1, 1024)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'sub', 'report.json')
+        write_report(timer.report(), path)
+        with open(path) as f:
+            assert json.load(f)['stages'][0]['bytes'] == 1024
@@ -0,0 +1,24 @@
+"""
+Startup budget tests for the desktop app.
+"""
+import os
+import pytest
+from benchmarks.startup import ENTRY_POINTS, check_startup, measure_imports
+
+# Wall-clock time depends on the machine, so the suite only catches gross
+# regressions; python -m benchmarks.startup enforces the real budget
+BUDGET_SECONDS = float(os.environ.get('STARTUP_BUDGET_SECONDS', '5'))
+
+@pytest.mark.parametrize('module', ENTRY_POINTS)
+def test_gui_startup_budget(module):
+    """Test that the GUI defers heavy modules and imports within budget."""
+    result = check_startup(module, budget=BUDGET_SECONDS)
+    assert result['deferred_loaded'] == []
+    assert result['ok'], f"{module} took {result['seconds']} s: {result['slowest'][:5]}"
+
+def test_measure_imports():
+    """Test that per-module import times are collected."""
+    times = measure_imports('json')
+    own, cumulative = times['json']
+    assert 0 <= own <= cumulative
+    assert 'json.decoder' in times
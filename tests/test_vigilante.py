@@ -0,0 +1,114 @@
+"""
+Pruebas del modo vigilancia.
+"""
+import os
+import tempfile
+import threading
+import time
+from PIL import Image
+from src.app.pdf_converter import PDFConverter
+from src.app.vigilante import VigilanteCarpeta
+from src.core.incremental import MANIFEST_NAME
+
+class Registro:
+    def __init__(self):
+        self.iniciado = threading.Event()
+        self.convertidas = []
+        self.errores = []
+        self.detenido = False
+
+    def on_watch_started(self, backend):
+        self.iniciado.set()
+
+    def on_file_converted(self, nombre):
+        self.convertidas.append(nombre)
+
+    def on_file_error(self, nombre, error):
+        self.errores.append(nombre)
+
+    def on_watch_stopped(self):
+        self.detenido = True
+
+def _esperar(condicion, limite=10.0):
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        if condicion():
+            return True
+        time.sleep(0.02)
+    return False
+
+def _iniciar(carpeta):
+    vigilante = VigilanteCarpeta(PDFConverter(backend='threads'), carpeta, espera=0.1, intervalo_sondeo=0.1)
+    registro = Registro()
+    hilo = threading.Thread(target=vigilante.ejecutar, args=(registro,))
+    hilo.start()
+    assert registro.iniciado.wait(10)
+    return vigilante, registro, hilo
+
+def test_convierte_existentes_y_nuevas():
+    """Prueba que se convierten las imágenes pendientes y las que llegan después"""
+    with tempfile.TemporaryDirectory() as carpeta:
+        Image.new('RGB', (40, 40), 'red').save(os.path.join(carpeta, 'previa.png'))
+        vigilante, registro, hilo = _iniciar(carpeta)
+        try:
+            assert _esperar(lambda: os.path.exists(os.path.join(carpeta, 'previa.pdf')))
+            
+            os.makedirs(os.path.join(carpeta, 'lote'))
+            # El escáner escribe con otro nombre y renombra al terminar
+            temporal = os.path.join(carpeta, 'lote', 'nueva.tmp')
+            Image.new('RGB', (40, 40), 'blue').save(temporal, 'PNG')
+            os.replace(temporal, os.path.join(carpeta, 'lote', 'nueva.png'))
+            assert _esperar(lambda: os.path.exists(os.path.join(carpeta, 'lote', 'nueva.pdf')))
+        finally:
+            vigilante.detener()
+            hilo.join(10)
+        
+        assert not hilo.is_alive()
+        assert registro.detenido
+        assert vigilante.convertidas == 2
+        assert sorted(registro.convertidas) == [os.path.join('lote', 'nueva.png'), 'previa.png']
+        assert os.path.exists(os.path.join(carpeta, MANIFEST_NAME))
+        
+        # Al volver a arrancar no se repite nada
+        vigilante, registro, hilo = _iniciar(carpeta)
+        time.sleep(0.3)
+        vigilante.detener()
+        hilo.join(10)
+        assert registro.convertidas == []
+
+def test_directorio_relativo():
+    """Prueba que se convierten las imágenes nuevas de una carpeta relativa"""
+    with tempfile.TemporaryDirectory() as base:
+        anterior = os.getcwd()
+        os.chdir(base)
+        try:
+            os.makedirs('entrada')
+            vigilante, registro, hilo = _iniciar('entrada')
+            try:
+                Image.new('RGB', (40, 40), 'green').save(os.path.join('entrada', 'nueva.png'))
+                assert _esperar(lambda: os.path.exists(os.path.join(base, 'entrada', 'nueva.pdf')))
+            finally:
+                vigilante.detener()
+                hilo.join(10)
+            assert registro.convertidas == ['nueva.png']
+            assert registro.errores == []
+        finally:
+            os.chdir(anterior)
+
+def test_errores_y_reintento():
+    """Prueba que una imagen inválida se informa y se reintenta al cambiar"""
+    with tempfile.TemporaryDirectory() as carpeta:
+        vigilante, registro, hilo = _iniciar(carpeta)
+        try:
+            ruta = os.path.join(carpeta, 'rota.jpg')
+            with open(ruta, 'wb') as f:
+                f.write(b'no es una imagen')
+            assert _esperar(lambda: registro.errores == ['rota.jpg'])
+            
+            Image.new('RGB', (40, 40), 'green').save(ruta, 'JPEG')
+            assert _esperar(lambda: os.path.exists(os.path.join(carpeta, 'rota.pdf')))
+        finally:
+            vigilante.detener()
+            hilo.join(10)
+        assert vigilante.errores == 1
+        assert vigilante.convertidas == 1
@@ -0,0 +1,98 @@
+"""
+Tests for the folder watcher.
+"""
+import os
+import tempfile
+import time
+import pytest
+from src.core.watcher import FolderWatcher
+
+class FakeClock:
+    """Manually advanced clock."""
+    def __init__(self):
+        self.now = 0.0
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def root():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        yield tmp_dir
+
+def _write(path, data, mode='wb'):
+    with open(path, mode) as f:
+        f.write(data)
+
+def _wait_for(watcher, expected, timeout=5.0):
+    """Poll until some files are reported or the timeout expires."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        ready = watcher.poll(0.05)
+        if ready:
+            return ready
+    return []
+
+def test_reports_after_settling(root):
+    """Test that a file still growing is held back until it stops changing."""
+    clock = FakeClock()
+    path = os.path.join(root, 'scan.jpg')
+    with FolderWatcher(root, {'.jpg'}, settle_seconds=1.0, poll_interval=0,
+                       use_inotify=False, clock=clock) as watcher:
+        _write(path, b'first')
+        assert watcher.poll() == []
+        clock.now += 0.5
+        _write(path, b' second', 'ab')
+        assert watcher.poll() == []
+        clock.now += 0.6
+        # The last change was seen 0.6 s ago
+        assert watcher.poll() == []
+        clock.now += 0.5
+        assert watcher.poll() == [path]
+        clock.now += 5
+        assert watcher.poll() == []
+
+def test_filters_and_empty_files(root):
+    """Test that other extensions and empty files are not reported."""
+    clock = FakeClock()
+    with FolderWatcher(root, {'.jpg'}, settle_seconds=0.1, poll_interval=0,
+                       use_inotify=False, clock=clock) as watcher:
+        _write(os.path.join(root, 'doc.pdf'), b'pdf')
+        _write(os.path.join(root, 'empty.jpg'), b'')
+        _write(os.path.join(root, 'ok.JPG'), b'data')
+        watcher.poll()
+        clock.now += 1
+        assert watcher.poll() == [os.path.join(root, 'ok.JPG')]
+        assert watcher.pending == 1
+
+def test_existing_files_are_not_reported(root):
+    """Test that only changes after the watch starts are reported."""
+    _write(os.path.join(root, 'old.jpg'), b'data')
+    clock = FakeClock()
+    with FolderWatcher(root, {'.jpg'}, settle_seconds=0, poll_interval=0,
+                       use_inotify=False, clock=clock) as watcher:
+        assert watcher.poll() == []
+        _write(os.path.join(root, 'new.jpg'), b'data')
+        watcher.poll()
+        assert watcher.poll() == [os.path.join(root, 'new.jpg')]
+
+@pytest.mark.parametrize('use_inotify', [True, False])
+def test_new_subdirectory(root, use_inotify):
+    """Test that files in directories created after the watch started are seen."""
+    with FolderWatcher(root, {'.png'}, settle_seconds=0.05, poll_interval=0.05,
+                       use_inotify=use_inotify) as watcher:
+        if use_inotify and watcher.backend != 'inotify':
+            pytest.skip("inotify not available")
+        path = os.path.join(root, 'a', 'b', 'page.png')
+        os.makedirs(os.path.dirname(path))
+        _write(path, b'data')
+        assert _wait_for(watcher, [path]) == [path]
+
+def test_rename_into_folder(root):
+    """Test that a file moved in after being written elsewhere is reported."""
+    with tempfile.TemporaryDirectory() as other:
+        source = os.path.join(other, 'scan.tmp')
+        _write(source, b'data')
+        with FolderWatcher(root, {'.jpg'}, settle_seconds=0.05, poll_interval=0.05) as watcher:
+            target = os.path.join(root, 'scan.jpg')
+            os.replace(source, target)
+            assert _wait_for(watcher, [target]) == [target]